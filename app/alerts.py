@@ -0,0 +1,136 @@
+# Motore di allarmi valutato su ogni Sample, senza rileggere lo storico.
+#
+# Regola (dict in settings["alert_rules"]):
+#   {"name": "Temperatura alta", "metric": "temp", "op": ">", "value": 75,
+#    "clear": 70, "for_s": 10, "severity": "warning"}
+#   metric:   cpu | ram | temp | up_kb | down_kb | nome di una serie estesa ("load.1m", ...)
+#   op/value: soglia; "clear" = soglia di rientro (isteresi), default = value
+#   for_s:    la condizione deve durare almeno for_s secondi prima di scattare
+#   rate_s:   se presente, si confronta la variazione al minuto sugli ultimi rate_s secondi
+#             invece del valore (es. temperatura che sale di 5 °C/min)
+# Stato per regola O(1): pochi campi + per le regole rate una finestra scorrevole.
+import collections
+from dataclasses import dataclass
+
+BASE_METRICS = ("cpu", "ram", "temp", "up_kb", "down_kb")
+
+SEVERITIES = ("info", "warning", "critical")
+
+
+@dataclass(frozen=True)
+class AlertEvent:
+    ts: float          # epoch (secondi)
+    rule: str
+    severity: str
+    state: str         # "raised" | "cleared"
+    value: float
+    message: str
+
+
+class Rule:
+    def __init__(self, spec):
+        self.name = str(spec["name"])
+        self.metric = str(spec["metric"])
+        self.op = spec.get("op", ">")
+        if self.op not in (">", "<"):
+            raise ValueError(f"regola {self.name!r}: op deve essere '>' o '<'")
+        self.value = float(spec["value"])
+        self.clear = float(spec.get("clear", self.value))
+        self.for_s = float(spec.get("for_s", 0))
+        self.rate_s = float(spec["rate_s"]) if spec.get("rate_s") else None
+        self.severity = spec.get("severity", "warning")
+        if self.severity not in SEVERITIES:
+            raise ValueError(f"regola {self.name!r}: severity sconosciuta {self.severity!r}")
+        self.unit = spec.get("unit", "/min" if self.rate_s else "")
+
+        self.active = False
+        self.since = None     # primo istante in cui la condizione e' vera (per for_s)
+        self._window = collections.deque() if self.rate_s else None
+
+    def _observe(self, ts, x):
+        # -> valore confrontato con la soglia (il campione o la variazione al minuto)
+        if self._window is None:
+            return x
+        w = self._window
+        w.append((ts, x))
+        while len(w) > 2 and ts - w[1][0] >= self.rate_s:
+            w.popleft()
+        t0, x0 = w[0]
+        if ts - t0 < self.rate_s:
+            return None  # finestra non ancora piena: niente stime su due campioni
+        return (x - x0) * 60.0 / (ts - t0)
+
+    def _over(self, v, limit):
+        return v > limit if self.op == ">" else v < limit
+
+    def update(self, ts, x):
+        # -> AlertEvent se lo stato cambia, altrimenti None
+        v = self._observe(ts, x)
+        if v is None:
+            return None
+        if not self.active:
+            if not self._over(v, self.value):
+                self.since = None
+                return None
+            if self.since is None:
+                self.since = ts
+            if ts - self.since < self.for_s:
+                return None
+            self.active = True
+            return self._event(ts, "raised", v)
+        # attivo: rientra solo oltre la soglia di clear (isteresi)
+        if self._over(v, self.clear):
+            return None
+        self.active = False
+        self.since = None
+        return self._event(ts, "cleared", v)
+
+    def _event(self, ts, state, v):
+        if state == "raised":
+            msg = f"{self.name}: {self.metric} {v:.1f}{self.unit} {self.op} {self.value:g}{self.unit}"
+        else:
+            msg = f"{self.name}: rientrato ({self.metric} {v:.1f}{self.unit})"
+        return AlertEvent(ts, self.name, self.severity, state, float(v), msg)
+
+
+class AlertEngine:
+    def __init__(self, specs=()):
+        self.rules = []
+        self.errors = []
+        self.set_rules(specs)
+
+    def set_rules(self, specs):
+        # regole nuove = stato azzerato; quelle non valide sono scartate e annotate
+        rules, errors = [], []
+        for spec in specs or ():
+            try:
+                rules.append(Rule(spec))
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append(f"{spec!r}: {e}")
+        self.rules = rules
+        self.errors = errors
+        # le serie estese si indicizzano solo se qualche regola le usa
+        self._needs_extra = any(r.metric not in BASE_METRICS for r in rules)
+
+    def active(self):
+        return [r for r in self.rules if r.active]
+
+    def evaluate(self, sample):
+        # -> [AlertEvent, ...] dei soli cambi di stato (di solito lista vuota)
+        if not self.rules:
+            return []
+        extra = {name: v for name, _, v in sample.extra} if self._needs_extra else None
+        ts = sample.ts
+        events = []
+        for rule in self.rules:
+            if rule.metric in BASE_METRICS:
+                x = getattr(sample, rule.metric)
+            else:
+                x = extra.get(rule.metric)
+            if x is None:
+                continue
+            ev = rule.update(ts, x)
+            if ev is not None:
+                events.append(ev)
+        return events
+
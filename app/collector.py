@@ -0,0 +1,228 @@
+# Collector headless: campionamento + scrittura DB senza Qt.
+#
+#   python -m app.collector            (vedi systemd/touchui-collector.service)
+#
+# Con "collector": "external" nei settings la GUI non scrive piu' sul DB:
+# riceve i campioni di questo processo dallo stream live (app.ipc).
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from app import instrument
+from app.alerts import AlertEngine
+from app.settings_store import load_settings
+from app.database.db_manager import get_db, close_db
+from app.database.retention import RetentionManager
+from app.ipc import SamplePublisher, socket_path
+from app.workers.sampler import AdaptiveInterval, MetricSampler
+
+log = logging.getLogger("app.collector")
+
+
+def sd_notify(state):
+    # protocollo sd_notify minimale (Type=notify / WatchdogSec), no-op fuori da systemd
+    addr = os.environ.get("NOTIFY_SOCKET")
+    if not addr:
+        return
+    if addr.startswith("@"):
+        addr = "\0" + addr[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as s:
+            s.sendto(state.encode(), addr)
+    except OSError:
+        pass
+
+
+@contextmanager
+def extend_start_timeout(step_s=30):
+    # apertura DB prima di READY=1 (migrazioni, VACUUM su SD lente): si chiede a systemd
+    # altro tempo ogni step_s/2 invece di farsi uccidere da TimeoutStartSec e Restart=always
+    done = threading.Event()
+
+    def keepalive():
+        while True:
+            sd_notify(f"EXTEND_TIMEOUT_USEC={step_s * 1_000_000}")
+            if done.wait(step_s / 2):
+                return
+
+    thread = threading.Thread(target=keepalive, name="sd-extend", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+class Collector:
+    def __init__(self, settings):
+        self.settings = settings
+        self._running = False
+        self._reload = False
+
+        sd_notify("STATUS=apertura database")
+        with extend_start_timeout():
+            self.db = get_db()
+        self.sampler = MetricSampler(
+            net_ttl_s=float(settings.get("net_cache_ttl_s", 10)),
+            net_monitor=bool(settings.get("net_monitor", True)),
+            collectors=settings.get("collectors"),
+            backend=settings.get("sampler_backend", "auto"),
+        )
+        self.retention = RetentionManager(
+            self.db,
+            int(settings.get("retention_days", 7)),
+            batch_rows=int(settings.get("retention_batch_rows", 2000)),
+            archive_after_h=float(settings.get("archive_after_h", 24)),
+            archive_block_s=int(settings.get("archive_block_s", 3600)),
+        )
+        self.adaptive = None
+        self._setup_adaptive()
+        self.alerts = AlertEngine(settings.get("alert_rules"))
+        for err in self.alerts.errors:
+            log.warning("regola di allarme ignorata: %s", err)
+        self.publisher = None
+        if settings.get("ipc_publish", True):
+            self.publisher = SamplePublisher(socket_path(settings), on_command=self._on_command)
+
+    def _setup_adaptive(self):
+        self.adaptive = None
+        if self.settings.get("adaptive_sampling", False):
+            self.adaptive = AdaptiveInterval(
+                int(self.settings.get("sampling_ms", 1000)),
+                int(self.settings.get("sampling_idle_ms", 10000)),
+            )
+
+    def interval_s(self):
+        if self.adaptive is not None:
+            ms = self.adaptive.interval_ms
+        else:
+            ms = self.settings.get("sampling_ms", self.settings.get("dashboard_refresh_ms", 1000))
+        return max(0.1, int(ms) / 1000.0)
+
+    def stop(self, *_):
+        self._running = False
+
+    def request_reload(self, *_):
+        self._reload = True
+
+    def _on_command(self, cmd):
+        # comandi dalla GUI sullo stream live (thread del publisher)
+        if cmd == "reload":
+            self.request_reload()
+
+    def _apply_reload(self):
+        self._reload = False
+        self.settings = load_settings()
+        self.retention.set_days(int(self.settings.get("retention_days", 7)))
+        self.retention.archive_after_h = float(self.settings.get("archive_after_h", 24))
+        self._setup_adaptive()
+        self.alerts.set_rules(self.settings.get("alert_rules"))
+        for err in self.alerts.errors:
+            log.warning("regola di allarme ignorata: %s", err)
+        log.info("settings ricaricati (intervallo %.1fs)", self.interval_s())
+
+    @instrument.traced("collector.tick")
+    def tick(self):
+        sample = self.sampler.sample()
+        if sample is None:
+            return None
+        if self.adaptive is not None:
+            self.adaptive.next(sample)
+        self.db.insert(cpu=sample.cpu, ram=sample.ram, temp=sample.temp,
+                       up_kb=sample.up_kb, down_kb=sample.down_kb, ts=sample.ts,
+                       extra=sample.extra)
+        if self.publisher is not None:
+            self.publisher.publish(sample)
+        with instrument.timed("alerts.evaluate"):
+            events = self.alerts.evaluate(sample)
+        if events:
+            self.db.insert_alerts(events)
+            for ev in events:
+                log.warning("allarme %s [%s]: %s", ev.state, ev.severity, ev.message)
+        return sample
+
+    def run(self):
+        self._running = True
+        watchdog_s = int(os.environ.get("WATCHDOG_USEC", "0")) / 2e6
+        next_tick = time.monotonic()
+        next_retention = next_tick
+        next_watchdog = next_tick
+
+        sd_notify("READY=1")
+        log.info("collector avviato (intervallo %.1fs)", self.interval_s())
+        try:
+            while self._running:
+                if self._reload:
+                    self._apply_reload()
+
+                self.tick()
+                now = time.monotonic()
+
+                # retention nel tempo libero tra due campioni
+                if now >= next_retention:
+                    backlog = self.retention.backlog
+                    self.retention.step()
+                    if backlog and not self.retention.backlog:
+                        st = self.retention.stats()
+                        log.info("retention in pari: DB %.1f MB (WAL %.1f MB, liberi %.1f MB), "
+                                 "righe cancellate %d, archiviate %d",
+                                 st["db_bytes"] / 2**20, st["wal_bytes"] / 2**20, st["free_bytes"] / 2**20,
+                                 st["rows_reclaimed"], st["rows_archived"])
+                    next_retention = now + (0.2 if self.retention.backlog else 5.0)
+
+                if watchdog_s and now >= next_watchdog:
+                    sd_notify("WATCHDOG=1")
+                    next_watchdog = now + watchdog_s
+
+                next_tick += self.interval_s()
+                if next_tick < now:
+                    # in ritardo (sospensione, SD lenta): riparte senza recuperare i tick persi
+                    next_tick = now + self.interval_s()
+                time.sleep(max(0.0, next_tick - time.monotonic()))
+        finally:
+            sd_notify("STOPPING=1")
+            self.close()
+
+    def close(self):
+        if self.publisher is not None:
+            self.publisher.close()
+        self.sampler.close()
+        close_db()
+        log.info("collector fermato")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Touch dashboard: collector metriche headless")
+    parser.add_argument("--once", action="store_true", help="un solo campione e uscita")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    collector = Collector(load_settings())
+    signal.signal(signal.SIGTERM, collector.stop)
+    signal.signal(signal.SIGINT, collector.stop)
+    signal.signal(signal.SIGHUP, collector.request_reload)
+
+    if args.once:
+        collector.sampler.sample()
+        time.sleep(collector.interval_s())
+        collector.tick()
+        collector.close()
+        return 0
+
+    collector.run()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
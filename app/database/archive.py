@@ -0,0 +1,62 @@
+import zlib
+
+import numpy as np
+
+# Codifica dei blocchi archiviati (metrics_archive.codec)
+#   1: ts delta-of-delta int64, valori quantizzati int32 con delta, tutto zlib
+CODEC = 1
+
+# passo di quantizzazione per colonna (cpu, ram, temp, up_kb, down_kb):
+# 0.1 % per CPU/RAM (risoluzione di psutil), 0.01 per temperatura e KB/s
+SCALES = np.array([10.0, 10.0, 100.0, 100.0, 100.0])
+
+# valore mancante (temp None) nei valori quantizzati
+_MISSING = np.iinfo(np.int32).min
+
+
+def encode_block(rows):
+    # righe (ts, cpu, ram, temp, up_kb, down_kb) ordinate per ts -> (n, blob)
+    arr = np.array(rows, dtype=np.float64)  # None -> nan
+    ts = arr[:, 0].astype(np.int64)
+
+    # ts quasi equispaziati: delta-of-delta quasi tutto a zero
+    dod = np.diff(np.diff(ts, prepend=0), prepend=0)
+
+    values = arr[:, 1:] * SCALES
+    missing = np.isnan(values)
+    q = np.rint(np.where(missing, 0.0, values)).astype(np.int64)
+    # i mancanti ripetono il valore precedente (delta 0), poi diventano _MISSING
+    last = np.where(missing, 0, np.arange(len(ts))[:, None])
+    q = np.take_along_axis(q, np.maximum.accumulate(last, axis=0), axis=0)
+    # delta lungo il tempo, colonna per colonna (layout colonnare: comprime meglio)
+    q = np.diff(q, axis=0, prepend=0).T
+    q = np.where(missing.T, _MISSING, q).astype("<i4")
+
+    payload = dod.astype("<i8").tobytes() + q.tobytes()
+    return len(ts), zlib.compress(payload, 6)
+
+
+def decode_block(n, blob):
+    # -> (ts int64 (n,), valori float64 (n, 5)), temp mancante = nan
+    payload = zlib.decompress(blob)
+    dod = np.frombuffer(payload, dtype="<i8", count=n)
+    q = np.frombuffer(payload, dtype="<i4", offset=8 * n).reshape(len(SCALES), n)
+
+    ts = np.cumsum(np.cumsum(dod))
+    missing = q == _MISSING
+    values = np.cumsum(np.where(missing, 0, q).astype(np.int64), axis=1) / SCALES[:, None]
+    values[missing] = np.nan
+    return ts, values.T
+
+
+def block_rows(n, blob, start_ms=None, end_ms=None, columns=None):
+    # blocco decodificato -> righe come quelle di metrics (temp mancante = None)
+    ts, values = decode_block(n, blob)
+    lo = 0 if start_ms is None else np.searchsorted(ts, start_ms, side="left")
+    hi = n if end_ms is None else np.searchsorted(ts, end_ms, side="left")
+    ts, values = ts[lo:hi], values[lo:hi]
+    if columns is not None:
+        values = values[:, columns]
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return [(int(t), *v) for t, v in zip(ts.tolist(), out.tolist())]
@@ -1,15 +1,188 @@
+import heapq
+import logging
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from datetime import datetime, timedelta
+
+from app import instrument
+from app.database.archive import CODEC, block_rows, encode_block
 
 DB_PATH = Path.home() / "touchui" / "metrics.db"
 
-class DBManager:
+# PRAGMA user_version
+#   0/1: ts TEXT ISO (secondi)
+#   2:   ts INTEGER epoch-ms, alias del rowid
+#   3:   tabelle di rollup metrics_10s / metrics_1m / metrics_15m
+#   4:   auto_vacuum=INCREMENTAL (il file si riduce dopo la retention)
+#   5:   metriche estese in formato long: series(id, name, unit) + points(series_id, ts, value)
+#   6:   metrics_archive: blocchi chiusi compressi (vedi app/database/archive.py)
+#   7:   alerts: eventi del motore di allarmi (vedi app/alerts.py)
+SCHEMA_VERSION = 7
+
+METRICS = ("cpu", "ram", "temp", "up_kb", "down_kb")
+
+# metriche estese (points) nei blocchi archiviati: ridotte a una media per bucket
+POINTS_ARCHIVE_MS = 60_000
+# unita' delle serie bitmask (es. throttled): nei bucket archiviati l'OR dei bit, non la media
+FLAGS_UNIT = "flags"
+
+# (nome, ampiezza bucket in ms), dal piu' fine al piu' grossolano
+ROLLUP_TIERS = (
+    ("10s", 10_000),
+    ("1m", 60_000),
+    ("15m", 900_000),
+)
+
+# attesa massima di una connessione di lettura libera (come il timeout di sqlite)
+READ_WAIT_S = 5.0
+
+log = logging.getLogger(__name__)
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_db():
+    # Servizio DB unico per processo: una connessione di scrittura + pool di letture
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            from app.settings_store import load_settings
+            settings = load_settings()
+            _shared = DBManager(
+                wal=bool(settings.get("db_wal", True)),
+                flush_rows=int(settings.get("db_flush_rows", 10)),
+                flush_s=float(settings.get("db_flush_s", 10)),
+                readers=int(settings.get("db_readers", 2)),
+            )
+        return _shared
+
+
+def close_db():
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+            _shared = None
+
+
+class _Wait:
+    # contatore attese (lock scrittura / prestito connessioni di lettura)
     def __init__(self):
-        self.conn = sqlite3.connect(DB_PATH)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def as_dict(self):
+        return {"count": self.count, "total_ms": self.total_ms, "max_ms": self.max_ms,
+                "avg_ms": self.total_ms / self.count if self.count else 0.0}
+
+
+class DBManager:
+    def __init__(self, wal=False, flush_rows=1, flush_s=0.0, readers=2):
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # unica connessione di scrittura, condivisa tra thread e protetta da _write_lock
+        self.conn = sqlite3.connect(DB_PATH, timeout=5, check_same_thread=False)
+        self._write_lock = threading.Lock()
+        self._write_wait = _Wait()
+        self._read_wait = _Wait()
+        self._locked_errors = 0
+        if wal:
+            # WAL + synchronous=NORMAL: niente fsync ad ogni commit sulla SD
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+        # buffer in memoria: flush ogni flush_rows campioni o flush_s secondi
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_s = float(flush_s)
+        self._pending = []
+        self._pending_points = []
+        self._series_ids = {}
+        self._last_flush = time.monotonic()
+        self._stats = {"commits": 0, "rows": 0, "last_rows": 0,
+                       "last_ms": 0.0, "max_ms": 0.0, "total_ms": 0.0}
+
+        # pool di connessioni in sola lettura (mode=ro): in WAL non bloccano il writer
+        self._pool = queue.Queue()
+        self._closed = False
+        self._pool_lock = threading.Lock()  # rientro nel pool vs close()
+        for _ in range(max(1, int(readers))):
+            conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True,
+                                   timeout=5, check_same_thread=False)
+            self._pool.put(conn)
+        self._readers = self._pool.qsize()
+
+    @contextmanager
+    def writer(self):
+        t0 = time.perf_counter()
+        with self._write_lock:
+            self._write_wait.add((time.perf_counter() - t0) * 1000.0)
+            yield self.conn
+
+    @contextmanager
+    def reader(self):
+        # presta una connessione di lettura; chi la usa non deve tenerla oltre il blocco
+        if self._closed:
+            raise sqlite3.ProgrammingError("database chiuso")
+        t0 = time.perf_counter()
+        deadline = time.monotonic() + READ_WAIT_S
+        conn = None
+        while conn is None:
+            # attesa a fette: chi aspetta durante close() esce subito, non al timeout
+            try:
+                conn = self._pool.get(timeout=0.1)
+            except queue.Empty:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("database chiuso") from None
+                if time.monotonic() >= deadline:
+                    raise sqlite3.OperationalError("nessuna connessione di lettura libera") from None
+        self._read_wait.add((time.perf_counter() - t0) * 1000.0)
+        try:
+            yield conn
+        finally:
+            with self._pool_lock:
+                if not self._closed:
+                    self._pool.put(conn)
+                    conn = None
+            if conn is not None:
+                # restituita dopo close(): nessuno la riprendera' dal pool
+                conn.close()
+
+    @instrument.traced("db.read")
+    def _read(self, sql, params=()):
+        with self.reader() as conn:
+            try:
+                return conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                # rollback journal (WAL spento) durante un commit: un secondo tentativo
+                self._locked_errors += 1
+                time.sleep(0.05)
+                return conn.execute(sql, params).fetchall()
+
+    def contention_stats(self):
+        return {
+            "write_wait": self._write_wait.as_dict(),
+            "read_wait": self._read_wait.as_dict(),
+            "readers_free": self._pool.qsize(),
+            "readers": self._readers,
+            "locked_errors": self._locked_errors,
+        }
+
+    def _create_metrics(self):
         self.conn.execute("""
             CREATE TABLE IF NOT EXISTS metrics(
-              ts TEXT PRIMARY KEY,
+              ts INTEGER PRIMARY KEY,
               cpu REAL,
               ram REAL,
               temp REAL,
@@ -17,27 +190,504 @@ class DBManager:
               down_kb REAL
             )
         """)
-        self.conn.commit()
 
-    def insert(self, cpu, ram, temp, up_kb, down_kb):
-        ts = datetime.now().isoformat(timespec="seconds")
-        self.conn.execute(
-            "INSERT OR REPLACE INTO metrics(ts,cpu,ram,temp,up_kb,down_kb) VALUES (?,?,?,?,?,?)",
-            (ts, cpu, ram, temp, up_kb, down_kb),
+    def _create_rollups(self):
+        cols = ",\n".join(f"{m}_min REAL, {m}_avg REAL, {m}_max REAL" for m in METRICS)
+        for name, _ in ROLLUP_TIERS:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS metrics_{name}(
+                  ts INTEGER PRIMARY KEY,
+                  n INTEGER,
+                  {cols}
+                )
+            """)
+
+    def _create_points(self):
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS series(
+              id INTEGER PRIMARY KEY,
+              name TEXT UNIQUE NOT NULL,
+              unit TEXT
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS points(
+              series_id INTEGER NOT NULL,
+              ts INTEGER NOT NULL,
+              value REAL,
+              PRIMARY KEY(series_id, ts)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS points_ts ON points(ts)")
+
+    def _create_archive(self):
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS metrics_archive(
+              start_ts INTEGER PRIMARY KEY,
+              end_ts INTEGER NOT NULL,
+              n INTEGER NOT NULL,
+              codec INTEGER NOT NULL,
+              data BLOB NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS metrics_archive_end ON metrics_archive(end_ts)")
+
+    def _create_alerts(self):
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS alerts(
+              id INTEGER PRIMARY KEY,
+              ts INTEGER NOT NULL,
+              rule TEXT NOT NULL,
+              severity TEXT NOT NULL,
+              state TEXT NOT NULL,
+              value REAL,
+              message TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS alerts_ts ON alerts(ts)")
+
+    def _series_id(self, name, unit):
+        sid = self._series_ids.get(name)
+        if sid is None:
+            self.conn.execute("INSERT OR IGNORE INTO series(name, unit) VALUES (?, ?)", (name, unit))
+            sid = self.conn.execute("SELECT id FROM series WHERE name = ?", (name,)).fetchone()[0]
+            self._series_ids[name] = sid
+        return sid
+
+    def _update_rollups(self, since_ms, late_rows=()):
+        # ricalcola solo i bucket toccati dai campioni con ts >= since_ms.
+        # Sotto l'orizzonte dell'archivio i grezzi non sono piu' in metrics: li' il
+        # ricalcolo darebbe bucket con le sole righe arrivate in ritardo, che vengono
+        # invece fuse nei bucket esistenti (late_rows: righe appena scritte)
+        horizon = self.conn.execute("SELECT COALESCE(MAX(end_ts), 0) FROM metrics_archive").fetchone()[0]
+        aggs = ", ".join(f"MIN({m}), AVG({m}), MAX({m})" for m in METRICS)
+        for name, bucket in ROLLUP_TIERS:
+            start = max((since_ms // bucket) * bucket, horizon)
+            self.conn.execute(f"""
+                INSERT OR REPLACE INTO metrics_{name}
+                SELECT (ts / {bucket}) * {bucket} AS b, COUNT(*), {aggs}
+                FROM metrics WHERE ts >= ? GROUP BY b
+            """, (start,))
+        late = [r for r in late_rows if r[0] < horizon]
+        if late:
+            self._merge_rollups(late)
+
+    def _merge_rollups(self, rows):
+        # bucket toccati ricalcolati per intero dai grezzi (blocchi archiviati + righe calde):
+        # la media vecchia non si puo' ripesare, il suo n conta anche le righe con la
+        # metrica NULL (es. temperatura non letta)
+        coarse = ROLLUP_TIERS[-1][1]
+        start = (min(r[0] for r in rows) // coarse) * coarse
+        end = (max(r[0] for r in rows) // coarse + 1) * coarse
+        raw = {}
+        for n, data in self.conn.execute(
+                "SELECT n, data FROM metrics_archive WHERE end_ts > ? AND start_ts < ?", (start, end)):
+            raw.update((r[0], r) for r in block_rows(n, data, start, end))
+        raw.update((r[0], r) for r in self.conn.execute(
+            "SELECT ts,cpu,ram,temp,up_kb,down_kb FROM metrics WHERE ts >= ? AND ts < ?", (start, end)))
+
+        for name, bucket in ROLLUP_TIERS:
+            touched = {(r[0] // bucket) * bucket for r in rows}
+            groups = {}
+            for ts in sorted(raw):
+                b = (ts // bucket) * bucket
+                if b in touched:
+                    groups.setdefault(b, []).append(raw[ts])
+            for b, group in groups.items():
+                out = [b, len(group)]
+                for i, _ in enumerate(METRICS):
+                    vs = [r[1 + i] for r in group if r[1 + i] is not None]
+                    out += [min(vs), sum(vs) / len(vs), max(vs)] if vs else [None, None, None]
+                marks = ",".join("?" * len(out))
+                self.conn.execute(f"INSERT OR REPLACE INTO metrics_{name} VALUES ({marks})", out)
+
+    def _has_table(self, name):
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)
+        ).fetchone() is not None
+
+    def _copy_v1(self):
+        # metrics_v1 (ts TEXT) -> metrics; le righe gia' in metrics restano
+        self.conn.execute("""
+            INSERT OR IGNORE INTO metrics(ts,cpu,ram,temp,up_kb,down_kb)
+            SELECT CAST(strftime('%s', ts, 'utc') AS INTEGER) * 1000,
+                   cpu, ram, temp, up_kb, down_kb
+            FROM metrics_v1
+            WHERE strftime('%s', ts, 'utc') IS NOT NULL
+        """)
+        self.conn.execute("DROP TABLE metrics_v1")
+
+    def _migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        # metrics_v1 rimasta da una migrazione interrotta (versioni senza transazione)
+        leftover = self._has_table("metrics_v1")
+        if version >= SCHEMA_VERSION and not leftover:
+            return
+
+        cols = {r[1]: r[2].upper() for r in self.conn.execute("PRAGMA table_info(metrics)")}
+
+        # auto_vacuum va impostato prima di creare le tabelle, altrimenti serve un VACUUM
+        vacuum = False
+        if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            # gia' attivo solo se il file e' ancora vuoto (in WAL l'header e' gia' scritto)
+            vacuum = self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+
+        # una sola transazione esplicita: il modulo sqlite3 farebbe il commit implicito
+        # di ogni DDL, e un processo ucciso a meta' lascerebbe lo schema a pezzi
+        self.conn.isolation_level = None
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if cols.get("ts") == "TEXT":
+                # v1 -> v2: ISO locale (secondi) -> epoch-ms
+                log.info("migrazione metrics: ts TEXT -> INTEGER epoch-ms")
+                self.conn.execute("ALTER TABLE metrics RENAME TO metrics_v1")
+                leftover = True
+            # CREATE ... IF NOT EXISTS: anche le tabelle di una migrazione a meta'
+            self._create_metrics()
+            self._create_rollups()
+            self._create_points()
+            self._create_archive()
+            self._create_alerts()
+            if leftover:
+                log.info("copia metrics_v1 -> metrics")
+                self._copy_v1()
+                vacuum = True
+            if version < 3 or leftover:
+                # rollup popolati dai dati grezzi esistenti
+                self._update_rollups(0)
+            self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        finally:
+            self.conn.isolation_level = ""
+
+        if vacuum:
+            # una tantum: applica auto_vacuum e recupera lo spazio delle vecchie chiavi TEXT
+            log.info("VACUUM dopo migrazione a v%d", SCHEMA_VERSION)
+            self.conn.execute("VACUUM")
+
+    def insert(self, cpu, ram, temp, up_kb, down_kb, ts=None, extra=()):
+        # ts: epoch in secondi (float), salvato come epoch-ms intero
+        # extra: ((nome, unita', valore), ...) dai collector registrati
+        ts = int((time.time() if ts is None else ts) * 1000)
+        with self._write_lock:
+            self._pending.append((ts, cpu, ram, temp, up_kb, down_kb))
+            self._pending_points.extend((name, unit, ts, value) for name, unit, value in extra)
+            due = (len(self._pending) >= self.flush_rows
+                   or time.monotonic() - self._last_flush >= self.flush_s)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.writer() as conn:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            points, self._pending_points = self._pending_points, []
+
+            t0 = time.perf_counter()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO metrics(ts,cpu,ram,temp,up_kb,down_kb) VALUES (?,?,?,?,?,?)",
+                    rows,
+                )
+                self._update_rollups(min(r[0] for r in rows), rows)
+                if points:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO points(series_id, ts, value) VALUES (?,?,?)",
+                        [(self._series_id(name, unit), ts, v) for name, unit, ts, v in points],
+                    )
+            ms = (time.perf_counter() - t0) * 1000.0
+        instrument.record("db.commit", ms)
+
+        st = self._stats
+        st["commits"] += 1
+        st["rows"] += len(rows)
+        st["last_rows"] = len(rows)
+        st["last_ms"] = ms
+        st["max_ms"] = max(st["max_ms"], ms)
+        st["total_ms"] += ms
+        log.debug("flush: %d righe in %.1f ms", len(rows), ms)
+
+    def insert_alerts(self, events):
+        # eventi rari (cambi di stato): scritti subito, fuori dal buffer dei campioni
+        if not events:
+            return
+        with self.writer() as conn, conn:
+            conn.executemany(
+                "INSERT INTO alerts(ts, rule, severity, state, value, message) VALUES (?,?,?,?,?,?)",
+                [(int(e.ts * 1000), e.rule, e.severity, e.state, e.value, e.message) for e in events],
+            )
+
+    def write_stats(self):
+        st = dict(self._stats)
+        commits = st["commits"] or 1
+        st["avg_ms"] = st["total_ms"] / commits
+        st["rows_per_commit"] = st["rows"] / commits
+        st["pending"] = len(self._pending)
+        return st
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        # da qui reader() rifiuta nuovi prestiti; quelle in prestito si chiudono al rientro
+        with self._pool_lock:
+            self._closed = True
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self.writer() as conn:
+            conn.close()
+
+    def archive_block(self, before_ms, block_ms=3_600_000):
+        # comprime il blocco chiuso piu' vecchio di metrics (tutto prima di before_ms)
+        # in una riga di metrics_archive; -> righe archiviate (0 = niente da fare)
+        with self.writer() as conn:
+            first = conn.execute("SELECT MIN(ts) FROM metrics").fetchone()[0]
+            if first is None:
+                return 0
+            start = (first // block_ms) * block_ms
+            end = start + block_ms
+            if end > before_ms:
+                return 0
+
+            rows = conn.execute(
+                "SELECT ts,cpu,ram,temp,up_kb,down_kb FROM metrics WHERE ts >= ? AND ts < ? ORDER BY ts",
+                (start, end),
+            ).fetchall()
+            old = conn.execute(
+                "SELECT n, data FROM metrics_archive WHERE start_ts = ?", (start,)
+            ).fetchone()
+            if old is not None:
+                # campioni arrivati in ritardo per un blocco gia' archiviato: fusione
+                merged = {r[0]: r for r in block_rows(*old)}
+                merged.update((r[0], r) for r in rows)
+                rows = [merged[ts] for ts in sorted(merged)]
+
+            n, blob = encode_block(rows)
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO metrics_archive(start_ts, end_ts, n, codec, data) "
+                    "VALUES (?,?,?,?,?)",
+                    (start, end, n, CODEC, blob),
+                )
+                conn.execute("DELETE FROM metrics WHERE ts >= ? AND ts < ?", (start, end))
+                # metriche estese dello stesso blocco: una media al minuto per serie,
+                # OR dei bit per le bitmask (la media di flag non ha senso)
+                bucket = POINTS_ARCHIVE_MS
+                flags = f"series_id IN (SELECT id FROM series WHERE unit = '{FLAGS_UNIT}')"
+                compact = conn.execute(
+                    f"SELECT series_id, (ts / {bucket}) * {bucket} AS b, AVG(value) FROM points "
+                    f"WHERE ts >= ? AND ts < ? AND NOT {flags} GROUP BY series_id, b",
+                    (start, end),
+                ).fetchall()
+                ored = {}
+                for sid, ts, value in conn.execute(
+                        f"SELECT series_id, ts, value FROM points WHERE ts >= ? AND ts < ? AND {flags}",
+                        (start, end)):
+                    if value is not None:
+                        key = (sid, (ts // bucket) * bucket)
+                        ored[key] = ored.get(key, 0) | int(value)
+                compact.extend((sid, b, float(v)) for (sid, b), v in ored.items())
+                conn.execute("DELETE FROM points WHERE ts >= ? AND ts < ?", (start, end))
+                conn.executemany("INSERT INTO points(series_id, ts, value) VALUES (?,?,?)", compact)
+        log.debug("archiviato blocco %d: %d righe, %d byte, %d punti estesi", start, n, len(blob), len(compact))
+        return n
+
+    def _blocks(self, start_ms, end_ms, desc=False):
+        # blocchi archiviati che intersecano [start_ms, end_ms)
+        order = "DESC" if desc else ""
+        return self._read(
+            "SELECT n, data FROM metrics_archive WHERE end_ts > ? AND start_ts < ? "
+            f"ORDER BY start_ts {order}",
+            (start_ms, end_ms),
         )
-        self.conn.commit()
 
+    def _archived(self, start_ms, end_ms, columns=None):
+        rows = []
+        for n, data in self._blocks(start_ms, end_ms):
+            rows.extend(block_rows(n, data, start_ms, end_ms, columns))
+        return rows
+
+    def _with_archive(self, hot, start_ms, end_ms):
+        # righe calde + blocchi archiviati, in ordine di ts
+        archived = self._archived(start_ms, end_ms)
+        if not archived:
+            return hot
+        if not hot or archived[-1][0] < hot[0][0]:
+            return archived + hot
+        return list(heapq.merge(archived, hot))
+
+    def archive_stats(self):
+        rows = self._read("SELECT COUNT(*), COALESCE(SUM(n), 0), COALESCE(SUM(LENGTH(data)), 0) "
+                          "FROM metrics_archive")
+        blocks, n, size = rows[0]
+        return {"blocks": blocks, "rows": n, "bytes": size}
 
     def last_n(self, n=600):
-        cur = self.conn.cursor()
-        cur.execute("SELECT ts,cpu,ram,temp,up_kb,down_kb FROM metrics ORDER BY ts DESC LIMIT ?", (n,))
-        rows = cur.fetchall()
+        rows = self._read("SELECT ts,cpu,ram,temp,up_kb,down_kb FROM metrics ORDER BY ts DESC LIMIT ?", (n,))
         rows.reverse()
+        if len(rows) < n:
+            # DB caldo quasi vuoto: completa con la coda dell'archivio
+            end = rows[0][0] if rows else 1 << 62
+            older = []
+            for count, data in self._blocks(0, end, desc=True):
+                older = block_rows(count, data, end_ms=end) + older
+                if len(older) + len(rows) >= n:
+                    break
+            rows = older[max(0, len(older) - (n - len(rows))):] + rows
         return rows
 
-    def cleanup_older_than(self, days: int):
-        if not days or days <= 0:
-            return
-        cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
-        self.conn.execute("DELETE FROM metrics WHERE ts < ?", (cutoff,))
-        self.conn.commit()
\ No newline at end of file
+    def pick_tier(self, span_ms, max_points):
+        # il tier piu' grossolano che da' ancora ~1 punto per pixel
+        for name, bucket in reversed(ROLLUP_TIERS):
+            if span_ms / bucket >= max_points:
+                return name
+        return "raw"
+
+    def query_window(self, start_ms, end_ms, max_points=800, tier=None, envelope=False):
+        # -> (tier, [(ts, cpu, ram, temp, up_kb, down_kb), ...]) con i valori medi
+        # tier: forza la risoluzione (altrimenti scelta da span e max_points)
+        # envelope: nei rollup due righe per bucket, minimi a ts e massimi a meta' bucket,
+        # come la decimazione min/max dei dati grezzi (i picchi restano visibili)
+        if tier is None:
+            tier = self.pick_tier(end_ms - start_ms, max_points)
+        if tier != "raw" and envelope:
+            half = dict(ROLLUP_TIERS)[tier] // 2
+            rows = []
+            for r in self.query_rollup(tier, start_ms, end_ms):
+                # (ts, n, cpu_min, cpu_avg, cpu_max, ram_min, ...)
+                rows.append((r[0],) + r[2::3])
+                rows.append((r[0] + half,) + r[4::3])
+            return tier, rows
+        if tier == "raw":
+            sql = "SELECT ts,cpu,ram,temp,up_kb,down_kb FROM metrics"
+        else:
+            avgs = ",".join(f"{m}_avg" for m in METRICS)
+            sql = f"SELECT ts,{avgs} FROM metrics_{tier}"
+        rows = self._read(sql + " WHERE ts >= ? AND ts < ? ORDER BY ts", (start_ms, end_ms))
+        if tier == "raw":
+            # i rollup restano in chiaro: solo i dati grezzi possono stare nell'archivio
+            rows = self._with_archive(rows, start_ms, end_ms)
+        return tier, rows
+
+    def query_rollup(self, tier, start_ms, end_ms):
+        # righe complete (ts, n, cpu_min, cpu_avg, cpu_max, ...) di un tier
+        cols = ",".join(f"{m}_min,{m}_avg,{m}_max" for m in METRICS)
+        return self._read(
+            f"SELECT ts,n,{cols} FROM metrics_{tier} WHERE ts >= ? AND ts < ? ORDER BY ts",
+            (start_ms, end_ms),
+        )
+
+    def since(self, ts_ms):
+        # righe con ts > ts_ms, in ordine crescente (refresh incrementale)
+        rows = self._read(
+            "SELECT ts,cpu,ram,temp,up_kb,down_kb FROM metrics WHERE ts > ? ORDER BY ts",
+            (ts_ms,),
+        )
+        return self._with_archive(rows, ts_ms + 1, 1 << 62)
+
+    def series_list(self):
+        # metriche estese registrate: [(nome, unita')]
+        return self._read("SELECT name, unit FROM series ORDER BY name")
+
+    def query_points(self, name, start_ms, end_ms):
+        # (ts, valore) di una metrica estesa in [start_ms, end_ms), in ordine crescente;
+        # sotto l'orizzonte dell'archivio un punto per bucket (vedi archive_block)
+        return self._read(
+            "SELECT p.ts, p.value FROM points p JOIN series s ON s.id = p.series_id "
+            "WHERE s.name = ? AND p.ts >= ? AND p.ts < ? ORDER BY p.ts",
+            (name, start_ms, end_ms),
+        )
+
+    def _points_where(self, names):
+        # names: None = tutte le serie
+        if names is None:
+            return "", ()
+        names = tuple(names)
+        return f" AND s.name IN ({','.join('?' * len(names))})", names
+
+    def count_points(self, start_ms, end_ms, names=None, conn=None):
+        where, params = self._points_where(names)
+        with self.snapshot() if conn is None else nullcontext(conn) as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM points p JOIN series s ON s.id = p.series_id "
+                f"WHERE p.ts >= ? AND p.ts < ?{where}",
+                (start_ms, end_ms) + params,
+            ).fetchone()[0]
+
+    def iter_points(self, start_ms, end_ms, names=None, chunk=5000, conn=None):
+        # stream a blocchi di (ts, nome, unita', valore) in ordine di ts, come iter_range
+        where, params = self._points_where(names)
+        with self.snapshot() if conn is None else nullcontext(conn) as conn:
+            cur = conn.execute(
+                "SELECT p.ts, s.name, s.unit, p.value FROM points p JOIN series s ON s.id = p.series_id "
+                f"WHERE p.ts >= ? AND p.ts < ?{where} ORDER BY p.ts, s.name",
+                (start_ms, end_ms) + params,
+            )
+            while True:
+                rows = cur.fetchmany(chunk)
+                if not rows:
+                    break
+                yield rows
+
+    @contextmanager
+    def snapshot(self):
+        # connessione di lettura in una transazione: piu' query vedono lo stesso stato
+        # (niente righe spostate dall'archiviazione o cancellate dalla retention a meta')
+        with self.reader() as conn:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                conn.rollback()
+
+    def count_range(self, start_ms, end_ms, conn=None):
+        # conn: connessione di snapshot(), per contare e poi leggere lo stesso stato
+        with self.snapshot() if conn is None else nullcontext(conn) as conn:
+            hot = conn.execute(
+                "SELECT COUNT(*) FROM metrics WHERE ts >= ? AND ts < ?", (start_ms, end_ms)
+            ).fetchone()[0]
+            full = conn.execute(
+                "SELECT COALESCE(SUM(n), 0) FROM metrics_archive WHERE start_ts >= ? AND end_ts <= ?",
+                (start_ms, end_ms),
+            ).fetchone()[0]
+            # blocchi a cavallo degli estremi: vanno decodificati
+            partial = conn.execute(
+                "SELECT n, data FROM metrics_archive WHERE end_ts > ? AND start_ts < ? "
+                "AND NOT (start_ts >= ? AND end_ts <= ?)",
+                (start_ms, end_ms, start_ms, end_ms),
+            ).fetchall()
+        edge = sum(len(block_rows(n, data, start_ms, end_ms, [])) for n, data in partial)
+        return hot + full + edge
+
+    def iter_range(self, start_ms, end_ms, columns=METRICS, chunk=5000, conn=None):
+        # stream a blocchi da un cursore: la finestra non viene mai caricata tutta in memoria;
+        # archivio e tabella calda letti nella stessa transazione
+        cols = [c for c in columns if c in METRICS]
+        idx = [METRICS.index(c) for c in cols]
+        with self.snapshot() if conn is None else nullcontext(conn) as conn:
+            # prima i blocchi archiviati (piu' vecchi), decodificati uno alla volta
+            cur = conn.execute(
+                "SELECT n, data FROM metrics_archive WHERE end_ts > ? AND start_ts < ? ORDER BY start_ts",
+                (start_ms, end_ms),
+            )
+            for n, data in cur:
+                rows = block_rows(n, data, start_ms, end_ms, idx)
+                for i in range(0, len(rows), chunk):
+                    yield rows[i:i + chunk]
+
+            sql = f"SELECT ts,{','.join(cols)} FROM metrics WHERE ts >= ? AND ts < ? ORDER BY ts"
+            cur = conn.execute(sql, (start_ms, end_ms))
+            while True:
+                rows = cur.fetchmany(chunk)
+                if not rows:
+                    break
+                yield rows
@@ -0,0 +1,110 @@
+import os
+import time
+
+from app.database.db_manager import DB_PATH, ROLLUP_TIERS
+
+
+class RetentionManager:
+    # Retention a piccoli passi: ogni step() cancella al massimo batch_rows righe
+    # in una transazione breve, poi restituisce le pagine libere con incremental_vacuum.
+    # Finita la retention, archivia (comprime) un blocco chiuso piu' vecchio di archive_after_h.
+
+    def __init__(self, db, days, batch_rows=2000, vacuum_pages=256,
+                 archive_after_h=24, archive_block_s=3600):
+        self.db = db
+        self.days = int(days)
+        self.archive_after_h = float(archive_after_h)
+        self.archive_block_ms = max(60, int(archive_block_s)) * 1000
+        self.batch_rows = max(1, int(batch_rows))
+        self.vacuum_pages = max(1, int(vacuum_pages))
+
+        self.rows_reclaimed = 0
+        self.pages_vacuumed = 0
+        self.rows_archived = 0
+        self.last_step_ms = 0.0
+        self.backlog = True  # finche' non si trova zero righe da cancellare
+
+    def cutoff_ms(self):
+        return int((time.time() - self.days * 86400) * 1000)
+
+    def set_days(self, days):
+        days = int(days)
+        if days != self.days:
+            self.days = days
+            self.backlog = True
+
+    def step(self):
+        if not self.days or self.days <= 0:
+            return 0
+        t0 = time.perf_counter()
+        cutoff = self.cutoff_ms()
+
+        deleted = 0
+        with self.db.writer() as conn, conn:
+            for table in ["metrics"] + [f"metrics_{name}" for name, _ in ROLLUP_TIERS]:
+                cur = conn.execute(
+                    f"DELETE FROM {table} WHERE ts IN "
+                    f"(SELECT ts FROM {table} WHERE ts < ? ORDER BY ts LIMIT ?)",
+                    (cutoff, self.batch_rows),
+                )
+                if table == "metrics":
+                    deleted = cur.rowcount
+            # metriche estese: piu' righe per istante, batch sul ts limite
+            cur = conn.execute(
+                "DELETE FROM points WHERE ts < ? AND ts <= "
+                "(SELECT ts FROM points WHERE ts < ? ORDER BY ts LIMIT 1 OFFSET ?)",
+                (cutoff, cutoff, self.batch_rows),
+            )
+            points = cur.rowcount
+            if points == 0:
+                # meno di batch_rows righe scadute (la subquery e' NULL): via tutte
+                points = conn.execute("DELETE FROM points WHERE ts < ?", (cutoff,)).rowcount
+            # blocchi archiviati: solo quelli interamente scaduti
+            blocks = conn.execute(
+                "DELETE FROM metrics_archive WHERE start_ts IN "
+                "(SELECT start_ts FROM metrics_archive WHERE end_ts <= ? ORDER BY start_ts LIMIT 24)",
+                (cutoff,),
+            ).rowcount
+            # storico allarmi: poche righe, stessa retention dei campioni
+            conn.execute("DELETE FROM alerts WHERE ts < ?", (cutoff,))
+        self.rows_reclaimed += deleted + points
+        self.backlog = deleted >= self.batch_rows or points >= self.batch_rows or blocks >= 24
+
+        if not self.backlog and self.archive_after_h > 0:
+            before = int((time.time() - self.archive_after_h * 3600) * 1000)
+            archived = self.db.archive_block(before, self.archive_block_ms)
+            self.rows_archived += archived
+            # un blocco per step: con arretrato si continua al ritmo veloce
+            self.backlog = archived > 0
+
+        if not self.backlog:
+            self._vacuum()
+
+        self.last_step_ms = (time.perf_counter() - t0) * 1000.0
+        return deleted
+
+    def _vacuum(self):
+        with self.db.writer() as conn:
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free < self.vacuum_pages:
+                return
+            # executescript: con execute() sqlite3 fa un solo step e libera una sola pagina
+            conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+            self.pages_vacuumed += free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def stats(self):
+        with self.db.reader() as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            pages = conn.execute("PRAGMA page_count").fetchone()[0]
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        wal = f"{DB_PATH}-wal"
+        return {
+            "db_bytes": page_size * pages,
+            "wal_bytes": os.path.getsize(wal) if os.path.exists(wal) else 0,
+            "free_bytes": page_size * free,
+            "rows_reclaimed": self.rows_reclaimed,
+            "pages_vacuumed": self.pages_vacuumed,
+            "rows_archived": self.rows_archived,
+            "last_step_ms": self.last_step_ms,
+            "backlog": self.backlog,
+        }
@@ -0,0 +1,32 @@
+import numpy as np
+
+
+def visible_slice(x, x0, x1):
+    # indici [i0, i1) dei punti visibili tra x0 e x1, piu' un punto per lato
+    # cosi' la curva arriva fino ai bordi del grafico
+    i0 = max(0, int(np.searchsorted(x, x0, side="left")) - 1)
+    i1 = min(len(x), int(np.searchsorted(x, x1, side="right")) + 1)
+    return i0, i1
+
+
+def minmax_decimate(x, y, n_bins):
+    # Peak-preserving: per ogni bin tiene il minimo e il massimo (nell'ordine
+    # in cui compaiono), quindi i picchi brevi di CPU/rete restano visibili.
+    n = len(x)
+    n_bins = max(1, int(n_bins))
+    if n <= 2 * n_bins:
+        return x, y
+
+    k = -(-n // n_bins)  # punti per bin (ceil)
+    pad = n_bins * k - n
+    yp = np.concatenate([y, np.full(pad, np.nan)]).reshape(n_bins, k)
+
+    nan = np.isnan(yp)
+    imin = np.argmin(np.where(nan, np.inf, yp), axis=1)
+    imax = np.argmax(np.where(nan, -np.inf, yp), axis=1)
+
+    base = np.arange(n_bins) * k
+    idx = np.stack([np.minimum(imin, imax), np.maximum(imin, imax)], axis=1) + base[:, None]
+    idx = idx.ravel()
+    idx = np.unique(idx[idx < n])
+    return x[idx], y[idx]
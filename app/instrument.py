@@ -0,0 +1,199 @@
+# Strumentazione leggera dei percorsi caldi (timer, DB, subprocess, grafici).
+#
+# Ogni misura finisce in un istogramma a bucket logaritmici fissi: memoria costante,
+# record() costa un bisect, i percentili sono interpolati dentro il bucket (passo x1.25).
+#
+#   with instrument.timed("db.commit"):
+#       ...
+#   instrument.histogram("db.commit").percentile(99)
+import bisect
+import cProfile
+import functools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_DIR = Path.home() / "touchui" / "profiles"
+
+# limiti superiori dei bucket in ms: da 10 us a ~100 s, passo x1.25
+_BOUNDS = [0.01 * 1.25 ** i for i in range(int(math.log(1e7, 1.25)) + 1)]
+
+
+class Histogram:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(_BOUNDS) + 1)
+            self.count = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+
+    def record(self, ms):
+        i = bisect.bisect_left(_BOUNDS, ms)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def percentile(self, p):
+        # interpolazione lineare dentro il bucket che contiene il p-esimo percentile
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = self.count * p / 100.0
+            seen = 0
+            for i, c in enumerate(self.counts):
+                if c and seen + c >= rank:
+                    lo = _BOUNDS[i - 1] if i else 0.0
+                    hi = min(_BOUNDS[i] if i < len(_BOUNDS) else self.max_ms, self.max_ms)
+                    return lo + (hi - lo) * max(0.0, rank - seen) / c
+                seen += c
+            return self.max_ms
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+        }
+
+
+_hists = {}
+_counters = {}
+_gauges = {}
+_lock = threading.Lock()
+
+
+def histogram(name):
+    h = _hists.get(name)
+    if h is None:
+        with _lock:
+            h = _hists.setdefault(name, Histogram())
+    return h
+
+
+def record(name, ms):
+    histogram(name).record(ms)
+
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def gauge(name, value):
+    # ultimo valore di una grandezza (memoria in cache, code, ...)
+    _gauges[name] = value
+
+
+def gauges():
+    return dict(_gauges)
+
+
+@contextmanager
+def timed(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram(name).record((time.perf_counter() - t0) * 1000.0)
+
+
+def traced(name):
+    # decoratore: durata di ogni chiamata nell'istogramma `name`
+    def deco(fn):
+        h = histogram(name)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                h.record((time.perf_counter() - t0) * 1000.0)
+        return wrapper
+    return deco
+
+
+def snapshot():
+    # -> ({nome: statistiche istogramma}, {nome: contatore})
+    with _lock:
+        hists = dict(_hists)
+        counters = dict(_counters)
+    return {name: h.snapshot() for name, h in sorted(hists.items())}, counters
+
+
+def reset():
+    with _lock:
+        hists = list(_hists.values())
+        _counters.clear()
+    for h in hists:
+        h.reset()
+
+
+# --- tempi di avvio ---
+
+_T0 = time.perf_counter()  # import di app.instrument = primo import di main.py
+_marks = {}
+
+
+def _process_age_ms():
+    # eta' del processo dal kernel: include l'avvio dell'interprete (None fuori da Linux)
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return (uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000.0
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def mark(name):
+    # traguardo di avvio (es. "first_paint", "interactive"), registrato una volta sola
+    if name not in _marks:
+        _marks[name] = {"ms": (time.perf_counter() - _T0) * 1000.0, "process_ms": _process_age_ms()}
+
+
+def marks():
+    return dict(_marks)
+
+
+# --- cProfile ---
+
+_profile = None
+
+
+def profiling():
+    return _profile is not None
+
+
+def start_profile():
+    # profila solo il thread che la chiama (il thread GUI)
+    global _profile
+    if _profile is None:
+        _profile = cProfile.Profile()
+        _profile.enable()
+
+
+def stop_profile():
+    # -> percorso del file .prof (apribile con pstats / snakeviz)
+    global _profile
+    if _profile is None:
+        return None
+    prof, _profile = _profile, None
+    prof.disable()
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    path = PROFILE_DIR / time.strftime("profile-%Y%m%d-%H%M%S.prof")
+    prof.dump_stats(str(path))
+    return path
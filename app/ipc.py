@@ -0,0 +1,274 @@
+# Stream live dei campioni su socket Unix (una riga JSON per Sample).
+#
+# Il campionatore pubblica ogni Sample una volta sola; qualsiasi numero di
+# client (dashboard, storico, script esterni) si collega al socket.
+# Back-pressure: ogni client ha una coda limitata, se non legge abbastanza
+# in fretta i campioni piu' vecchi vengono scartati (e contati).
+# Nell'altro verso i client possono mandare comandi di una riga: "reload" fa
+# rileggere i settings al collector (stesso effetto di SIGHUP).
+#
+#   python -m app.ipc --demo     publisher finto con dati sintetici
+#   python -m app.ipc --listen   stampa i campioni ricevuti
+import argparse
+import collections
+import dataclasses
+import errno
+import json
+import os
+import selectors
+import socket
+import threading
+import time
+from pathlib import Path
+
+from app.workers.sampler import Sample
+
+DEFAULT_SOCKET = Path.home() / "touchui" / "live.sock"
+
+_FIELDS = {f.name for f in dataclasses.fields(Sample)}
+
+COMMANDS = ("reload",)
+
+
+def socket_path(settings):
+    return Path(settings.get("ipc_socket") or DEFAULT_SOCKET)
+
+
+def encode_sample(sample):
+    return (json.dumps(dataclasses.asdict(sample), separators=(",", ":")) + "\n").encode()
+
+
+def decode_sample(line):
+    data = {k: v for k, v in json.loads(line).items() if k in _FIELDS}
+    data["extra"] = tuple(tuple(e) for e in data.get("extra", ()))
+    return Sample(**data)
+
+
+class _Client:
+    def __init__(self, sock, max_queue):
+        self.sock = sock
+        self.queue = collections.deque(maxlen=max_queue)
+        self.buf = b""
+        self.rbuf = b""
+        self.dropped = 0
+
+
+class SamplePublisher:
+    def __init__(self, path=DEFAULT_SOCKET, max_queue=256, on_command=None):
+        self.path = str(path)
+        self.max_queue = int(max_queue)
+        # on_command(nome) gira nel thread del publisher: deve solo annotare la richiesta
+        self.on_command = on_command
+        self.published = 0
+        self.dropped = 0
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._claim_path()
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen(8)
+        self._server.setblocking(False)
+        # inode del nostro socket: in close() si cancella il path solo se e' ancora questo
+        self._ino = os.stat(self.path).st_ino
+
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self._server, selectors.EVENT_READ, "accept")
+        self._sel.register(self._wake_r, selectors.EVENT_READ, "wake")
+
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _claim_path(self):
+        # un socket rimasto da un'esecuzione precedente si cancella solo se nessuno
+        # risponde: se un altro publisher e' in ascolto non gli si ruba il path
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except ConnectionRefusedError:
+            os.unlink(self.path)
+            return
+        except FileNotFoundError:
+            return
+        finally:
+            probe.close()
+        raise OSError(errno.EADDRINUSE, "publisher gia' attivo", self.path)
+
+    def publish(self, sample):
+        line = encode_sample(sample)
+        with self._lock:
+            self.published += 1
+            for c in self._clients.values():
+                if len(c.queue) == c.queue.maxlen:
+                    c.dropped += 1
+                    self.dropped += 1
+                c.queue.append(line)
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "published": self.published,
+                "dropped": self.dropped,
+            }
+
+    def _loop(self):
+        while self._running:
+            for key, events in self._sel.select(timeout=1.0):
+                if key.data == "accept":
+                    self._accept()
+                elif key.data == "wake":
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                else:
+                    client = key.data
+                    if events & selectors.EVENT_READ and not self._drain(client):
+                        continue
+                    if events & selectors.EVENT_WRITE:
+                        self._send(client)
+            self._update_interest()
+
+    def _accept(self):
+        try:
+            sock, _ = self._server.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        client = _Client(sock, self.max_queue)
+        with self._lock:
+            self._clients[sock] = client
+        self._sel.register(sock, selectors.EVENT_READ, client)
+
+    def _drain(self, client):
+        # dai client solo comandi di una riga; una lettura vuota = disconnesso
+        try:
+            data = client.sock.recv(4096)
+        except BlockingIOError:
+            return True
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(client)
+            return False
+        *lines, client.rbuf = (client.rbuf + data).split(b"\n")
+        client.rbuf = client.rbuf[-256:]
+        for line in lines:
+            cmd = line.decode(errors="replace").strip()
+            if cmd in COMMANDS and self.on_command is not None:
+                self.on_command(cmd)
+        return True
+
+    def _send(self, client):
+        with self._lock:
+            while client.queue:
+                client.buf += client.queue.popleft()
+        if not client.buf:
+            return
+        try:
+            n = client.sock.send(client.buf)
+            client.buf = client.buf[n:]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(client)
+
+    def _update_interest(self):
+        with self._lock:
+            clients = list(self._clients.values())
+        for c in clients:
+            want = selectors.EVENT_READ
+            if c.buf or c.queue:
+                want |= selectors.EVENT_WRITE
+            try:
+                self._sel.modify(c.sock, want, c)
+            except (KeyError, ValueError):
+                pass
+
+    def _drop(self, client):
+        with self._lock:
+            self._clients.pop(client.sock, None)
+        try:
+            self._sel.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def close(self):
+        self._running = False
+        self._thread.join(timeout=2)
+        for c in list(self._clients.values()):
+            self._drop(c)
+        self._sel.close()
+        self._server.close()
+        self._wake_r.close()
+        self._wake_w.close()
+        try:
+            if os.stat(self.path).st_ino == self._ino:
+                os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _demo(path, interval):
+    import math
+    import random
+
+    pub = SamplePublisher(path)
+    print(f"publisher demo su {path}")
+    t = 0
+    try:
+        while True:
+            cpu = 30 + 25 * math.sin(t / 20) + random.uniform(-5, 5)
+            pub.publish(Sample(
+                ts=time.time(), cpu=max(0.0, cpu), ram=40 + random.uniform(-1, 1),
+                temp=50 + cpu / 10, up_kb=random.uniform(0, 20), down_kb=random.uniform(0, 200),
+                net_device="wlan0", net_type="wifi", wifi_signal=70, ip="",
+            ))
+            t += 1
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pub.close()
+
+
+def _listen(path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(str(path))
+        for line in s.makefile("rb"):
+            print(decode_sample(line))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream live dei campioni")
+    parser.add_argument("--socket", default=str(DEFAULT_SOCKET))
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--demo", action="store_true", help="publisher con dati sintetici")
+    mode.add_argument("--listen", action="store_true", help="stampa i campioni ricevuti")
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    if args.demo:
+        _demo(args.socket, args.interval)
+    else:
+        _listen(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,22 +1,49 @@
+import importlib
+import time
+
 from PyQt5.QtWidgets import (
     QWidget, QHBoxLayout, QVBoxLayout, QPushButton, QStackedWidget,
     QMessageBox, QLabel, QFrame, QStyle
 )
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtCore import Qt, QSize, QTimer, pyqtSignal
+
+from app import instrument
+
+# Pagine create alla prima apertura: pyqtgraph, psutil, numpy e DB non pesano
+# sull'avvio. (modulo, classe); la dashboard e' costruita subito dopo il primo frame.
+PAGES = {
+    "dash": ("app.pages.dashboard_page", "DashboardPage"),
+    "hist": ("app.pages.history_page", "HistoryPage"),
+    "sett": ("app.pages.settings_page", "SettingsPage"),
+    "diag": ("app.pages.diagnostics_page", "DiagnosticsPage"),
+}
+
+# probe del lag dell'event loop: il ritardo oltre l'intervallo atteso
+LAG_PROBE_MS = 100
 
-from app.pages.dashboard_page import DashboardPage
-from app.pages.history_page import HistoryPage
-from app.pages.settings_page import SettingsPage
+# banner allarmi: colore per severita', dalla meno alla piu' grave
+ALERT_COLORS = {"info": "#0ea5e9", "warning": "#f59e0b", "critical": "#ef4444"}
 
 
 class MainWindow(QWidget):
+    # avvio completato: primo frame disegnato e dashboard costruita
+    interactive = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Raspberry Industrial Dashboard")
         #self.showMaximized()
         self.setWindowFlags(Qt.FramelessWindowHint)
-        self.showFullScreen()
+        self.page_dash = None
+        self.page_hist = None
+        self.page_sett = None
+        self.page_diag = None
+        self._started = False
+        self._alerts = {}  # regola -> AlertEvent attivo
         self._build_ui()
+        self.showFullScreen()
+        # senza paintEvent (finestra coperta/offscreen) la dashboard arriva comunque
+        QTimer.singleShot(1000, self._build_first_page)
 
     def _btn(self, text, std_icon):
         b = QPushButton(text)
@@ -45,40 +72,144 @@ class MainWindow(QWidget):
         self.btn_dash = self._btn("Dashboard", QStyle.SP_ComputerIcon)
         self.btn_hist = self._btn("Storico", QStyle.SP_FileDialogDetailedView)
         self.btn_sett = self._btn("Settings", QStyle.SP_FileDialogContentsView)
+        self.btn_diag = self._btn("Diagnostica", QStyle.SP_MessageBoxInformation)
         self.btn_exit = self._btn("Esci", QStyle.SP_DialogCloseButton)
 
         s.addWidget(self.btn_dash)
         s.addWidget(self.btn_hist)
         s.addWidget(self.btn_sett)
+        s.addWidget(self.btn_diag)
         s.addStretch(1)
         s.addWidget(self.btn_exit)
 
-        # Pages
+        # Pages: all'avvio solo un segnaposto leggero, le pagine vere su richiesta
         self.stack = QStackedWidget()
-        self.page_dash = DashboardPage()
-        self.page_hist = HistoryPage()
-        self.page_sett = SettingsPage()
-        self.page_sett.settings_applied.connect(self.on_settings_applied)
-
-        self.stack.addWidget(self.page_dash)
-        self.stack.addWidget(self.page_hist)
-        self.stack.addWidget(self.page_sett)
+        splash = QLabel("Avvio...")
+        splash.setAlignment(Qt.AlignCenter)
+        splash.setStyleSheet("font-size:22px; color:#94a3b8;")
+        self.stack.addWidget(splash)
+
+        # Banner allarmi sopra le pagine: visibile finche' c'e' un allarme attivo,
+        # un tocco lo nasconde fino al prossimo allarme
+        self.alert_banner = QPushButton("")
+        self.alert_banner.setMinimumHeight(48)
+        self.alert_banner.hide()
+        self.alert_banner.clicked.connect(self.alert_banner.hide)
+
+        right = QVBoxLayout()
+        right.setSpacing(10)
+        right.addWidget(self.alert_banner)
+        right.addWidget(self.stack, 1)
 
         root.addWidget(sidebar, 1)
-        root.addWidget(self.stack, 5)
+        root.addLayout(right, 5)
 
-        self.btn_dash.clicked.connect(lambda: self.stack.setCurrentWidget(self.page_dash))
-        self.btn_hist.clicked.connect(lambda: self.stack.setCurrentWidget(self.page_hist))
-        self.btn_sett.clicked.connect(lambda: self.stack.setCurrentWidget(self.page_sett))
+        self.btn_dash.clicked.connect(lambda: self.show_page("dash"))
+        self.btn_hist.clicked.connect(lambda: self.show_page("hist"))
+        self.btn_sett.clicked.connect(lambda: self.show_page("sett"))
+        self.btn_diag.clicked.connect(lambda: self.show_page("diag"))
         self.btn_exit.clicked.connect(self.close)
 
+    def page(self, name):
+        # -> pagina `name`, importata e costruita alla prima richiesta
+        attr = f"page_{name}"
+        page = getattr(self, attr)
+        if page is None:
+            module, cls = PAGES[name]
+            with instrument.timed(f"startup.page_{name}"):
+                page = getattr(importlib.import_module(module), cls)()
+            setattr(self, attr, page)
+            self.stack.addWidget(page)
+            self._wire(name)
+        return page
+
+    def _wire(self, name):
+        # collegamenti tra pagine, fatti quando entrambe le estremita' esistono
+        if name == "sett":
+            self.page_sett.settings_applied.connect(self.on_settings_applied)
+        if name == "dash":
+            self.page_dash.monitor.alert_received.connect(self.on_alert)
+        if self.page_dash is not None and self.page_sett is not None and name in ("dash", "sett"):
+            self.page_sett.reload_collector = self.page_dash.monitor.reload_collector
+        if self.page_dash is not None and self.page_hist is not None and name in ("dash", "hist"):
+            self.page_dash.monitor.sample_received.connect(self.page_hist.on_sample)
+
+    def show_page(self, name):
+        self.stack.setCurrentWidget(self.page(name))
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if "first_paint" not in instrument.marks():
+            instrument.mark("first_paint")
+            # il frame e' a schermo: ora il lavoro pesante
+            QTimer.singleShot(0, self._build_first_page)
+
+    def _build_first_page(self):
+        if self._started:
+            return
+        self._started = True
+        if self.stack.currentIndex() == 0:  # ancora il segnaposto
+            self.show_page("dash")
+        else:
+            self.page("dash")
+        self._start_lag_probe()
+        # interattivo = la coda eventi si svuota dopo la costruzione della dashboard
+        QTimer.singleShot(0, self._on_interactive)
+
+    def _on_interactive(self):
+        instrument.mark("interactive")
+        self.interactive.emit()
+
+    def _start_lag_probe(self):
+        self._lag_hist = instrument.histogram("gui.loop_lag")
+        self._probe_at = time.monotonic()
+        self.lag_timer = QTimer(self)
+        self.lag_timer.setTimerType(Qt.PreciseTimer)
+        self.lag_timer.timeout.connect(self._probe)
+        self.lag_timer.start(LAG_PROBE_MS)
+
+    def _probe(self):
+        now = time.monotonic()
+        lag_ms = (now - self._probe_at) * 1000.0 - LAG_PROBE_MS
+        self._probe_at = now
+        self._lag_hist.record(max(0.0, lag_ms))
+
+    def on_alert(self, event):
+        if event.state == "raised":
+            self._alerts[event.rule] = event
+        else:
+            self._alerts.pop(event.rule, None)
+        if not self._alerts:
+            self.alert_banner.hide()
+            return
+        # colore della severita' piu' alta tra gli allarmi attivi
+        worst = max(self._alerts.values(), key=lambda e: list(ALERT_COLORS).index(e.severity))
+        self.alert_banner.setStyleSheet(
+            f"font-size:18px; font-weight:600; color:#0b1220; background:{ALERT_COLORS[worst.severity]};"
+            " border-radius:10px; text-align:left; padding-left:12px;"
+        )
+        text = "  |  ".join(e.message for e in self._alerts.values())
+        self.alert_banner.setText(f"⚠ {text}")
+        if event.state == "raised":
+            self.alert_banner.show()
+
     def on_settings_applied(self, settings: dict):
         # refresh dashboard live
         try:
-            self.page_dash.monitor.apply_dashboard_refresh(int(settings.get("dashboard_refresh_ms", 1000)))
+            monitor = self.page("dash").monitor
+            monitor.apply_dashboard_refresh(int(settings.get("dashboard_refresh_ms", 1000)))
+            monitor.apply_sampling(int(settings.get("sampling_ms", 1000)),
+                                   bool(settings.get("adaptive_sampling", False)))
+            monitor.apply_retention(int(settings.get("retention_days", 7)))
+            monitor.apply_alert_rules(settings.get("alert_rules", []))
         except Exception:
             pass
 
+        # storico: ring dimensionati sull'intervallo di campionamento
+        if self.page_hist is not None:
+            self.page_hist.apply_sampling(int(settings.get("sampling_ms", 1000)),
+                                          bool(settings.get("adaptive_sampling", False)))
+
         # fullscreen live
         try:
             want_fullscreen = bool(settings.get("fullscreen", True))
@@ -101,4 +232,21 @@ class MainWindow(QWidget):
             self, "Conferma uscita", "Sei sicuro di voler uscire?",
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
         )
-        event.accept() if reply == QMessageBox.Yes else event.ignore()
\ No newline at end of file
+        if reply != QMessageBox.Yes:
+            event.ignore()
+            return
+        self.shutdown()
+        event.accept()
+
+    def shutdown(self):
+        if self.page_dash is not None:
+            self.page_dash.monitor.shutdown()
+        if self.page_hist is not None:
+            self.page_hist.shutdown()
+        if self.page_sett is not None:
+            self.page_sett.stop_export()
+        # profilo cProfile ancora attivo: salvato comunque
+        instrument.stop_profile()
+        # import qui: db_manager (numpy) non serve per il primo frame
+        from app.database.db_manager import close_db
+        close_db()
\ No newline at end of file
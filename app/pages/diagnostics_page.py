@@ -0,0 +1,133 @@
+import psutil
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton
+from PyQt5.QtCore import QTimer, Qt
+
+from app import instrument
+from app.database.db_manager import get_db
+from app.settings_store import load_settings
+
+
+class DiagnosticsPage(QWidget):
+    # Costo della dashboard stessa: latenze dei percorsi caldi, lag dell'event loop,
+    # commit DB, RSS/CPU del processo e cattura cProfile opzionale.
+
+    def __init__(self):
+        super().__init__()
+        self.db = get_db()
+        self.proc = psutil.Process()
+        self.proc.cpu_percent(None)  # prima chiamata: solo riferimento
+        # con il collector esterno collector.tick e' misurato nel processo del daemon
+        self._external = load_settings().get("collector", "embedded") == "external"
+
+        layout = QVBoxLayout(self)
+
+        header = QHBoxLayout()
+        title = QLabel("Diagnostica")
+        title.setStyleSheet("font-size:22px; font-weight:600;")
+        header.addWidget(title)
+        header.addStretch(1)
+
+        self.btn_profile = QPushButton("Profilo: avvia")
+        self.btn_profile.setMinimumHeight(50)
+        self.btn_profile.setStyleSheet("font-size:18px;")
+        self.btn_profile.clicked.connect(self.toggle_profile)
+        header.addWidget(self.btn_profile)
+
+        self.btn_reset = QPushButton("Azzera")
+        self.btn_reset.setMinimumHeight(50)
+        self.btn_reset.setStyleSheet("font-size:18px;")
+        self.btn_reset.clicked.connect(self.reset)
+        header.addWidget(self.btn_reset)
+        layout.addLayout(header)
+
+        self.summary_label = QLabel("")
+        self.summary_label.setStyleSheet("font-size:16px; color:#cbd5e1;")
+        self.summary_label.setTextFormat(Qt.RichText)
+        layout.addWidget(self.summary_label)
+
+        self.table_label = QLabel("")
+        self.table_label.setStyleSheet("font-size:14px; font-family:monospace; color:#cbd5e1;")
+        self.table_label.setTextFormat(Qt.RichText)
+        self.table_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        layout.addWidget(self.table_label, 1)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("font-size:14px; color:#94a3b8;")
+        layout.addWidget(self.status_label)
+
+        # il lag dell'event loop e' misurato da MainWindow fin dall'avvio (gui.loop_lag)
+        # aggiornamento della pagina solo quando e' visibile
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.setInterval(1000)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.timer.start()
+        self.refresh()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def reset(self):
+        instrument.reset()
+        self.refresh()
+
+    def toggle_profile(self):
+        if instrument.profiling():
+            path = instrument.stop_profile()
+            self.btn_profile.setText("Profilo: avvia")
+            self.status_label.setText(f"Profilo salvato: {path}")
+        else:
+            instrument.start_profile()
+            self.btn_profile.setText("Profilo: ferma")
+            self.status_label.setText("cProfile attivo sul thread GUI...")
+
+    def refresh(self):
+        hists, counters = instrument.snapshot()
+        empty = instrument.Histogram().snapshot()
+
+        def pct(name):
+            h = hists.get(name, empty)
+            return f"{h['p50_ms']:.1f} / {h['p99_ms']:.1f} ms"
+
+        try:
+            rss_mb = self.proc.memory_info().rss / (1024 * 1024)
+            cpu = self.proc.cpu_percent(None)
+            threads = self.proc.num_threads()
+        except psutil.Error:
+            rss_mb, cpu, threads = 0.0, 0.0, 0
+        commit = self.db.write_stats()
+        cont = self.db.contention_stats()
+        ww, rw = cont["write_wait"], cont["read_wait"]
+
+        lag = hists.get("gui.loop_lag", empty)
+        tick = "n/d (collector esterno)" if self._external else pct("collector.tick")
+        self.summary_label.setText(
+            f"Tick p50/p99: <b>{tick}</b> &nbsp;|&nbsp; "
+            f"Lag loop p50/p99: <b>{pct('gui.loop_lag')}</b> (max {lag['max_ms']:.0f} ms)<br>"
+            f"Commit DB p50/p99: <b>{pct('db.commit')}</b> ({commit['rows_per_commit']:.1f} righe) "
+            f"&nbsp;|&nbsp; RSS <b>{rss_mb:.1f} MB</b> &nbsp;|&nbsp; CPU <b>{cpu:.1f}%</b> "
+            f"&nbsp;|&nbsp; thread {threads}<br>"
+            f"Attesa lock scrittura avg/max: <b>{ww['avg_ms']:.1f} / {ww['max_ms']:.0f} ms</b> "
+            f"&nbsp;|&nbsp; attesa lettori avg/max: <b>{rw['avg_ms']:.1f} / {rw['max_ms']:.0f} ms</b> "
+            f"({cont['readers_free']}/{cont['readers']} liberi) &nbsp;|&nbsp; locked {cont['locked_errors']}"
+        )
+        marks = instrument.marks()
+        if marks:
+            steps = " &nbsp;|&nbsp; ".join(f"{name} {m['ms']:.0f} ms" for name, m in marks.items())
+            self.summary_label.setText(self.summary_label.text() + f"<br>Avvio: {steps}")
+
+        rows = ["<tr><th align='left'>percorso</th><th>n</th><th>p50 ms</th><th>p99 ms</th><th>max ms</th></tr>"]
+        for name, h in hists.items():
+            if not h["count"]:
+                continue
+            rows.append(
+                f"<tr><td>{name}</td><td align='right'>{h['count']}</td>"
+                f"<td align='right'>{h['p50_ms']:.2f}</td><td align='right'>{h['p99_ms']:.2f}</td>"
+                f"<td align='right'>{h['max_ms']:.1f}</td></tr>"
+            )
+        for name, n in sorted(counters.items()) + sorted(instrument.gauges().items()):
+            rows.append(f"<tr><td>{name}</td><td align='right'>{n}</td><td></td><td></td><td></td></tr>")
+        self.table_label.setText("<table cellspacing='6'>" + "".join(rows) + "</table>")
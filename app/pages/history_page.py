@@ -1,19 +1,74 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTabWidget
 )
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QEvent, QThread, QTimer, Qt, pyqtSignal
+import time
+import numpy as np
 import pyqtgraph as pg
 
-from app.database.db_manager import DBManager
+from app import instrument
+from app.database.db_manager import get_db
+from app.decimate import minmax_decimate, visible_slice
+from app.settings_store import load_settings
+from app.timeseries import (
+    COLUMNS, MetricRing, WindowCache, WindowSummary, break_gaps, gap_threshold, rows_to_arrays
+)
 from app.widgets.touch_picker import TouchPicker
+from app.workers.viewport_loader import TIER_MS, ViewportLoader, chunk_spans
+
+# blocchi incompleti (fino ad "adesso") riletti al massimo ogni N secondi
+PARTIAL_CHUNK_TTL_S = 10
+
+# punti della finestra mostrata: i preset che ne avrebbero di piu' leggono i rollup
+WINDOW_POINTS = 800
+
+# collector esterno: attesa massima perche' il daemon scriva le righe che ha in buffer
+BACKFILL_WAIT_S = 30
 
 
 class HistoryPage(QWidget):
+    # (generazione, risoluzione, [(inizio, fine), ...]) verso il ViewportLoader
+    fetch_requested = pyqtSignal(int, str, object)
+    # (generazione, chiave della finestra, dopo ts, prima di ts) verso il ViewportLoader
+    window_requested = pyqtSignal(int, object, object, object)
+
     def __init__(self):
         super().__init__()
-        self.db = DBManager()
+        self.db = get_db()
         self._range = "5 min"
 
+        settings = load_settings()
+        self._sampling_idle_ms = int(settings.get("sampling_idle_ms", 10000))
+        self._set_sampling(int(settings.get("sampling_ms", 1000)), bool(settings.get("adaptive_sampling", False)))
+        # campioni live arrivati durante il caricamento iniziale (aggiunti dopo le righe del DB)
+        self._held = None
+        # con il daemon db.flush() non svuota il suo buffer: i campioni live si disegnano
+        # subito e le righe che il DB non aveva ancora (_hole) si rileggono in seguito
+        self._external = settings.get("collector", "embedded") == "external"
+        self._hole = None   # [dopo ts, prima di ts, scadenza monotonic]
+        # bucket di rollup completi solo dopo il flush del collector
+        self._settle_ms = int(settings.get("db_flush_s", 10)) * 1000
+
+        # finestre gia' decodificate per intervallo: cambiare intervallo non rilegge il DB
+        budget = int(settings.get("history_cache_mb", 32)) * 1024 * 1024
+        self.cache = WindowCache(budget)
+        # blocchi dello storico navigato (swipe/pinch oltre la finestra): un quarto del budget
+        self.chunks = WindowCache(budget // 4)
+        self.loader = None
+        self._loader_thread = None
+        self._generation = 0
+        self._inflight = set()
+
+        # finestra mostrata (ring buffer dimensionato sull'intervallo)
+        # con le statistiche di riepilogo aggiornate a ogni campione
+        self.series = None
+        self._tier = "raw"
+        self._loaded = False
+        self._window_gen = 0
+        self._window_inflight = False
+        self._stale = False
+        self._live_at = 0.0
+
         layout = QVBoxLayout(self)
 
         header = QHBoxLayout()
@@ -27,6 +82,14 @@ class HistoryPage(QWidget):
         self.range_btn.setStyleSheet("font-size:18px;")
         self.range_btn.clicked.connect(self.pick_range)
 
+        # torna alla finestra che segue "adesso" dopo uno swipe/zoom
+        self.live_btn = QPushButton("Live")
+        self.live_btn.setMinimumHeight(50)
+        self.live_btn.setStyleSheet("font-size:18px;")
+        self.live_btn.setEnabled(False)
+        self.live_btn.clicked.connect(self.go_live)
+
+        header.addWidget(self.live_btn)
         header.addWidget(self.range_btn)
         layout.addLayout(header)
 
@@ -41,14 +104,14 @@ class HistoryPage(QWidget):
         layout.addWidget(self.tabs)
 
         # ---- SISTEMA TAB ----
-        self.system_plot = pg.PlotWidget()
+        self.system_plot = pg.PlotWidget(axisItems={"bottom": pg.DateAxisItem(orientation="bottom")})
         self.system_plot.showGrid(x=True, y=True, alpha=0.25)
         self.system_plot.setLabel("left", "CPU/RAM %")
         self.system_plot.setLabel("bottom", "tempo")
         self.system_plot.addLegend(offset=(10, 10))
 
-        self.cpu_curve = self.system_plot.plot([], pen=pg.mkPen(width=2), name="CPU %")
-        self.ram_curve = self.system_plot.plot([], pen=pg.mkPen(width=2, style=pg.QtCore.Qt.DashLine), name="RAM %")
+        self.cpu_curve = self.system_plot.plot([], pen=pg.mkPen(width=2), name="CPU %", connect="finite")
+        self.ram_curve = self.system_plot.plot([], pen=pg.mkPen(width=2, style=pg.QtCore.Qt.DashLine), name="RAM %", connect="finite")
 
         self.temp_vb = pg.ViewBox()
         self.system_plot.showAxis("right")
@@ -57,28 +120,55 @@ class HistoryPage(QWidget):
         self.system_plot.getAxis("right").linkToView(self.temp_vb)
         self.temp_vb.setXLink(self.system_plot)
 
-        self.temp_curve = pg.PlotDataItem([], pen=pg.mkPen(width=2), name="TEMP °C")
+        self.temp_curve = pg.PlotDataItem([], pen=pg.mkPen(width=2), name="TEMP °C", connect="finite")
         self.temp_vb.addItem(self.temp_curve)
 
         self.system_plot.getViewBox().sigResized.connect(self._update_system_views)
         self.tabs.addTab(self.system_plot, "Sistema")
 
         # ---- RETE TAB ----
-        self.net_plot = pg.PlotWidget()
+        self.net_plot = pg.PlotWidget(axisItems={"bottom": pg.DateAxisItem(orientation="bottom")})
         self.net_plot.showGrid(x=True, y=True, alpha=0.25)
         self.net_plot.setLabel("left", "KB/s")
         self.net_plot.setLabel("bottom", "tempo")
         self.net_plot.addLegend(offset=(10, 10))
 
-        self.down_curve = self.net_plot.plot([], pen=pg.mkPen(width=2), name="Download ↓")
-        self.up_curve = self.net_plot.plot([], pen=pg.mkPen(width=2, style=pg.QtCore.Qt.DashLine), name="Upload ↑")
+        self.down_curve = self.net_plot.plot([], pen=pg.mkPen(width=2), name="Download ↓", connect="finite")
+        self.up_curve = self.net_plot.plot([], pen=pg.mkPen(width=2, style=pg.QtCore.Qt.DashLine), name="Upload ↑", connect="finite")
 
         self.tabs.addTab(self.net_plot, "Rete")
 
+        # ---- RIEPILOGO dell'intervallo selezionato ----
+        self.summary_label = QLabel("")
+        self.summary_label.setStyleSheet("font-size:16px; color:#cbd5e1;")
+        self.summary_label.setTextFormat(Qt.RichText)
+        layout.addWidget(self.summary_label)
+
+        # pan/zoom solo sull'asse del tempo; ad ogni cambio vista si ridecima sui pixel visibili.
+        # Swipe = trascinamento, zoom = pinch (o rotella); le due schede condividono l'asse
+        self.net_plot.setXLink(self.system_plot)
+        self._x = None
+        self._follow = True
+        self._pinch_targets = {}
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.setInterval(30)
+        self._redraw_timer.timeout.connect(self._redraw)
+        for plot in (self.system_plot, self.net_plot):
+            plot.setMouseEnabled(x=True, y=False)
+            plot.getViewBox().sigRangeChangedManually.connect(self._on_manual_range)
+            plot.getViewBox().sigXRangeChanged.connect(lambda *_: self._redraw_timer.start())
+            viewport = plot.viewport()
+            viewport.setAttribute(Qt.WA_AcceptTouchEvents)
+            viewport.grabGesture(Qt.PinchGesture)
+            viewport.installEventFilter(self)
+            self._pinch_targets[viewport] = plot
+
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.refresh)
         self.timer.start(2000)
 
+        self._reset_window()
         self.refresh()
 
     def pick_range(self):
@@ -90,9 +180,17 @@ class HistoryPage(QWidget):
         if dlg.exec_() and dlg.choice:
             self._range = dlg.choice
             self.range_btn.setText(f"Intervallo: {self._range}")
+            self._follow = True
+            self.live_btn.setEnabled(False)
+            self._reset_window()
             self.refresh()
 
-    def _rows_for_range(self):
+    def go_live(self):
+        self._follow = True
+        self.live_btn.setEnabled(False)
+        self._update_view(True)
+
+    def _seconds_for_range(self):
         mapping = {
             "5 min": 300,
             "30 min": 1800,
@@ -101,46 +199,388 @@ class HistoryPage(QWidget):
         }
         return mapping.get(self._range, 300)
 
+    def _set_sampling(self, sampling_ms, adaptive):
+        self._sampling_ms = max(1, int(sampling_ms))
+        # oltre questo intervallo tra due campioni il traffico non e' stimabile (buco)
+        self._interval_ms = max(self._sampling_ms, self._sampling_idle_ms) if adaptive else self._sampling_ms
+        self._max_gap_s = max(5.0, 3 * self._interval_ms / 1000.0)
+
+    def apply_sampling(self, sampling_ms, adaptive=False):
+        # le finestre in cache sono dimensionate sul vecchio intervallo: si ricreano
+        old = (self._sampling_ms, self._max_gap_s)
+        self._set_sampling(sampling_ms, adaptive)
+        if (self._sampling_ms, self._max_gap_s) == old:
+            return
+        self.cache.clear()
+        self._reset_window()
+        self.refresh()
+
+    def _capacity_for_range(self):
+        # un punto per campione (grezzi, al sampling_ms configurato) o per bucket (rollup),
+        # +25% di margine: l'eviction vera e' per tempo (drop_before), non per conteggio
+        step_ms = self._sampling_ms if self._tier == "raw" else TIER_MS[self._tier]
+        return int(self._seconds_for_range() * 1000 / step_ms * 1.25) + 10
+
+    def _new_ring(self):
+        # nei rollup un buco e' piu' lungo di qualche bucket, non di qualche campione
+        max_gap_s = max(self._max_gap_s, 3 * TIER_MS[self._tier] / 1000)
+        return MetricRing(self._capacity_for_range(), WindowSummary(max_gap_s))
+
     def _update_system_views(self):
         self.temp_vb.setGeometry(self.system_plot.getViewBox().sceneBoundingRect())
         self.temp_vb.linkedViewChanged(self.system_plot.getViewBox(), self.temp_vb.XAxis)
 
+    def _reset_window(self):
+        # finestra dell'intervallo scelto: dalla cache, ritagliata da una piu' ampia
+        # o nuova; in tutti i casi il DB fornisce poi solo le righe mancanti
+        seconds = self._seconds_for_range()
+        self._tier = self.db.pick_tier(seconds * 1000, WINDOW_POINTS)
+        key = (seconds, self._tier)
+        ring = self.cache.get(key)
+        if ring is not None:
+            instrument.count("history.cache_hit")
+        else:
+            instrument.count("history.cache_miss")
+            ring = self._new_ring()
+            wider = self.cache.covering(key)
+            if wider is not None:
+                self.cache.slices += 1
+                ts = wider.ts()
+                i = int(np.searchsorted(ts, ts[-1] - seconds * 1000, side="left"))
+                ring.extend(ts[i:], wider.values()[i:])
+            self.cache.put(key, ring)
+            instrument.gauge("history.cache_kb", self.cache.nbytes() // 1024)
+        self.series = ring
+        self._loaded = False
+        self._x = None
+        self._gap = None
+        # le letture ancora in volo sono della finestra precedente
+        self._window_gen += 1
+        self._window_inflight = False
+        self._held = None
+        self._hole = None
+
+    def _feed(self, ts, values):
+        # campioni nuovi a tutte le finestre in cache, non solo a quella mostrata
+        if not len(ts):
+            return
+        for (seconds, resolution), ring in self.cache.items():
+            if resolution != "raw":
+                continue  # le finestre dai rollup ricevono dal DB i bucket chiusi
+            last = ring.last_ts()
+            if ring is self.series:
+                if not self._loaded:
+                    continue  # il caricamento iniziale arriva da refresh()
+            elif last is None:
+                continue
+            i = 0 if last is None else int(np.searchsorted(ts, last, side="right"))
+            ring.extend(ts[i:], values[i:])
+            if ring is not self.series:
+                ring.drop_before(int(ts[-1]) - seconds * 1000)
+
+    def _on_manual_range(self, *_):
+        # l'utente ha spostato/zoomato: non riportare la vista su "adesso"
+        self._follow = False
+        self.live_btn.setEnabled(True)
+
+    def eventFilter(self, obj, event):
+        # pinch sul grafico: zoom sull'asse del tempo attorno al centro delle dita
+        plot = self._pinch_targets.get(obj)
+        if plot is not None and event.type() == QEvent.Gesture:
+            pinch = event.gesture(Qt.PinchGesture)
+            if pinch is not None:
+                factor = pinch.scaleFactor()
+                if factor > 0:
+                    vb = plot.getViewBox()
+                    pos = obj.mapFromGlobal(pinch.centerPoint().toPoint())
+                    vb.scaleBy(x=1.0 / factor, y=1.0, center=vb.mapSceneToView(plot.mapToScene(pos)))
+                    self._on_manual_range()
+                event.accept()
+                return True
+        return super().eventFilter(obj, event)
+
+    def _start_loader(self):
+        # thread di lettura creato alla prima lettura (finestra o blocchi dello storico)
+        if self.loader is not None:
+            return
+        self._loader_thread = QThread(self)
+        self.loader = ViewportLoader()
+        self.loader.moveToThread(self._loader_thread)
+        self.fetch_requested.connect(self.loader.fetch)
+        self.window_requested.connect(self.loader.load_window)
+        self.loader.loaded.connect(self._on_chunk)
+        self.loader.window_loaded.connect(self._on_window)
+        self._loader_thread.start()
+
+    def shutdown(self):
+        if self._loader_thread is None:
+            return
+        self.loader.generation = -1  # abbandona le richieste ancora in coda
+        self._loader_thread.quit()
+        self._loader_thread.wait()
+
+    def _request(self, tier, spans):
+        # nuova generazione = le richieste precedenti non ancora servite sono superate
+        keys = {(start, tier) for start, _ in spans}
+        if not keys or keys <= self._inflight:
+            return
+        self._start_loader()
+        self._generation += 1
+        self.loader.generation = self._generation
+        self._inflight = keys
+        self.fetch_requested.emit(self._generation, tier, spans)
+
+    def _on_chunk(self, chunk):
+        self.chunks.put((chunk.start_ms, chunk.tier), chunk)
+        self._inflight.discard((chunk.start_ms, chunk.tier))
+        instrument.gauge("history.viewport_kb", self.chunks.nbytes() // 1024)
+        if not self._follow or self._tier != "raw":
+            self._redraw_timer.start()
+
+    def _request_window(self):
+        # righe mancanti della finestra mostrata, lette nel thread del loader
+        if self._window_inflight:
+            return
+        seconds = self._seconds_for_range()
+        now_ms = int(time.time() * 1000)
+        start_ms = now_ms - seconds * 1000
+        last_ts = self.series.last_ts()
+        after = start_ms - 1 if last_ts is None else max(start_ms - 1, last_ts)
+        until = now_ms + 1
+        if self._tier != "raw":
+            # solo bucket chiusi e gia' scritti dal collector
+            bucket = TIER_MS[self._tier]
+            until = ((now_ms - self._settle_ms) // bucket) * bucket
+            if self._loaded and last_ts is not None and until <= last_ts + bucket:
+                return
+        elif not self._loaded:
+            self._held = []  # campioni live che arrivano durante la lettura
+        self._start_loader()
+        self._window_inflight = "window"
+        self.window_requested.emit(self._window_gen, (seconds, self._tier), after, until)
+
+    def _mark_hole(self, after_ms, before_ms):
+        # righe in (after_ms, before_ms) ancora nel buffer del daemon: si rileggono a ogni
+        # refresh() finche' arrivano o per BACKFILL_WAIT_S (poi resta un buco vero)
+        if self._hole is not None:
+            after_ms, before_ms = min(after_ms, self._hole[0]), max(before_ms, self._hole[1])
+        self._hole = [after_ms, before_ms, time.monotonic() + BACKFILL_WAIT_S]
+
+    def _request_hole(self):
+        if self._window_inflight:
+            return
+        after, before, _ = self._hole
+        self._start_loader()
+        self._window_inflight = "hole"
+        self.window_requested.emit(self._window_gen, (self._seconds_for_range(), "raw"), after, before)
+
+    def _fill_hole(self, load):
+        # righe del buco in tutte le finestre grezze in cache che le coprono
+        if len(load.ts):
+            for (_, resolution), ring in self.cache.items():
+                if resolution != "raw" or not len(ring):
+                    continue
+                i = int(np.searchsorted(load.ts, ring.ts()[0], side="left"))
+                ring.merge(load.ts[i:], load.values[i:])
+            self._hole[0] = int(load.ts[-1])
+        after, before, deadline = self._hole
+        if before - after <= 1.5 * self._interval_ms or time.monotonic() >= deadline:
+            self._hole = None
+
+    def _on_window(self, load):
+        if load.generation != self._window_gen:
+            return  # intervallo cambiato nel frattempo
+        kind, self._window_inflight = self._window_inflight, False
+        if kind == "hole":
+            self._fill_hole(load)
+        elif self._loaded and self._tier == "raw":
+            # stream live assente: righe nuove anche alle altre finestre in cache
+            self._feed(load.ts, load.values)
+        else:
+            last = self.series.last_ts()
+            i = 0 if last is None else int(np.searchsorted(load.ts, last, side="right"))
+            self.series.extend(load.ts[i:], load.values[i:])
+        if not self._loaded:
+            self._loaded = True
+            self._gap = None
+            if self._held is not None:
+                held, self._held = self._held, None
+                last_ts = self.series.last_ts()
+                self._feed(*rows_to_arrays(held))
+                if held and self._external:
+                    start_ms = held[0][0] - self._seconds_for_range() * 1000
+                    self._check_hole(start_ms if last_ts is None else last_ts, held[0][0])
+        if self.isVisible():
+            self._update_view(True)
+        else:
+            self._stale = True
+
+    def _viewport(self, x0, x1):
+        # -> (x secondi, valori (n, 5)) dai blocchi gia' letti alla risoluzione della vista;
+        # quelli mancanti (e uno per lato, in anticipo) sono chiesti al ViewportLoader
+        start_ms, end_ms = int(x0 * 1000), int(x1 * 1000)
+        px = max(50, int(self.system_plot.getViewBox().width()))
+        tier = self.db.pick_tier(end_ms - start_ms, px)
+        spans = chunk_spans(start_ms, end_ms, tier, prefetch=1)
+        visible = len(spans) - 2
+        now = time.time()
+        parts, missing = [], []
+        for i, (start, end) in enumerate(spans):
+            if start > now * 1000:
+                continue  # futuro
+            chunk = self.chunks.get((start, tier))
+            if chunk is None or (not chunk.complete and now - chunk.read_at > PARTIAL_CHUNK_TTL_S):
+                missing.append((start, end))
+            if chunk is not None and i < visible and len(chunk):
+                parts.append(chunk)
+        self._request(tier, missing)
+        if not parts:
+            return None, None
+        parts.sort(key=lambda c: c.start_ms)
+        ts = np.concatenate([c.ts for c in parts])
+        return ts / 1000.0, np.concatenate([c.values for c in parts])
+
+    @instrument.traced("history.sample")
+    def on_sample(self, sample):
+        # stream live: il campione arriva appena prodotto, senza rileggere il DB
+        ts = int(sample.ts * 1000)
+        row = (ts, sample.cpu, sample.ram, sample.temp, sample.up_kb, sample.down_kb)
+        if self._tier != "raw":
+            # finestra dai rollup: il campione va solo alle finestre grezze in cache
+            self._feed(*rows_to_arrays([row]))
+            if self.isVisible():
+                self._update_view(False)
+            return
+        if self._held is not None:
+            # caricamento iniziale in corso: il campione va in coda alle righe del DB
+            self._held.append(row)
+            self._feed(*rows_to_arrays([row]))
+            return
+        last_ts = self.series.last_ts()
+        self._feed(*rows_to_arrays([row]))
+        if not self._loaded or (last_ts is not None and ts <= last_ts):
+            return
+        if self._external and last_ts is not None:
+            self._check_hole(last_ts, ts)
+        self._live_at = time.monotonic()
+        if self.isVisible():
+            self._update_view(True)
+        else:
+            # pagina nascosta: si accumula soltanto, il disegno alla prossima showEvent
+            self._stale = True
+
+    def _check_hole(self, last_ts, ts):
+        # salto piu' lungo dell'intervallo di campionamento tra l'ultima riga e il campione live
+        if ts - last_ts > 1.5 * self._interval_ms:
+            self._mark_hole(last_ts, ts)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.timer.start()
+        self.refresh()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    @instrument.traced("history.refresh")
     def refresh(self):
-        n = self._rows_for_range()
-        rows = self.db.last_n(n)
-        if not rows:
+        if not self.isVisible():
             return
+        # finestra nuova (dalla cache: solo le righe dopo l'ultimo campione), bucket di
+        # rollup chiusi o stream live assente: lettura nel thread del loader (_on_window)
+        if not self._loaded or self._tier != "raw" or time.monotonic() - self._live_at > 5:
+            self._request_window()
+        elif self._hole is not None:
+            self._request_hole()
+        changed, self._stale = self._stale, False
+        self._update_view(changed)
 
-        x = list(range(len(rows)))
-        cpu, ram, temp, up, down = [], [], [], [], []
+    def _update_view(self, changed):
+        now = time.time()
+        start_ms = int((now - self._seconds_for_range()) * 1000)
+        dropped = self.series.drop_before(start_ms)
 
-        for r in rows:
-            cpu.append(r[1] or 0)
-            ram.append(r[2] or 0)
+        if self._follow:
+            for plot in (self.system_plot, self.net_plot):
+                plot.setXRange(start_ms / 1000, now, padding=0)
 
-            t = r[3]
-            if t is None or (isinstance(t, (int, float)) and t < 0):
-                temp.append(float("nan"))
-            else:
-                temp.append(t)
+        if not (changed or dropped):
+            return
+        self._update_summary()
+        if not len(self.series):
+            self._x = None
+            return
 
-            up.append(r[4] or 0)
-            down.append(r[5] or 0)
+        self._x = self.series.ts() / 1000.0
+        if self._gap is None:
+            # soglia dei buchi (mediana degli intervalli): solo a ogni caricamento della finestra
+            self._gap = gap_threshold(self._x)
+        self._redraw()
 
-        self.cpu_curve.setData(x, cpu)
-        self.ram_curve.setData(x, ram)
-        self.temp_curve.setData(x, temp)
+        # limiti degli assi dal WindowSummary: niente scansione della finestra a ogni campione
+        lo, hi = self.series.summary.extremes(self.series)
+        temp = COLUMNS.index("temp")
 
         self.system_plot.setYRange(0, 100)
 
-        valid_t = [t for t in temp if t == t]
-        if valid_t:
-            tmin, tmax = min(valid_t), max(valid_t)
+        if not np.isnan(hi[temp]):
+            tmin, tmax = float(lo[temp]), float(hi[temp])
             pad = max(2.0, (tmax - tmin) * 0.15)
             self.temp_vb.setYRange(tmin - pad, tmax + pad)
 
-        self.down_curve.setData(x, down)
-        self.up_curve.setData(x, up)
+        vmax = max(float(hi[COLUMNS.index("down_kb")]), float(hi[COLUMNS.index("up_kb")]))
+        self.net_plot.setYRange(0, max(10, vmax * 1.2))
 
-        vmax = max(down + up) if (down or up) else 10
-        self.net_plot.setYRange(0, max(10, vmax * 1.2))
\ No newline at end of file
+    @instrument.traced("history.redraw")
+    def _redraw(self):
+        # DB -> ring -> (slice visibile + decimazione min/max) -> setData;
+        # vista piu' indietro della finestra in memoria: blocchi del ViewportLoader
+        self._redraw_timer.stop()
+        (x0, x1), _ = self.system_plot.getViewBox().viewRange()
+        x_all = None
+        # preset lunghi: inviluppo min/max dei rollup (il ring ha solo le medie per bucket)
+        if self._tier != "raw" or (not self._follow and (self._x is None or x0 < self._x[0])):
+            x_all, values = self._viewport(x0, x1)
+        if x_all is not None:
+            base_gap = gap_threshold(x_all)
+            column = lambda col: values[:, COLUMNS.index(col)]  # noqa: E731
+        elif self._x is not None:
+            # blocchi non ancora arrivati: intanto la finestra in memoria
+            x_all, base_gap = self._x, self._gap
+            column = self.series.column
+        else:
+            return
+
+        groups = (
+            (self.system_plot, ((self.cpu_curve, "cpu"), (self.ram_curve, "ram"), (self.temp_curve, "temp"))),
+            (self.net_plot, ((self.down_curve, "down_kb"), (self.up_curve, "up_kb"))),
+        )
+        for plot, curves in groups:
+            vb = plot.getViewBox()
+            (x0, x1), _ = vb.viewRange()
+            i0, i1 = visible_slice(x_all, x0, x1)
+            px = max(50, int(vb.width()))
+            # dopo la decimazione due punti vicini distano fino a ~2 bin
+            gap = max(base_gap, 2.5 * (x1 - x0) / px)
+            for curve, col in curves:
+                x, y = minmax_decimate(x_all[i0:i1], column(col)[i0:i1], px)
+                x, (y,) = break_gaps(x, [y], gap)
+                curve.setData(x, y)
+
+    @instrument.traced("history.summary")
+    def _update_summary(self):
+        st = self.series.summary.result(self.series)
+        if st is None:
+            self.summary_label.setText("Nessun dato nell'intervallo" if self._loaded else "Caricamento...")
+            return
+        temp = "N/A" if st["temp_max"] is None else f"{st['temp_max']:.1f}°C"
+        gaps = ""
+        if st["gaps"]:
+            gaps = f" &nbsp;|&nbsp; buchi: {st['gaps']} ({st['gap_s'] / 60:.0f} min)"
+        self.summary_label.setText(
+            f"CPU min/media/max/p95: <b>{st['cpu_min']:.0f} / {st['cpu_avg']:.0f} / "
+            f"{st['cpu_max']:.0f} / {st['cpu_p95']:.0f}%</b> &nbsp;|&nbsp; "
+            f"RAM media <b>{st['ram_avg']:.0f}%</b> &nbsp;|&nbsp; TEMP max <b>{temp}</b><br>"
+            f"Traffico: <b>{st['down_mb']:.1f} MB ↓ &nbsp;{st['up_mb']:.1f} MB ↑</b>{gaps}"
+        )
@@ -1,27 +1,48 @@
-from pathlib import Path
-import csv
-from datetime import datetime
+import time
 
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QMessageBox, QCheckBox, QSpinBox
+    QPushButton, QMessageBox, QCheckBox, QSpinBox, QProgressBar
 )
-from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtCore import pyqtSignal, QThread
 
 from app.settings_store import load_settings, save_settings
-from app.database.db_manager import DBManager
+from app.database.db_manager import METRICS
+from app.workers.export_worker import ExportWorker
 from app.widgets.touch_picker import TouchPicker
 
+# intervallo export -> secondi (None = tutta la retention)
+EXPORT_RANGES = {
+    "5 min": 300,
+    "30 min": 1800,
+    "2 ore": 7200,
+    "12 ore": 43200,
+    "24 ore": 86400,
+    "7 giorni": 7 * 86400,
+    "30 giorni": 30 * 86400,
+    "Tutto": None,
+}
+
+EXPORT_FORMATS = {"CSV": "csv", "CSV.gz": "csv.gz", "NPZ": "npz"}
+
+# campionamento (scrittura su DB), indipendente dal refresh grafico
+SAMPLING_RATES = {"1s": 1000, "2s": 2000, "5s": 5000, "10s": 10000}
+
 
 class SettingsPage(QWidget):
     settings_applied = pyqtSignal(dict)
 
     def __init__(self):
         super().__init__()
-        self.db = DBManager()
         self.settings = load_settings()
         self._refresh = "1s"
+        self._sampling = "1s"
         self._export_range = "5 min"
+        self._export_format = "CSV"
+        self._export_thread = None
+        self._export_worker = None
+        # collegato da MainWindow: con il collector esterno invia "reload" al daemon
+        self.reload_collector = None
         self._build_ui()
 
     def _build_ui(self):
@@ -38,6 +59,14 @@ class SettingsPage(QWidget):
         self.refresh_btn.setStyleSheet("font-size:20px;")
         self.refresh_btn.clicked.connect(self.pick_refresh)
         row1.addWidget(self.refresh_btn)
+        self.sampling_btn = QPushButton(f"Campionamento: {self._sampling}")
+        self.sampling_btn.setMinimumHeight(60)
+        self.sampling_btn.setStyleSheet("font-size:20px;")
+        self.sampling_btn.clicked.connect(self.pick_sampling)
+        row1.addWidget(self.sampling_btn)
+        self.adaptive_chk = QCheckBox("Adattivo")
+        self.adaptive_chk.setStyleSheet("font-size:20px;")
+        row1.addWidget(self.adaptive_chk)
         row1.addStretch(1)
         layout.addLayout(row1)
 
@@ -62,7 +91,7 @@ class SettingsPage(QWidget):
 
         # Export
         row4 = QHBoxLayout()
-        self.export_btn = QPushButton(f"Export CSV: {self._export_range}")
+        self.export_btn = QPushButton(f"Export: {self._export_range}")
         self.export_btn.setMinimumHeight(60)
         self.export_btn.setStyleSheet("font-size:20px;")
         self.export_btn.clicked.connect(self.pick_export)
@@ -70,11 +99,33 @@ class SettingsPage(QWidget):
         self.btn_export.setMinimumHeight(60)
         self.btn_export.setStyleSheet("font-size:20px;")
         self.btn_export.clicked.connect(self.export_csv)
+        self.format_btn = QPushButton(f"Formato: {self._export_format}")
+        self.format_btn.setMinimumHeight(60)
+        self.format_btn.setStyleSheet("font-size:20px;")
+        self.format_btn.clicked.connect(self.pick_format)
         row4.addWidget(self.export_btn)
+        row4.addWidget(self.format_btn)
         row4.addWidget(self.btn_export)
         row4.addStretch(1)
         layout.addLayout(row4)
 
+        # Metriche da esportare + avanzamento
+        row5 = QHBoxLayout()
+        self.metric_chks = {}
+        for m in METRICS:
+            chk = QCheckBox(m)
+            chk.setChecked(True)
+            chk.setStyleSheet("font-size:18px;")
+            self.metric_chks[m] = chk
+            row5.addWidget(chk)
+        row5.addStretch(1)
+        layout.addLayout(row5)
+
+        self.export_progress = QProgressBar()
+        self.export_progress.setMinimumHeight(30)
+        self.export_progress.hide()
+        layout.addWidget(self.export_progress)
+
         # Save
         self.btn_save = QPushButton("Salva e Applica")
         self.btn_save.setMinimumHeight(70)
@@ -96,6 +147,12 @@ class SettingsPage(QWidget):
             self._refresh = "5s"
 
         self.refresh_btn.setText(f"Refresh dashboard: {self._refresh}")
+
+        sampling_ms = self.settings.get("sampling_ms", 1000)
+        self._sampling = next((k for k, v in SAMPLING_RATES.items() if sampling_ms <= v), "10s")
+        self.sampling_btn.setText(f"Campionamento: {self._sampling}")
+        self.adaptive_chk.setChecked(self.settings.get("adaptive_sampling", False))
+
         self.fullscreen_chk.setChecked(self.settings.get("fullscreen", True))
         self.retention_spin.setValue(self.settings.get("retention_days", 7))
 
@@ -105,42 +162,106 @@ class SettingsPage(QWidget):
             self._refresh = dlg.choice
             self.refresh_btn.setText(f"Refresh dashboard: {self._refresh}")
 
+    def pick_sampling(self):
+        dlg = TouchPicker("Campionamento", list(SAMPLING_RATES), self)
+        if dlg.exec_() and dlg.choice:
+            self._sampling = dlg.choice
+            self.sampling_btn.setText(f"Campionamento: {self._sampling}")
+
     def pick_export(self):
-        dlg = TouchPicker("Export intervallo", ["5 min", "30 min", "2 ore", "12 ore"], self)
+        dlg = TouchPicker("Export intervallo", list(EXPORT_RANGES), self)
         if dlg.exec_() and dlg.choice:
             self._export_range = dlg.choice
-            self.export_btn.setText(f"Export CSV: {self._export_range}")
+            self.export_btn.setText(f"Export: {self._export_range}")
+
+    def pick_format(self):
+        dlg = TouchPicker("Formato export", list(EXPORT_FORMATS), self)
+        if dlg.exec_() and dlg.choice:
+            self._export_format = dlg.choice
+            self.format_btn.setText(f"Formato: {self._export_format}")
 
     def save_and_apply(self):
         refresh_map = {"1s": 1000, "2s": 2000, "5s": 5000}
 
         self.settings["dashboard_refresh_ms"] = refresh_map[self._refresh]
+        self.settings["sampling_ms"] = SAMPLING_RATES[self._sampling]
+        self.settings["adaptive_sampling"] = self.adaptive_chk.isChecked()
         self.settings["fullscreen"] = self.fullscreen_chk.isChecked()
         self.settings["retention_days"] = self.retention_spin.value()
 
         save_settings(self.settings)
         self.settings_applied.emit(self.settings)
 
-        QMessageBox.information(self, "OK", "Impostazioni salvate e applicate.")
+        if self.settings.get("collector", "embedded") != "external":
+            QMessageBox.information(self, "OK", "Impostazioni salvate e applicate.")
+        elif self.reload_collector is not None and self.reload_collector():
+            QMessageBox.information(self, "OK", "Impostazioni salvate e inviate al collector esterno.")
+        else:
+            QMessageBox.warning(
+                self, "Collector esterno",
+                "Impostazioni salvate, ma il collector esterno non e' raggiungibile:\n"
+                "campionamento e retention verranno applicati al suo riavvio."
+            )
 
     def export_csv(self):
-        sec_map = {"5 min": 300, "30 min": 1800, "2 ore": 7200, "12 ore": 43200}
-        n = sec_map.get(self._export_range, 300)
+        if self._export_thread is not None:
+            # secondo tocco durante l'export = annulla
+            self._export_worker.cancel()
+            return
 
-        rows = self.db.last_n(n)
-        if not rows:
-            QMessageBox.warning(self, "Vuoto", "Nessun dato nel database.")
+        columns = [m for m, chk in self.metric_chks.items() if chk.isChecked()]
+        if not columns:
+            QMessageBox.warning(self, "Export", "Seleziona almeno una metrica.")
             return
 
-        exports_dir = Path.home() / "touchui" / "exports"
-        exports_dir.mkdir(parents=True, exist_ok=True)
+        end_ms = int(time.time() * 1000)
+        seconds = EXPORT_RANGES.get(self._export_range, 300)
+        start_ms = 0 if seconds is None else end_ms - seconds * 1000
+
+        self._export_worker = ExportWorker(
+            start_ms, end_ms, columns, EXPORT_FORMATS[self._export_format]
+        )
+        self._export_thread = QThread(self)
+        self._export_worker.moveToThread(self._export_thread)
+        self._export_thread.started.connect(self._export_worker.run)
+        self._export_worker.progress.connect(self._on_export_progress)
+        self._export_worker.finished.connect(self._on_export_finished)
+        self._export_worker.failed.connect(self._on_export_failed)
+
+        self.export_progress.setValue(0)
+        self.export_progress.show()
+        self.btn_export.setText("Annulla")
+        self._export_thread.start()
 
-        fname = exports_dir / f"metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    def _on_export_progress(self, done, total):
+        self.export_progress.setMaximum(max(1, total))
+        self.export_progress.setValue(done)
 
-        with fname.open("w", newline="") as f:
-            w = csv.writer(f)
-            w.writerow(["ts", "cpu", "ram", "temp", "up_kb", "down_kb"])
-            for r in rows:
-                w.writerow(r)
+    def _end_export(self):
+        self._export_thread.quit()
+        self._export_thread.wait()
+        self._export_thread = None
+        self._export_worker = None
+        self.export_progress.hide()
+        self.btn_export.setText("Esporta")
+
+    def stop_export(self):
+        # uscita durante un export: annulla e attende il thread (niente QThread distrutto
+        # mentre gira); i segnali ancora in coda non devono aprire dialog a finestra chiusa
+        if self._export_thread is None:
+            return
+        for sig in (self._export_worker.progress, self._export_worker.finished, self._export_worker.failed):
+            sig.disconnect()
+        self._export_worker.cancel()
+        self._end_export()
+
+    def _on_export_finished(self, path):
+        self._end_export()
+        if not path:
+            QMessageBox.warning(self, "Vuoto", "Nessun dato esportato.")
+            return
+        QMessageBox.information(self, "Export completato", f"Creato:\n{path}")
 
-        QMessageBox.information(self, "Export completato", f"Creato:\n{fname}")
\ No newline at end of file
+    def _on_export_failed(self, err):
+        self._end_export()
+        QMessageBox.critical(self, "Errore export", err)
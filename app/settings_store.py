@@ -4,9 +4,52 @@ from pathlib import Path
 SETTINGS_PATH = Path.home() / "touchui" / "settings.json"
 
 DEFAULTS = {
+    # refresh grafico della dashboard (render) e campionamento/salvataggio sono separati
     "dashboard_refresh_ms": 1000,
+    "sampling_ms": 1000,
+    # campionamento adattivo: sampling_ms durante picchi, fino a sampling_idle_ms a riposo
+    "adaptive_sampling": False,
+    "sampling_idle_ms": 10000,
     "retention_days": 7,
+    "retention_batch_rows": 2000,
+    # archivio compresso: blocchi da archive_block_s piu' vecchi di archive_after_h (0 = spento)
+    "archive_after_h": 24,
+    "archive_block_s": 3600,
     "fullscreen": True,
+    # "embedded": campiona la GUI; "external": campiona `python -m app.collector`
+    "collector": "embedded",
+    # stream live dei campioni su socket Unix (vuoto = ~/touchui/live.sock)
+    "ipc_publish": True,
+    "ipc_socket": "",
+    # scrittura DB: WAL + synchronous=NORMAL, commit ogni N campioni o T secondi
+    "db_wal": True,
+    "db_flush_rows": 10,
+    "db_flush_s": 10,
+    "db_readers": 2,
+    # stato rete: cache nmcli (secondi) + eventi da `nmcli monitor`
+    "net_cache_ttl_s": 10,
+    "net_monitor": True,
+    # lettura metriche: "procfs" (fd aperti + pread), "psutil", "auto" = procfs se c'e' /proc
+    "sampler_backend": "auto",
+    # storico: finestre decodificate tenute in memoria tra un cambio intervallo e l'altro
+    "history_cache_mb": 32,
+    # collector di metriche estese attivi (vedi app/workers/collectors.py), opt-in:
+    # tutti insieme sono ~25 righe di points per campione (DB ~11 volte piu' grande)
+    # es. ["cpu_core", "net_if", "disk_io", "loadavg", "throttled"]
+    "collectors": [],
+    # allarmi valutati su ogni campione (formato delle regole in app/alerts.py)
+    "alert_rules": [
+        {"name": "Temperatura alta", "metric": "temp", "op": ">", "value": 75, "clear": 70,
+         "for_s": 10, "severity": "warning"},
+        {"name": "Temperatura critica", "metric": "temp", "op": ">", "value": 82, "clear": 78,
+         "severity": "critical"},
+        {"name": "Temperatura in salita", "metric": "temp", "op": ">", "value": 10, "clear": 2,
+         "rate_s": 60, "unit": " °C/min", "severity": "info"},
+        {"name": "CPU satura", "metric": "cpu", "op": ">", "value": 95, "clear": 80,
+         "for_s": 60, "severity": "warning"},
+        {"name": "RAM quasi piena", "metric": "ram", "op": ">", "value": 90, "clear": 85,
+         "for_s": 30, "severity": "warning"},
+    ],
 }
 
 def load_settings():
@@ -0,0 +1,324 @@
+from collections import OrderedDict
+
+import numpy as np
+
+COLUMNS = ("cpu", "ram", "temp", "up_kb", "down_kb")
+_COL = {name: i for i, name in enumerate(COLUMNS)}
+
+
+def rows_to_arrays(rows):
+    # righe DB (ts, cpu, ram, temp, up_kb, down_kb) -> (ts int64, valori float64 (n, 5))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(COLUMNS)))
+    arr = np.array(rows, dtype=np.float64)  # None -> nan
+    ts = arr[:, 0].astype(np.int64)
+    values = arr[:, 1:]
+    clean_values(values)
+    return ts, values
+
+
+def clean_values(values):
+    # in place: temp mancante o negativa -> nan, altri valori mancanti -> 0
+    temp = values[:, _COL["temp"]]
+    temp[temp < 0] = np.nan
+    others = [i for name, i in _COL.items() if name != "temp"]
+    block = values[:, others]
+    block[np.isnan(block)] = 0.0
+    values[:, others] = block
+    return values
+
+
+class MetricRing:
+    # Ring buffer preallocato. Ogni valore e' scritto due volte (i e i + capacity),
+    # cosi' la finestra corrente e' sempre una slice contigua: le viste sono zero-copy.
+    # summary (opzionale): WindowSummary tenuto allineato a ogni extend/drop.
+
+    def __init__(self, capacity, summary=None):
+        self.capacity = max(1, int(capacity))
+        self.summary = summary
+        self._ts = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._data = np.zeros((len(COLUMNS), 2 * self.capacity), dtype=np.float64)
+        self._head = 0  # prossima posizione di scrittura in [0, capacity)
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def clear(self):
+        self._head = 0
+        self._len = 0
+        if self.summary is not None:
+            self.summary.reset()
+
+    def append(self, ts_ms, values):
+        # values: (cpu, ram, temp, up_kb, down_kb), None ammesso
+        row = clean_values(np.array([values], dtype=np.float64))
+        self.extend(np.array([ts_ms], dtype=np.int64), row)
+
+    def extend(self, ts, values):
+        # ts: (n,) epoch-ms, values: (n, 5) gia' puliti (vedi clean_values)
+        n = len(ts)
+        if n == 0:
+            return
+        if n > self.capacity:
+            ts, values = ts[-self.capacity:], values[-self.capacity:]
+            n = self.capacity
+        if self.summary is not None:
+            # i campioni che verranno sovrascritti escono prima dalle statistiche
+            self._evict(max(0, self._len + n - self.capacity))
+            self.summary.add(ts, values, self.last_ts())
+
+        idx = (self._head + np.arange(n)) % self.capacity
+        for base in (idx, idx + self.capacity):
+            self._ts[base] = ts
+            self._data[:, base] = values.T
+
+        self._head = (self._head + n) % self.capacity
+        self._len = min(self.capacity, self._len + n)
+
+    def merge(self, ts, values):
+        # righe anche piu' vecchie dell'ultima (buco riempito in ritardo dal DB): la
+        # finestra si ricostruisce ordinata per ts; a parita' di ts resta la riga presente
+        if not len(ts):
+            return
+        all_ts = np.concatenate([self.ts(), ts])
+        all_values = np.concatenate([self.values(), values])
+        order = np.argsort(all_ts, kind="stable")
+        all_ts, all_values = all_ts[order], all_values[order]
+        keep = np.ones(len(all_ts), dtype=bool)
+        keep[1:] = all_ts[1:] != all_ts[:-1]
+        self.clear()
+        self.extend(all_ts[keep], all_values[keep])
+
+    def extend_rows(self, rows):
+        self.extend(*rows_to_arrays(rows))
+
+    def drop_before(self, ts_ms):
+        # scarta i campioni piu' vecchi di ts_ms
+        drop = int(np.searchsorted(self.ts(), ts_ms, side="left"))
+        self._evict(drop)
+        return drop
+
+    def _evict(self, k):
+        # toglie i k campioni piu' vecchi; al summary serve anche il primo che resta
+        if self.summary is not None and k:
+            s = self._start()
+            m = min(k + 1, self._len)
+            self.summary.remove(self._ts[s:s + m], self._data[:, s:s + m].T, k)
+        self._len -= k
+
+    def _start(self):
+        return (self._head - self._len) % self.capacity
+
+    def ts(self):
+        s = self._start()
+        return self._ts[s:s + self._len]
+
+    def column(self, name):
+        s = self._start()
+        return self._data[_COL[name], s:s + self._len]
+
+    def values(self):
+        # -> vista (n, 5) di tutte le colonne
+        s = self._start()
+        return self._data[:, s:s + self._len].T
+
+    @property
+    def nbytes(self):
+        return self._ts.nbytes + self._data.nbytes
+
+    def last_ts(self):
+        if not self._len:
+            return None
+        return int(self._ts[(self._head - 1) % self.capacity])
+
+
+class WindowSummary:
+    # Statistiche della finestra di un MetricRing aggiornate solo con i campioni che
+    # entrano/escono: somme, conteggi e istogramma CPU (passo 0.1%, p95 esatto).
+    # min/max si ricalcolano sulla finestra solo quando ne esce il valore estremo.
+    # Byte: KB/s di ogni campione x intervallo dal precedente; gli intervalli oltre
+    # max_gap_s (collector fermo, sospensione) sono contati come buchi, non come traffico.
+
+    CPU_BINS = 1001
+
+    def __init__(self, max_gap_s=5.0):
+        self.max_gap_ms = float(max_gap_s) * 1000.0
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.sums = np.zeros(len(COLUMNS))
+        self.temp_n = 0
+        self.cpu_hist = np.zeros(self.CPU_BINS, dtype=np.int64)
+        self.kb = np.zeros(2)          # up, down
+        self.covered_ms = 0.0
+        self.gaps = 0
+        self.gap_ms = 0.0
+        self._min = self._max = None   # per colonna; None = da ricalcolare
+
+    def _cpu_bins(self, values):
+        cpu = np.clip(np.rint(values[:, _COL["cpu"]] * 10), 0, self.CPU_BINS - 1).astype(np.int64)
+        return np.bincount(cpu, minlength=self.CPU_BINS)
+
+    def _intervals(self, ts, values, prev_ts, sign):
+        # intervallo di ogni campione dal precedente (il primo della finestra non ne ha)
+        dt = np.diff(ts, prepend=ts[0] if prev_ts is None else prev_ts).astype(np.float64)
+        gap = dt > self.max_gap_ms
+        ok = np.where(gap, 0.0, dt)
+        net = values[:, [_COL["up_kb"], _COL["down_kb"]]]
+        self.kb += sign * (net * ok[:, None]).sum(axis=0) / 1000.0
+        self.covered_ms += sign * float(ok.sum())
+        self.gaps += sign * int(gap.sum())
+        self.gap_ms += sign * float(dt[gap].sum())
+
+    def add(self, ts, values, prev_ts=None):
+        # values: (n, 5) gia' puliti; prev_ts: ultimo ts gia' nella finestra
+        if not len(ts):
+            return
+        self.n += len(ts)
+        self.sums += np.nansum(values, axis=0)
+        self.temp_n += int(np.count_nonzero(~np.isnan(values[:, _COL["temp"]])))
+        self.cpu_hist += self._cpu_bins(values)
+        self._intervals(ts, values, prev_ts, 1)
+        lo, hi = np.fmin.reduce(values, axis=0), np.fmax.reduce(values, axis=0)
+        if self._min is not None:
+            self._min, self._max = np.fmin(self._min, lo), np.fmax(self._max, hi)
+        elif self.n == len(ts):
+            self._min, self._max = lo, hi
+
+    def remove(self, ts, values, k):
+        # toglie i primi k campioni di ts/values; ts[k], se c'e', e' il nuovo primo
+        # della finestra e perde il suo intervallo
+        if k >= self.n:
+            self.reset()
+            return
+        gone = values[:k]
+        self.n -= k
+        self.sums -= np.nansum(gone, axis=0)
+        self.temp_n -= int(np.count_nonzero(~np.isnan(gone[:, _COL["temp"]])))
+        self.cpu_hist -= self._cpu_bins(gone)
+        self._intervals(ts[1:], values[1:], ts[0], -1)
+        if self._min is not None and (
+                np.any(np.fmin.reduce(gone, axis=0) <= self._min)
+                or np.any(np.fmax.reduce(gone, axis=0) >= self._max)):
+            self._min = self._max = None
+
+    def extremes(self, ring):
+        # -> (min, max) per colonna (nan = colonna tutta mancante); ricalcolo solo se serve
+        if self._min is None:
+            self._min = np.array([np.fmin.reduce(ring.column(c)) if len(ring) else np.nan for c in COLUMNS])
+            self._max = np.array([np.fmax.reduce(ring.column(c)) if len(ring) else np.nan for c in COLUMNS])
+        return self._min, self._max
+
+    def result(self, ring):
+        # -> dict delle statistiche (None se la finestra e' vuota)
+        if not self.n:
+            return None
+        self.extremes(ring)
+        cpu = _COL["cpu"]
+        p95 = int(np.searchsorted(np.cumsum(self.cpu_hist), np.ceil(self.n * 0.95))) / 10.0
+        temp = _COL["temp"]
+        return {
+            "n": self.n,
+            "cpu_min": float(self._min[cpu]),
+            "cpu_avg": float(self.sums[cpu] / self.n),
+            "cpu_max": float(self._max[cpu]),
+            "cpu_p95": p95,
+            "ram_avg": float(self.sums[_COL["ram"]] / self.n),
+            "ram_max": float(self._max[_COL["ram"]]),
+            "temp_avg": float(self.sums[temp] / self.temp_n) if self.temp_n else None,
+            "temp_max": None if np.isnan(self._max[temp]) else float(self._max[temp]),
+            "up_mb": float(self.kb[0]) / 1024.0,
+            "down_mb": float(self.kb[1]) / 1024.0,
+            "covered_s": self.covered_ms / 1000.0,
+            "gaps": self.gaps,
+            "gap_s": self.gap_ms / 1000.0,
+        }
+
+
+class WindowCache:
+    # Finestre gia' decodificate (MetricRing) per chiave (secondi, risoluzione),
+    # LRU con budget in byte. hits/misses/slices per dimensionare max_bytes.
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.slices = 0      # miss serviti ritagliando una finestra piu' ampia
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def items(self):
+        return list(self._items.items())
+
+    def nbytes(self):
+        return sum(ring.nbytes for ring in self._items.values())
+
+    def get(self, key):
+        ring = self._items.get(key)
+        if ring is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return ring
+
+    def covering(self, key):
+        # la finestra piu' piccola in cache che contiene `key` (stessa risoluzione)
+        seconds, resolution = key
+        best = None
+        for (s, r), ring in self._items.items():
+            if r == resolution and s > seconds and len(ring) and (best is None or s < best[0]):
+                best = (s, ring)
+        return None if best is None else best[1]
+
+    def put(self, key, ring):
+        self._items[key] = ring
+        self._items.move_to_end(key)
+        # la finestra appena inserita resta anche se da sola supera il budget
+        while len(self._items) > 1 and self.nbytes() > self.max_bytes:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "windows": len(self._items),
+            "bytes": self.nbytes(),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "slices": self.slices,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def gap_threshold(x, factor=3.0, min_gap=5.0):
+    # buco = intervallo tra due campioni > factor volte la mediana
+    if len(x) < 3:
+        return min_gap
+    return max(min_gap, factor * float(np.median(np.diff(x))))
+
+
+def break_gaps(x, ys, gap=None):
+    # Inserisce un NaN dove l'intervallo tra due campioni supera gap
+    # (riavvii, sospensioni): con connect="finite" la curva si interrompe.
+    if len(x) < 2:
+        return x, ys
+    if gap is None:
+        gap = gap_threshold(x)
+    dx = np.diff(x)
+    where = np.flatnonzero(dx > gap) + 1
+    if not len(where):
+        return x, ys
+    x = np.insert(x.astype(np.float64), where, np.nan)
+    ys = [np.insert(y, where, np.nan) for y in ys]
+    return x, ys
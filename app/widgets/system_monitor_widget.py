@@ -1,28 +1,44 @@
-import psutil
+import glob
+
 import pyqtgraph as pg
-import subprocess
 
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
-from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtCore import QThread, QTimer, Qt, QMetaObject, pyqtSignal
 
+from app import instrument
+from app.alerts import AlertEngine
+from app.ipc import socket_path
 from app.settings_store import load_settings
-from app.database.db_manager import DBManager
+from app.timeseries import MetricRing
+from app.workers.collector_worker import CollectorWorker
+from app.workers.live_subscriber import LiveSubscriber
 
 
 class SystemMonitorWidget(QWidget):
+    interval_changed = pyqtSignal(int)
+    retention_changed = pyqtSignal(int)
+    adaptive_changed = pyqtSignal(bool)
+    alert_rules_changed = pyqtSignal(object)
+    # ogni Sample mostrato, per le altre viste (storico)
+    sample_received = pyqtSignal(object)
+    # AlertEvent (cambi di stato degli allarmi), per il banner di MainWindow
+    alert_received = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
 
         self.settings = load_settings()
-        self.db = DBManager()
-        self._cleanup_counter = 0
 
-        self.cpu_series = []
-        self.net_sent_prev = None
-        self.net_recv_prev = None
+        self.series = MetricRing(60)
+        self._last_sample = None
+        self._dirty = False
+
+        # display ufficiale Raspberry: bl_power != 0 = retroilluminazione spenta
+        self._backlight = glob.glob("/sys/class/backlight/*/bl_power")
 
         self._build_ui()
-        self._start_timer()
+        self._start_collector()
+        self._start_render_timer()
 
     def _build_ui(self):
         layout = QVBoxLayout(self)
@@ -42,53 +58,67 @@ class SystemMonitorWidget(QWidget):
         self.curve = self.graph.plot([], pen=pg.mkPen(width=2))
         layout.addWidget(self.graph)
 
-    def _start_timer(self):
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_stats)
-        self.timer.start(int(self.settings.get("dashboard_refresh_ms", 1000)))
-
-    def get_cpu_temperature(self):
-        try:
-            temps = psutil.sensors_temperatures()
-            if "cpu_thermal" in temps and temps["cpu_thermal"]:
-                return temps["cpu_thermal"][0].current
-        except Exception:
-            pass
-        return None
-
-    def get_active_network(self):
-        try:
-            out = subprocess.check_output(
-                ["nmcli", "-t", "-f", "DEVICE,TYPE,STATE", "device"],
-                stderr=subprocess.DEVNULL,
-            ).decode()
-            for line in out.splitlines():
-                device, dev_type, state = line.split(":")
-                if state == "connected":
-                    return device, dev_type
-        except Exception:
-            pass
-        return None, None
-
-    def get_wifi_signal_percent(self):
-        try:
-            out = subprocess.check_output(
-                ["nmcli", "-t", "-f", "IN-USE,SIGNAL", "dev", "wifi"],
-                stderr=subprocess.DEVNULL,
-            ).decode()
-            for line in out.splitlines():
-                if line.startswith("*:"):
-                    return int(line.split(":")[1])
-        except Exception:
-            pass
-        return None
-
-    def get_ipv4(self, iface):
-        addrs = psutil.net_if_addrs().get(iface, [])
-        for a in addrs:
-            if a.family == 2:  # AF_INET
-                return a.address
-        return ""
+    def _start_collector(self):
+        self._thread = None
+        self.collector = None
+        self.alerts = None
+        if self.settings.get("collector", "embedded") == "external":
+            # campiona il daemon: qui solo lo stream live, nessun accesso al DB.
+            # Il daemon registra gli allarmi; per il banner le stesse regole girano qui
+            self.alerts = AlertEngine(self.settings.get("alert_rules"))
+            self.subscriber = LiveSubscriber(socket_path(self.settings), self)
+            self.subscriber.sample_ready.connect(self.update_stats)
+            self.subscriber.connect_to_publisher()
+            return
+
+        # Campionamento + DB in un thread separato, qui arriva solo il Sample
+        self.subscriber = None
+        self._thread = QThread(self)
+        self.collector = CollectorWorker(self.settings)
+        self.collector.moveToThread(self._thread)
+        self._thread.started.connect(self.collector.start)
+        self.collector.sample_ready.connect(self.update_stats)
+        self.collector.alert_event.connect(self.alert_received)
+        self.alert_rules_changed.connect(self.collector.set_alert_rules)
+        self.interval_changed.connect(self.collector.set_interval)
+        self.retention_changed.connect(self.collector.set_retention_days)
+        self.adaptive_changed.connect(self.collector.set_adaptive)
+        self._thread.start()
+
+    def _start_render_timer(self):
+        # il refresh grafico e' indipendente dal campionamento
+        self.render_timer = QTimer(self)
+        self.render_timer.timeout.connect(self.render)
+        self.render_timer.start(int(self.settings.get("dashboard_refresh_ms", 1000)))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.render_timer.start()
+        self.render()
+
+    def hideEvent(self, event):
+        # pagina non visibile nello stack: niente disegno
+        super().hideEvent(event)
+        self.render_timer.stop()
+
+    def screen_blanked(self):
+        for path in self._backlight:
+            try:
+                with open(path) as f:
+                    if f.read().strip() != "0":
+                        return True
+            except OSError:
+                pass
+        return False
+
+    def shutdown(self):
+        if self.subscriber is not None:
+            self.subscriber.close()
+        if self._thread is None or not self._thread.isRunning():
+            return
+        QMetaObject.invokeMethod(self.collector, "stop", Qt.BlockingQueuedConnection)
+        self._thread.quit()
+        self._thread.wait()
 
     def temp_color(self, temp_c):
         if temp_c is None:
@@ -99,40 +129,44 @@ class SystemMonitorWidget(QWidget):
             return "#f59e0b"  # orange
         return "#ef4444"      # red
 
-    def update_stats(self):
-        cpu = psutil.cpu_percent(interval=None)
-        ram = psutil.virtual_memory().percent
-        temp = self.get_cpu_temperature()
+    @instrument.traced("dashboard.update")
+    def update_stats(self, sample):
+        # solo dati: il disegno avviene in render() al ritmo di dashboard_refresh_ms
+        self._last_sample = sample
+        self.series.append(int(sample.ts * 1000),
+                           (sample.cpu, sample.ram, sample.temp, sample.up_kb, sample.down_kb))
+        self._dirty = True
+        self.sample_received.emit(sample)
+        if self.alerts is not None:
+            with instrument.timed("alerts.evaluate"):
+                events = self.alerts.evaluate(sample)
+            for ev in events:
+                self.alert_received.emit(ev)
+
+    @instrument.traced("dashboard.render")
+    def render(self):
+        if not self._dirty or not self.isVisible() or self.screen_blanked():
+            return
+        self._dirty = False
+
+        sample = self._last_sample
+        cpu, ram, temp = sample.cpu, sample.ram, sample.temp
 
         # Grafico CPU
-        self.cpu_series.append(cpu)
-        if len(self.cpu_series) > 60:
-            self.cpu_series.pop(0)
-        self.curve.setData(self.cpu_series)
+        self.curve.setData(self.series.column("cpu"))
 
         # Rete (se WiFi -> mostra WiFi%, se Ethernet -> ETH: IP)
-        device, dev_type = self.get_active_network()
-
-        if dev_type == "wifi":
-            sig = self.get_wifi_signal_percent()
+        if sample.net_type == "wifi":
+            sig = sample.wifi_signal
             net_info = f"WiFi: {sig}%" if sig is not None else "WiFi"
-        elif dev_type == "ethernet":
-            ip = self.get_ipv4(device) if device else self.get_ipv4("eth0")
-            net_info = f"ETH: {ip}" if ip else "ETH"
+        elif sample.net_type == "ethernet":
+            net_info = f"ETH: {sample.ip}" if sample.ip else "ETH"
         else:
             net_info = "Offline"
 
         # Velocità rete (totale)
-        net = psutil.net_io_counters()
-        if self.net_sent_prev is None:
-            self.net_sent_prev = net.bytes_sent
-            self.net_recv_prev = net.bytes_recv
-            return
-
-        up_kb = (net.bytes_sent - self.net_sent_prev) / 1024.0
-        down_kb = (net.bytes_recv - self.net_recv_prev) / 1024.0
-        self.net_sent_prev = net.bytes_sent
-        self.net_recv_prev = net.bytes_recv
+        up_kb = sample.up_kb
+        down_kb = sample.down_kb
 
         # Temperatura con colore
         if temp is None:
@@ -150,15 +184,32 @@ class SystemMonitorWidget(QWidget):
         )
         self.status_label.setText(status_html)
 
-        # salva su SQLite
-        self.db.insert(cpu=cpu, ram=ram, temp=temp, up_kb=up_kb, down_kb=down_kb)
-
-        # retention (pulizia ogni ~60 campioni)
-        self._cleanup_counter += 1
-        if self._cleanup_counter >= 60:
-            self._cleanup_counter = 0
-            self.db.cleanup_older_than(int(self.settings.get("retention_days", 7)))
-
     def apply_dashboard_refresh(self, dashboard_refresh_ms: int):
         self.settings["dashboard_refresh_ms"] = int(dashboard_refresh_ms)
-        self.timer.setInterval(int(dashboard_refresh_ms))
\ No newline at end of file
+        self.render_timer.setInterval(int(dashboard_refresh_ms))
+
+    def apply_sampling(self, sampling_ms: int, adaptive: bool = False):
+        self.settings["sampling_ms"] = int(sampling_ms)
+        self.settings["adaptive_sampling"] = bool(adaptive)
+        self.adaptive_changed.emit(bool(adaptive))
+        self.interval_changed.emit(int(sampling_ms))
+
+    def apply_retention(self, retention_days: int):
+        self.settings["retention_days"] = int(retention_days)
+        self.retention_changed.emit(int(retention_days))
+
+    def reload_collector(self):
+        # collector esterno: i settings salvati li rilegge il daemon (comando "reload"
+        # sullo stream live). -> False se il daemon non e' raggiungibile
+        if self.subscriber is None:
+            return True
+        return self.subscriber.send_command("reload")
+
+    def apply_alert_rules(self, rules):
+        # regole riapplicate (e stato azzerato) solo se cambiate davvero
+        if rules == self.settings.get("alert_rules"):
+            return
+        self.settings["alert_rules"] = rules
+        if self.alerts is not None:
+            self.alerts.set_rules(rules)
+        self.alert_rules_changed.emit(rules)
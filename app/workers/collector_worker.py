@@ -0,0 +1,156 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+from app.alerts import AlertEngine
+from app.database.db_manager import get_db
+from app import instrument
+from app.database.retention import RetentionManager
+from app.ipc import SamplePublisher, socket_path
+from app.workers.sampler import AdaptiveInterval, MetricSampler
+
+
+class CollectorWorker(QObject):
+    # Vive in un QThread dedicato: psutil, nmcli e SQLite non toccano mai il thread GUI.
+    # Usato solo con "collector": "embedded"; con "external" la GUI riceve i campioni
+    # del daemon (app.collector) via LiveSubscriber.
+    sample_ready = pyqtSignal(object)
+    # AlertEvent a ogni cambio di stato di una regola
+    alert_event = pyqtSignal(object)
+
+    def __init__(self, settings: dict):
+        super().__init__()
+        self.settings = dict(settings)
+        self.sampler = None
+        self.db = None
+        self.timer = None
+        self.retention = None
+        self.retention_timer = None
+        self.publisher = None
+        self.adaptive = None
+        self.alerts = None
+
+    @pyqtSlot()
+    def start(self):
+        self.sampler = MetricSampler(
+            net_ttl_s=float(self.settings.get("net_cache_ttl_s", 10)),
+            net_monitor=bool(self.settings.get("net_monitor", True)),
+            collectors=self.settings.get("collectors"),
+            backend=self.settings.get("sampler_backend", "auto"),
+        )
+        self.db = get_db()
+        self.alerts = AlertEngine(self.settings.get("alert_rules"))
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+        sampling_ms = int(self.settings.get("sampling_ms", 1000))
+        if self.settings.get("adaptive_sampling", False):
+            self.adaptive = AdaptiveInterval(sampling_ms, int(self.settings.get("sampling_idle_ms", 10000)))
+        self.timer.start(sampling_ms)
+
+        # stream live per client esterni
+        if self.settings.get("ipc_publish", True):
+            try:
+                self.publisher = SamplePublisher(socket_path(self.settings))
+            except OSError:
+                self.publisher = None
+
+        # retention a batch tra un campione e l'altro
+        self.retention = RetentionManager(
+            self.db,
+            int(self.settings.get("retention_days", 7)),
+            batch_rows=int(self.settings.get("retention_batch_rows", 2000)),
+            archive_after_h=float(self.settings.get("archive_after_h", 24)),
+            archive_block_s=int(self.settings.get("archive_block_s", 3600)),
+        )
+        self.retention_timer = QTimer(self)
+        self.retention_timer.timeout.connect(self.retention_step)
+        self.retention_timer.start(5000)
+
+    @pyqtSlot(int)
+    def set_interval(self, interval_ms: int):
+        # intervallo di campionamento (indipendente dal refresh grafico)
+        self.settings["sampling_ms"] = int(interval_ms)
+        if self.adaptive is not None:
+            self.adaptive.fast_ms = int(interval_ms)
+            self.adaptive.slow_ms = max(self.adaptive.slow_ms, int(interval_ms))
+        elif self.timer is not None:
+            self.timer.setInterval(int(interval_ms))
+
+    @pyqtSlot(bool)
+    def set_adaptive(self, enabled: bool):
+        self.settings["adaptive_sampling"] = bool(enabled)
+        sampling_ms = int(self.settings.get("sampling_ms", 1000))
+        if not enabled:
+            self.adaptive = None
+            if self.timer is not None:
+                self.timer.setInterval(sampling_ms)
+        elif self.adaptive is None:
+            self.adaptive = AdaptiveInterval(sampling_ms, int(self.settings.get("sampling_idle_ms", 10000)))
+
+    @pyqtSlot(object)
+    def set_alert_rules(self, rules):
+        self.settings["alert_rules"] = rules
+        if self.alerts is not None:
+            self.alerts.set_rules(rules)
+
+    @pyqtSlot(int)
+    def set_retention_days(self, days: int):
+        self.settings["retention_days"] = int(days)
+        if self.retention is not None:
+            self.retention.set_days(days)
+
+    @pyqtSlot()
+    def stop(self):
+        if self.timer is not None:
+            self.timer.stop()
+        if self.retention_timer is not None:
+            self.retention_timer.stop()
+        if self.publisher is not None:
+            self.publisher.close()
+            self.publisher = None
+        if self.sampler is not None:
+            self.sampler.close()
+        if self.db is not None:
+            # flush dei campioni ancora in buffer prima di uscire
+            self.db.flush()
+            self.db = None
+
+    @pyqtSlot()
+    @instrument.traced("collector.tick")
+    def tick(self):
+        sample = self.sampler.sample()
+        if sample is None:
+            return
+
+        if self.adaptive is not None:
+            self.timer.setInterval(self.adaptive.next(sample))
+
+        self.sample_ready.emit(sample)
+        if self.publisher is not None:
+            self.publisher.publish(sample)
+
+        # salva su SQLite
+        self.db.insert(cpu=sample.cpu, ram=sample.ram, temp=sample.temp,
+                       up_kb=sample.up_kb, down_kb=sample.down_kb, ts=sample.ts,
+                       extra=sample.extra)
+
+        with instrument.timed("alerts.evaluate"):
+            events = self.alerts.evaluate(sample)
+        if events:
+            self.db.insert_alerts(events)
+            for ev in events:
+                self.alert_event.emit(ev)
+
+    @pyqtSlot()
+    @instrument.traced("db.retention")
+    def retention_step(self):
+        # con arretrato (es. retention passata da 365 a 7 giorni) si accelera
+        self.retention.step()
+        self.retention_timer.setInterval(200 if self.retention.backlog else 5000)
+        if not self.retention.backlog:
+            # dimensioni del file e lavoro della retention nella tabella di Diagnostica
+            st = self.retention.stats()
+            instrument.gauge("db.size_kb", st["db_bytes"] // 1024)
+            instrument.gauge("db.wal_kb", st["wal_bytes"] // 1024)
+            instrument.gauge("db.free_kb", st["free_bytes"] // 1024)
+            instrument.gauge("retention.rows_reclaimed", st["rows_reclaimed"])
+            instrument.gauge("retention.rows_archived", st["rows_archived"])
+            instrument.gauge("retention.pages_vacuumed", st["pages_vacuumed"])
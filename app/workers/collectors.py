@@ -0,0 +1,140 @@
+# Registro dei collector di metriche estese (oltre alle 5 metriche base).
+#
+# Ogni collector dichiara nome, unita' e funzione di campionamento; la funzione
+# restituisce {nome_serie: valore} (es. "cpu_core.0", "net.wlan0.down_kb").
+# `every` = ogni quanti tick gira: i collector costosi girano piu' di rado.
+# `snapshot` = la funzione riceve il ProcSnapshot del tick (None con il backend psutil)
+# invece di rileggere /proc per conto suo.
+# Lo stato tra un tick e l'altro (contatori precedenti) sta in `state`, un dict per
+# collector di ogni MetricSampler: due campionatori non si falsano i delta a vicenda.
+import os
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict
+
+import psutil
+
+from app import instrument
+from app.workers.procfs import cpu_percent
+
+
+@dataclass(frozen=True)
+class MetricCollector:
+    name: str
+    unit: str
+    sample: Callable[..., Dict[str, float]]
+    every: int = 1
+    snapshot: bool = False
+
+    def run(self, state, snap=None):
+        return self.sample(state, snap) if self.snapshot else self.sample(state)
+
+
+REGISTRY: Dict[str, MetricCollector] = {}
+
+
+def register(name, unit, every=1, snapshot=False):
+    def deco(fn):
+        REGISTRY[name] = MetricCollector(name, unit, fn, max(1, int(every)), bool(snapshot))
+        return fn
+    return deco
+
+
+def enabled_collectors(names=None):
+    # names: lista dai settings; None = tutti quelli registrati
+    if names is None:
+        return list(REGISTRY.values())
+    return [REGISTRY[n] for n in names if n in REGISTRY]
+
+
+class _Rates:
+    # contatori cumulativi -> velocita' al secondo tra due chiamate
+    def __init__(self):
+        self._prev = {}
+        self._prev_t = None
+
+    def __call__(self, counters, scale=1.0):
+        now = time.monotonic()
+        prev, prev_t = self._prev, self._prev_t
+        self._prev, self._prev_t = counters, now
+        if prev_t is None or now <= prev_t:
+            return {}
+        dt = now - prev_t
+        return {k: (v - prev[k]) / dt / scale for k, v in counters.items() if k in prev}
+
+
+def _rates(state):
+    rates = state.get("rates")
+    if rates is None:
+        rates = state["rates"] = _Rates()
+    return rates
+
+
+THROTTLED_PATH = "/sys/devices/platform/soc/soc:firmware/get_throttled"
+
+
+def _busy_total(t):
+    # psutil.cpu_times() -> (busy, total) come le righe cpuN di /proc/stat (guest esclusi)
+    total = sum(t) - getattr(t, "guest", 0) - getattr(t, "guest_nice", 0)
+    return total - t.idle - getattr(t, "iowait", 0), total
+
+
+@register("cpu_core", "%", snapshot=True)
+def cpu_per_core(state, snap=None):
+    # niente psutil.cpu_percent(percpu=True): il suo riferimento precedente e' globale
+    if snap is None:
+        cores = tuple(_busy_total(t) for t in psutil.cpu_times(percpu=True))
+    else:
+        cores = snap.cores
+    prev, state["cores"] = state.get("cores"), cores
+    if prev is None or len(prev) != len(cores):
+        # primo giro: come psutil.cpu_percent, valori 0 senza riferimento precedente
+        return {f"cpu_core.{i}": 0.0 for i in range(len(cores))}
+    return {f"cpu_core.{i}": cpu_percent(p, c) for i, (p, c) in enumerate(zip(prev, cores))}
+
+
+@register("net_if", "KB/s", snapshot=True)
+def net_per_interface(state, snap=None):
+    if snap is None:
+        pernic = {nic: (c.bytes_recv, c.bytes_sent) for nic, c in psutil.net_io_counters(pernic=True).items()}
+    else:
+        pernic = snap.net
+    counters = {}
+    for nic, (rx, tx) in pernic.items():
+        if nic == "lo":
+            continue
+        counters[f"net.{nic}.up_kb"] = tx
+        counters[f"net.{nic}.down_kb"] = rx
+    return _rates(state)(counters, scale=1024.0)
+
+
+@register("disk_io", "KB/s", every=5)
+def disk_io(state):
+    c = psutil.disk_io_counters()
+    if c is None:
+        return {}
+    return _rates(state)({"disk.read_kb": c.read_bytes, "disk.write_kb": c.write_bytes}, scale=1024.0)
+
+
+@register("loadavg", "", every=5)
+def load_average(state):
+    l1, l5, l15 = os.getloadavg()
+    return {"load.1m": l1, "load.5m": l5, "load.15m": l15}
+
+
+@register("throttled", "flags", every=30)
+def throttled(state):
+    # bitmask del firmware Raspberry (under-voltage, freq cap, throttling, soft temp limit)
+    try:
+        with open(THROTTLED_PATH) as f:
+            return {"throttled": float(int(f.read().strip(), 16))}
+    except (OSError, ValueError):
+        pass
+    try:
+        with instrument.timed("spawn.vcgencmd"):
+            out = subprocess.check_output(["vcgencmd", "get_throttled"],
+                                          stderr=subprocess.DEVNULL, timeout=2).decode()
+        return {"throttled": float(int(out.strip().split("=")[1], 16))}
+    except Exception:
+        return {}
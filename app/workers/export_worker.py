@@ -0,0 +1,177 @@
+import csv
+import gzip
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from numpy.lib import format as npformat
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from app.database.db_manager import METRICS, get_db
+
+EXPORTS_DIR = Path.home() / "touchui" / "exports"
+
+# formato -> estensione
+FORMATS = {
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "npz": ".npz",
+}
+
+
+class ExportWorker(QObject):
+    # Export in un QThread: legge dal DB a blocchi e scrive man mano.
+    # Metriche estese (series/points, formato long): in CSV un secondo file points_*,
+    # in npz gli array points_ts / points_series / points_value + series_names/series_units.
+    progress = pyqtSignal(int, int)   # righe scritte, righe totali
+    finished = pyqtSignal(str)        # file creato ("" se vuoto/annullato)
+    failed = pyqtSignal(str)
+
+    def __init__(self, start_ms, end_ms, columns=METRICS, fmt="csv", out_dir=None, chunk=5000, series=None):
+        super().__init__()
+        self.start_ms = int(start_ms)
+        self.end_ms = int(end_ms)
+        self.columns = [c for c in METRICS if c in columns]
+        # metriche estese da esportare: None = tutte, () = nessuna
+        self.series = None if series is None else tuple(series)
+        self.fmt = fmt if fmt in FORMATS else "csv"
+        self.out_dir = Path(out_dir) if out_dir else EXPORTS_DIR
+        self.chunk = int(chunk)
+        self._cancel = False
+        self._done = 0
+        self._total = 0
+
+    def cancel(self):
+        self._cancel = True
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            path = self._export()
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished.emit(str(path) if path else "")
+
+    def _export(self):
+        db = get_db()
+        db.flush()
+        # conteggio e lettura nella stessa transazione: il totale corrisponde alle righe scritte
+        with db.snapshot() as conn:
+            rows = db.count_range(self.start_ms, self.end_ms, conn)
+            points = db.count_points(self.start_ms, self.end_ms, self.series, conn) if self.series != () else 0
+            if not rows and not points:
+                return None
+            self._done, self._total = 0, rows + points
+
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            fname = self.out_dir / f"metrics_{stamp}{FORMATS[self.fmt]}"
+            pname = self.out_dir / f"points_{stamp}{FORMATS[self.fmt]}"
+            chunks = db.iter_range(self.start_ms, self.end_ms, self.columns, self.chunk, conn)
+            pchunks = db.iter_points(self.start_ms, self.end_ms, self.series, self.chunk, conn) if points else iter(())
+
+            if self.fmt == "npz":
+                ok = self._write_npz(fname, chunks, pchunks)
+            else:
+                ok = self._write_csv(fname, chunks) and (not points or self._write_points_csv(pname, pchunks))
+            chunks.close()
+            if points:
+                pchunks.close()
+
+        if not ok:
+            fname.unlink(missing_ok=True)
+            pname.unlink(missing_ok=True)
+            return None
+        return fname
+
+    def _rows(self, chunks):
+        # blocchi di righe con progresso e annullamento; None = annullato
+        for rows in chunks:
+            if self._cancel:
+                chunks.close()
+                yield None
+                return
+            yield rows
+            self._done += len(rows)
+            self.progress.emit(self._done, self._total)
+
+    def _write_csv(self, fname, chunks):
+        opener = gzip.open if self.fmt == "csv.gz" else open
+        with opener(fname, "wt", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["ts"] + self.columns)
+            for rows in self._rows(chunks):
+                if rows is None:
+                    return False
+                for r in rows:
+                    ts = datetime.fromtimestamp(r[0] / 1000).isoformat(timespec="milliseconds")
+                    w.writerow((ts,) + tuple(r[1:]))
+        return True
+
+    def _write_points_csv(self, fname, chunks):
+        # formato long: una riga per punto (le serie hanno cadenze diverse)
+        opener = gzip.open if self.fmt == "csv.gz" else open
+        with opener(fname, "wt", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["ts", "series", "unit", "value"])
+            for rows in self._rows(chunks):
+                if rows is None:
+                    return False
+                for ts, name, unit, value in rows:
+                    w.writerow((datetime.fromtimestamp(ts / 1000).isoformat(timespec="milliseconds"),
+                                name, unit, value))
+        return True
+
+    def _write_npz(self, fname, chunks, pchunks):
+        # colonnare e compresso: ts int64 (epoch-ms) + una colonna float32 per metrica.
+        # Una sola lettura del DB: ogni colonna va in un file grezzo temporaneo, poi
+        # copiata a blocchi nello zip -> in memoria resta un chunk, non l'intervallo intero
+        names = ["ts"] + self.columns
+        dtypes = [np.dtype(np.int64)] + [np.dtype(np.float32)] * len(self.columns)
+        pnames = ["points_ts", "points_series", "points_value"]
+        pdtypes = [np.dtype(np.int64), np.dtype(np.int32), np.dtype(np.float32)]
+        series = {}  # nome -> (indice, unita')
+        n = npoints = 0
+        with tempfile.TemporaryDirectory(dir=self.out_dir) as tmp:
+            spools = [open(Path(tmp) / name, "wb") for name in names + pnames]
+            try:
+                for rows in self._rows(chunks):
+                    if rows is None:
+                        return False
+                    arr = np.array(rows, dtype=np.float64)  # None -> nan
+                    for i, (f, dtype) in enumerate(zip(spools, dtypes)):
+                        f.write(arr[:, i].astype(dtype).tobytes())
+                    n += len(rows)
+                for rows in self._rows(pchunks):
+                    if rows is None:
+                        return False
+                    idx = [series.setdefault(name, (len(series), unit))[0] for _, name, unit, _ in rows]
+                    cols = ([r[0] for r in rows], idx, [r[3] for r in rows])
+                    for f, dtype, col in zip(spools[len(names):], pdtypes, cols):
+                        f.write(np.array(col, dtype=np.float64).astype(dtype).tobytes())
+                    npoints += len(rows)
+            finally:
+                for f in spools:
+                    f.close()
+
+            # stesso layout di np.savez_compressed: un .npy per colonna, deflate
+            with zipfile.ZipFile(fname, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+                spooled = [(name, dtype, n) for name, dtype in zip(names, dtypes)]
+                if npoints:
+                    spooled += [(name, dtype, npoints) for name, dtype in zip(pnames, pdtypes)]
+                for name, dtype, count in spooled:
+                    header = {"descr": npformat.dtype_to_descr(dtype), "fortran_order": False, "shape": (count,)}
+                    with open(Path(tmp) / name, "rb") as src, zf.open(f"{name}.npy", "w", force_zip64=True) as out:
+                        npformat.write_array_header_1_0(out, header)
+                        shutil.copyfileobj(src, out, 1 << 20)
+                if npoints:
+                    ordered = sorted(series.items(), key=lambda item: item[1][0])
+                    for key, values in (("series_names", [name for name, _ in ordered]),
+                                        ("series_units", [unit or "" for _, (_, unit) in ordered])):
+                        with zf.open(f"{key}.npy", "w") as out:
+                            npformat.write_array(out, np.array(values, dtype=str))
+        return True
@@ -0,0 +1,62 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtNetwork import QLocalSocket
+
+from app.ipc import decode_sample
+
+
+class LiveSubscriber(QObject):
+    # Client Qt dello stream live (app.ipc): nessun thread, nessuna query al DB.
+    sample_ready = pyqtSignal(object)
+    connected_changed = pyqtSignal(bool)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = str(path)
+        self._buf = b""
+
+        self.sock = QLocalSocket(self)
+        self.sock.readyRead.connect(self._on_ready_read)
+        self.sock.connected.connect(lambda: self.connected_changed.emit(True))
+        self.sock.disconnected.connect(self._on_disconnected)
+        self.sock.error.connect(lambda _: self._retry.start())
+
+        # riconnessione se il collector non c'e' ancora o si riavvia
+        self._retry = QTimer(self)
+        self._retry.setSingleShot(True)
+        self._retry.setInterval(2000)
+        self._retry.timeout.connect(self.connect_to_publisher)
+
+    def connect_to_publisher(self):
+        if self.sock.state() == QLocalSocket.UnconnectedState:
+            self.sock.connectToServer(self.path)
+
+    def is_connected(self):
+        return self.sock.state() == QLocalSocket.ConnectedState
+
+    def send_command(self, cmd):
+        # -> False se il collector non e' collegato (il comando non viene accodato)
+        if not self.is_connected():
+            return False
+        self.sock.write(f"{cmd}\n".encode())
+        self.sock.flush()
+        return True
+
+    def _on_disconnected(self):
+        self.connected_changed.emit(False)
+        self._retry.start()
+
+    def _on_ready_read(self):
+        self._buf += bytes(self.sock.readAll())
+        *lines, self._buf = self._buf.split(b"\n")
+        for line in lines:
+            if not line:
+                continue
+            try:
+                sample = decode_sample(line)
+            except (ValueError, TypeError):
+                continue
+            self.sample_ready.emit(sample)
+
+    def close(self):
+        self._retry.stop()
+        self.sock.abort()
@@ -0,0 +1,161 @@
+import os
+import subprocess
+import threading
+import time
+
+from app import instrument
+
+
+class NetworkStateProvider:
+    # Stato rete (device, tipo, segnale WiFi) senza lanciare nmcli ad ogni tick:
+    # - device/tipo: nmcli in cache per ttl_s, invalidata dagli eventi di `nmcli monitor`
+    # - segnale WiFi: letto da /proc/net/wireless (nessun processo)
+    # - senza nmcli: fallback su /sys/class/net
+
+    def __init__(self, ttl_s=10.0, use_monitor=True, proc_root="/proc", sys_root="/sys"):
+        self.ttl_s = float(ttl_s)
+        self.proc_root = proc_root
+        self.sys_root = sys_root
+
+        self._device = None
+        self._dev_type = None
+        self._expires = 0.0
+        self._dirty = threading.Event()
+
+        self._signal = None
+        self._signal_expires = 0.0
+
+        self.spawns = 0  # processi nmcli lanciati (diagnostica)
+
+        self._monitor = None
+        if use_monitor:
+            self._start_monitor()
+
+    # --- nmcli ---
+
+    def _nmcli(self, *args):
+        self.spawns += 1
+        with instrument.timed("spawn.nmcli"):
+            return subprocess.check_output(
+                ["nmcli", *args], stderr=subprocess.DEVNULL, timeout=5,
+            ).decode()
+
+    def _start_monitor(self):
+        try:
+            self._monitor = subprocess.Popen(
+                ["nmcli", "monitor"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+        except Exception:
+            self._monitor = None
+            return
+        self.spawns += 1
+        instrument.count("spawn.nmcli_monitor")
+        threading.Thread(target=self._read_monitor, daemon=True).start()
+
+    def _read_monitor(self):
+        # ogni riga = un cambiamento in NetworkManager -> ricarica alla prossima richiesta
+        proc = self._monitor
+        for _ in proc.stdout:
+            self._dirty.set()
+        # monitor terminato: si torna al polling con TTL
+        self._monitor = None
+
+    def monitoring(self):
+        return self._monitor is not None
+
+    def _query_device(self):
+        try:
+            out = self._nmcli("-t", "-f", "DEVICE,TYPE,STATE", "device")
+            for line in out.splitlines():
+                device, dev_type, state = line.split(":")
+                if state == "connected":
+                    return device, dev_type
+            return None, None
+        except FileNotFoundError:
+            return self._sysfs_device()
+        except Exception:
+            return None, None
+
+    def _sysfs_device(self):
+        base = os.path.join(self.sys_root, "class", "net")
+        try:
+            names = sorted(os.listdir(base))
+        except OSError:
+            return None, None
+        for name in names:
+            if name == "lo":
+                continue
+            try:
+                with open(os.path.join(base, name, "operstate")) as f:
+                    if f.read().strip() != "up":
+                        continue
+            except OSError:
+                continue
+            if os.path.isdir(os.path.join(base, name, "wireless")):
+                return name, "wifi"
+            return name, "ethernet"
+        return None, None
+
+    # --- segnale WiFi ---
+
+    def _proc_wireless_signal(self, device):
+        # /proc/net/wireless: "wlan0: 0000   60.  -50.  -256 ..." (link quality su 70)
+        try:
+            with open(os.path.join(self.proc_root, "net", "wireless")) as f:
+                lines = f.readlines()[2:]
+        except OSError:
+            return None
+        for line in lines:
+            name, _, rest = line.partition(":")
+            if name.strip() != device:
+                continue
+            try:
+                link = float(rest.split()[1].rstrip("."))
+            except (IndexError, ValueError):
+                return None
+            return max(0, min(100, round(link * 100 / 70)))
+        return None
+
+    def _nmcli_signal(self):
+        try:
+            out = self._nmcli("-t", "-f", "IN-USE,SIGNAL", "dev", "wifi")
+            for line in out.splitlines():
+                if line.startswith("*:"):
+                    return int(line.split(":")[1])
+        except Exception:
+            pass
+        return None
+
+    # --- API ---
+
+    def active_network(self):
+        now = time.monotonic()
+        if self._dirty.is_set() or now >= self._expires:
+            self._dirty.clear()
+            self._device, self._dev_type = self._query_device()
+            # con il monitor attivo la cache vale finche' non arriva un evento
+            ttl = self.ttl_s * 6 if self.monitoring() else self.ttl_s
+            self._expires = now + ttl
+            self._signal_expires = 0.0
+        return self._device, self._dev_type
+
+    def wifi_signal_percent(self, device):
+        sig = self._proc_wireless_signal(device) if device else None
+        if sig is not None:
+            return sig
+        now = time.monotonic()
+        if now >= self._signal_expires:
+            self._signal = self._nmcli_signal()
+            self._signal_expires = now + self.ttl_s
+        return self._signal
+
+    def close(self):
+        proc = self._monitor
+        self._monitor = None
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=2)
+            except Exception:
+                proc.kill()
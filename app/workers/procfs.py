@@ -0,0 +1,137 @@
+import glob
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+# campi di /proc/stat sommati nel tempo totale (guest e guest_nice sono gia' in user/nice)
+_CPU_FIELDS = 8
+# idle + iowait: come psutil.cpu_percent
+_IDLE = (3, 4)
+
+# thermal zone della CPU: "cpu-thermal" sul Raspberry, "x86_pkg_temp" sui PC
+_CPU_ZONES = ("cpu-thermal", "cpu_thermal", "x86_pkg_temp", "soc_thermal")
+
+
+@dataclass
+class ProcSnapshot:
+    cpu: Tuple[int, int]                    # (busy, total) in jiffies
+    cores: Tuple[Tuple[int, int], ...]
+    mem_total_kb: int
+    mem_available_kb: int
+    net: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # nic -> (rx, tx) byte
+    temp: Optional[float] = None
+
+
+def cpu_percent(prev, cur):
+    # (busy, total) precedente e attuale -> % come psutil.cpu_percent(interval=None)
+    busy, total = cur[0] - prev[0], cur[1] - prev[1]
+    if total <= 0:
+        return 0.0
+    return round(max(0.0, min(100.0, busy * 100.0 / total)), 1)
+
+
+class ProcReader:
+    # /proc/stat, /proc/meminfo, /proc/net/dev e la temp della thermal zone CPU,
+    # con i file descriptor aperti una volta e riletti con os.pread ad ogni tick.
+    # proc_root/sys_root: alberi finti per i test.
+
+    def __init__(self, proc_root="/proc", sys_root="/sys"):
+        self.proc_root = proc_root
+        self.sys_root = sys_root
+        self._bufsize = {}
+        self._stat = self._open(os.path.join(proc_root, "stat"))
+        self._meminfo = self._open(os.path.join(proc_root, "meminfo"))
+        self._netdev = self._open(os.path.join(proc_root, "net", "dev"))
+        self.temp_path = self._thermal_zone()
+        self._temp = None
+        if self.temp_path is not None:
+            try:
+                self._temp = self._open(self.temp_path)
+            except OSError:
+                self.temp_path = None
+
+    @staticmethod
+    def available(proc_root="/proc"):
+        return all(os.path.exists(os.path.join(proc_root, *p))
+                   for p in (("stat",), ("meminfo",), ("net", "dev")))
+
+    def _open(self, path):
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        self._bufsize[fd] = 4096
+        return fd
+
+    def _pread(self, fd):
+        # i file di /proc dichiarano dimensione 0: si raddoppia il buffer finche' basta
+        size = self._bufsize[fd]
+        while True:
+            data = os.pread(fd, size, 0)
+            if len(data) < size:
+                return data
+            size *= 2
+            self._bufsize[fd] = size
+
+    def _thermal_zone(self):
+        zones = sorted(glob.glob(os.path.join(self.sys_root, "class", "thermal", "thermal_zone*")))
+        for zone in zones:
+            try:
+                with open(os.path.join(zone, "type")) as f:
+                    if f.read().strip() in _CPU_ZONES:
+                        return os.path.join(zone, "temp")
+            except OSError:
+                continue
+        return None
+
+    def read(self):
+        cpu, cores = None, []
+        for line in self._pread(self._stat).split(b"\n"):
+            if not line.startswith(b"cpu"):
+                break  # le righe cpu sono le prime di /proc/stat
+            parts = line.split()
+            times = [int(v) for v in parts[1:1 + _CPU_FIELDS]]
+            total = sum(times)
+            busy = total - sum(times[i] for i in _IDLE if i < len(times))
+            if parts[0] == b"cpu":
+                cpu = (busy, total)
+            else:
+                cores.append((busy, total))
+
+        total_kb = avail_kb = free_kb = 0
+        for line in self._pread(self._meminfo).split(b"\n"):
+            if line.startswith(b"MemTotal:"):
+                total_kb = int(line.split()[1])
+            elif line.startswith(b"MemAvailable:"):
+                avail_kb = int(line.split()[1])
+                break
+            elif line.startswith(b"MemFree:"):
+                free_kb = int(line.split()[1])
+        if not avail_kb:
+            avail_kb = free_kb  # kernel < 3.14
+
+        net = {}
+        for line in self._pread(self._netdev).split(b"\n")[2:]:
+            name, sep, rest = line.partition(b":")
+            if not sep:
+                continue
+            cols = rest.split()
+            net[name.strip().decode()] = (int(cols[0]), int(cols[8]))
+
+        temp = None
+        if self._temp is not None:
+            try:
+                temp = int(self._pread(self._temp).strip()) / 1000.0
+            except (OSError, ValueError):
+                temp = None
+
+        return ProcSnapshot(
+            cpu=cpu or (0, 0), cores=tuple(cores),
+            mem_total_kb=total_kb, mem_available_kb=avail_kb,
+            net=net, temp=temp,
+        )
+
+    def close(self):
+        for fd in list(self._bufsize):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._bufsize.clear()
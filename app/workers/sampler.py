@@ -0,0 +1,189 @@
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import psutil
+
+from app.workers.collectors import enabled_collectors
+from app.workers.network_state import NetworkStateProvider
+from app.workers.procfs import ProcReader, cpu_percent
+
+
+@dataclass(frozen=True)
+class Sample:
+    ts: float                  # epoch (secondi)
+    cpu: float
+    ram: float
+    temp: Optional[float]
+    up_kb: float
+    down_kb: float
+    net_device: Optional[str]
+    net_type: Optional[str]    # "wifi" | "ethernet" | None
+    wifi_signal: Optional[int]
+    ip: str
+    # metriche dei collector registrati: ((nome, unita', valore), ...)
+    extra: Tuple[Tuple[str, str, float], ...] = ()
+
+
+class MetricSampler:
+    # Nessuna dipendenza da Qt: legge /proc (o psutil) e nmcli e produce Sample immutabili.
+    # backend: "procfs" = ProcReader (fd aperti + pread, un solo passaggio per tick),
+    # "psutil" = una chiamata psutil per metrica, "auto" = procfs se disponibile.
+
+    def __init__(self, net_ttl_s=10.0, net_monitor=True, collectors=None,
+                 backend="auto", proc_root="/proc", sys_root="/sys"):
+        self.net_sent_prev = None
+        self.net_recv_prev = None
+        self.net_t_prev = None
+        self.network = NetworkStateProvider(ttl_s=net_ttl_s, use_monitor=net_monitor,
+                                            proc_root=proc_root, sys_root=sys_root)
+        self.collectors = enabled_collectors(collectors)
+        self._collector_state = {c.name: {} for c in self.collectors}
+        self._tick = 0
+
+        # IPv4 ethernet: cambia solo con la rete, stessa validita' della cache nmcli
+        self.net_ttl_s = float(net_ttl_s)
+        self._ip = (None, "", 0.0)  # (device, ip, scadenza)
+
+        self.proc = None
+        self._cpu_prev = None
+        if backend == "procfs" or (backend == "auto" and ProcReader.available(proc_root)):
+            try:
+                self.proc = ProcReader(proc_root, sys_root)
+            except OSError:
+                if backend == "procfs":
+                    raise
+        self.backend = "procfs" if self.proc is not None else "psutil"
+
+    def get_cpu_temperature(self):
+        try:
+            temps = psutil.sensors_temperatures()
+            if "cpu_thermal" in temps and temps["cpu_thermal"]:
+                return temps["cpu_thermal"][0].current
+        except Exception:
+            pass
+        return None
+
+    def get_ipv4(self, iface):
+        addrs = psutil.net_if_addrs().get(iface, [])
+        for a in addrs:
+            if a.family == 2:  # AF_INET
+                return a.address
+        return ""
+
+    def network_info(self):
+        # -> (device, tipo, segnale WiFi %, IPv4 ethernet)
+        device, dev_type = self.network.active_network()
+        sig = None
+        ip = ""
+        if dev_type == "wifi":
+            sig = self.network.wifi_signal_percent(device)
+        elif dev_type == "ethernet":
+            ip = self._cached_ipv4(device or "eth0")
+        return device, dev_type, sig, ip
+
+    def _cached_ipv4(self, device):
+        cached_dev, ip, expires = self._ip
+        now = time.monotonic()
+        if cached_dev != device or now >= expires:
+            ip = self.get_ipv4(device)
+            self._ip = (device, ip, now + self.net_ttl_s)
+        return ip
+
+    def sample_extra(self, snap=None):
+        extra = []
+        for c in self.collectors:
+            if self._tick % c.every:
+                continue
+            try:
+                values = c.run(self._collector_state[c.name], snap)
+            except Exception:
+                continue
+            extra.extend((name, c.unit, float(v)) for name, v in values.items())
+        self._tick += 1
+        return tuple(extra)
+
+    def sample(self):
+        # Il primo campione serve solo a inizializzare i contatori di rete -> None
+        ts = time.time()
+        snap = None
+        if self.proc is not None:
+            snap = self.proc.read()
+            prev, self._cpu_prev = self._cpu_prev, snap.cpu
+            cpu = cpu_percent(prev, snap.cpu) if prev is not None else 0.0
+            total = snap.mem_total_kb
+            ram = round((total - snap.mem_available_kb) * 100.0 / total, 1) if total else 0.0
+            temp = snap.temp if self.proc.temp_path is not None else self.get_cpu_temperature()
+            # stessa somma di psutil.net_io_counters() (lo compresa)
+            recv = sum(rx for rx, _ in snap.net.values())
+            sent = sum(tx for _, tx in snap.net.values())
+        else:
+            cpu = psutil.cpu_percent(interval=None)
+            ram = psutil.virtual_memory().percent
+            temp = self.get_cpu_temperature()
+            net = psutil.net_io_counters()
+            sent, recv = net.bytes_sent, net.bytes_recv
+
+        device, dev_type, sig, ip = self.network_info()
+
+        now = time.monotonic()
+        if self.net_sent_prev is None:
+            self.net_sent_prev = sent
+            self.net_recv_prev = recv
+            self.net_t_prev = now
+            return None
+
+        extra = self.sample_extra(snap)
+
+        # KB/s anche con intervallo di campionamento variabile
+        dt = max(1e-3, now - self.net_t_prev)
+        up_kb = (sent - self.net_sent_prev) / 1024.0 / dt
+        down_kb = (recv - self.net_recv_prev) / 1024.0 / dt
+        self.net_sent_prev = sent
+        self.net_recv_prev = recv
+        self.net_t_prev = now
+
+        return Sample(
+            ts=ts, cpu=cpu, ram=ram, temp=temp,
+            up_kb=up_kb, down_kb=down_kb,
+            net_device=device, net_type=dev_type,
+            wifi_signal=sig, ip=ip, extra=extra,
+        )
+
+    def close(self):
+        self.network.close()
+        if self.proc is not None:
+            self.proc.close()
+
+
+class AdaptiveInterval:
+    # Intervallo di campionamento adattivo: torna subito a fast_ms quando i valori
+    # cambiano in fretta (picco CPU, temperatura in salita), altrimenti rallenta
+    # gradualmente fino a slow_ms.
+
+    def __init__(self, fast_ms, slow_ms, cpu_delta=10.0, temp_rise=1.0, busy_cpu=80.0, backoff=1.5):
+        self.fast_ms = int(fast_ms)
+        self.slow_ms = max(self.fast_ms, int(slow_ms))
+        self.cpu_delta = cpu_delta
+        self.temp_rise = temp_rise
+        self.busy_cpu = busy_cpu
+        self.backoff = backoff
+        self.interval_ms = self.fast_ms
+        self._prev = None
+
+    def next(self, sample):
+        prev, self._prev = self._prev, sample
+        if prev is None:
+            return self.interval_ms
+
+        active = (
+            abs(sample.cpu - prev.cpu) >= self.cpu_delta
+            or sample.cpu >= self.busy_cpu
+            or (sample.temp is not None and prev.temp is not None
+                and sample.temp - prev.temp >= self.temp_rise)
+        )
+        if active:
+            self.interval_ms = self.fast_ms
+        else:
+            self.interval_ms = min(self.slow_ms, int(self.interval_ms * self.backoff))
+        return self.interval_ms
@@ -0,0 +1,100 @@
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from app import instrument
+from app.database.db_manager import ROLLUP_TIERS, get_db
+from app.timeseries import rows_to_arrays
+
+# ampiezza del bucket di ogni risoluzione e punti per chunk: lo storico e' letto a
+# blocchi allineati, cosi' i blocchi gia' letti si riusano mentre si scorre
+TIER_MS = dict(ROLLUP_TIERS, raw=1000)
+CHUNK_POINTS = 1000
+
+
+def chunk_ms(tier):
+    return TIER_MS[tier] * CHUNK_POINTS
+
+
+def chunk_spans(start_ms, end_ms, tier, prefetch=1):
+    # -> blocchi [(inizio, fine), ...] che coprono [start_ms, end_ms): prima i visibili,
+    # poi `prefetch` blocchi per lato (i prossimi probabili durante uno swipe)
+    size = chunk_ms(tier)
+    first, last = start_ms // size, max(start_ms, end_ms - 1) // size
+    order = list(range(first, last + 1))
+    for k in range(1, prefetch + 1):
+        order += [first - k, last + k]
+    return [(i * size, (i + 1) * size) for i in order]
+
+
+@dataclass
+class ViewportChunk:
+    start_ms: int
+    end_ms: int
+    tier: str
+    ts: np.ndarray        # epoch-ms
+    values: np.ndarray    # (n, 5) come MetricRing; nei rollup righe min/max alternate
+    read_at: float        # epoch della lettura
+    complete: bool        # False = blocco che arriva fino ad "adesso", da rileggere
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def nbytes(self):
+        return self.ts.nbytes + self.values.nbytes
+
+
+@dataclass
+class WindowRows:
+    generation: int
+    key: tuple            # (secondi, risoluzione) come in WindowCache
+    ts: np.ndarray        # epoch-ms
+    values: np.ndarray    # (n, 5) come MetricRing
+
+
+class ViewportLoader(QObject):
+    # Vive in un QThread: legge i blocchi di storico chiesti da HistoryPage e le righe
+    # della finestra mostrata (caricamento iniziale e incrementi senza stream live).
+    # `generation` e' scritta dal thread GUI a ogni nuova vista: le richieste di una
+    # generazione precedente (l'utente ha continuato a scorrere) vengono abbandonate
+    # tra un blocco e l'altro, senza arrivare al DB.
+    loaded = pyqtSignal(object)
+    window_loaded = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.generation = 0
+        self.db = None
+
+    @pyqtSlot(int, str, object)
+    def fetch(self, generation, tier, spans):
+        if self.db is None:
+            self.db = get_db()
+        for i, (start, end) in enumerate(spans):
+            if generation != self.generation:
+                instrument.count("history.viewport_cancelled", len(spans) - i)
+                return
+            with instrument.timed("history.viewport_query"):
+                _, rows = self.db.query_window(start, end, tier=tier, envelope=True)
+            ts, values = rows_to_arrays(rows)
+            now = time.time()
+            self.loaded.emit(ViewportChunk(start, end, tier, ts, values, now, complete=end <= now * 1000))
+
+    @pyqtSlot(int, object, object, object)
+    def load_window(self, generation, key, after_ms, until_ms):
+        # righe della finestra mostrata con ts in (after_ms, until_ms): grezze per gli
+        # intervalli brevi (dopo il flush del buffer), medie dei rollup per quelli lunghi
+        if self.db is None:
+            self.db = get_db()
+        _, tier = key
+        with instrument.timed("history.window_query"):
+            if tier == "raw":
+                self.db.flush()
+                rows = [r for r in self.db.since(after_ms) if r[0] < until_ms]
+            else:
+                _, rows = self.db.query_window(after_ms + 1, until_ms, tier=tier)
+        ts, values = rows_to_arrays(rows)
+        self.window_loaded.emit(WindowRows(generation, key, ts, values))
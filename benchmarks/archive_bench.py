@@ -0,0 +1,114 @@
+# Archivio compresso vs tabella metrics: spazio su disco e velocita' di lettura.
+#
+# Lavora su un DB temporaneo (mai ~/touchui/metrics.db) riempito con dati sintetici
+# a 1 s, poi archivia tutti i blocchi chiusi e confronta:
+#   - byte/riga nella tabella metrics (pagine SQLite) e nei blob dell'archivio
+#   - lettura di un'ora: SELECT sulla tabella vs decodifica di un blocco
+#   - errore massimo introdotto dalla quantizzazione
+#
+#   python -m benchmarks.archive_bench --days 7 --json results/archive.json
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from app.database import db_manager
+from app.database.archive import block_rows
+from benchmarks.fixtures import synthetic_rows
+
+
+def table_bytes(conn, table):
+    # byte occupati dalla tabella (None se SQLite e' compilato senza dbstat)
+    try:
+        return conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (table,)).fetchone()[0] or 0
+    except Exception:
+        return None
+
+
+def timed(fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def run(days, block_s):
+    tmp = Path(tempfile.mkdtemp(prefix="archive_bench_"))
+    db_manager.DB_PATH = tmp / "metrics.db"
+    db = db_manager.DBManager(wal=True, flush_rows=1000, flush_s=60)
+
+    rows = synthetic_rows(days, int((time.time() - 7200) * 1000))
+    with db.writer() as conn, conn:
+        conn.executemany("INSERT OR REPLACE INTO metrics(ts,cpu,ram,temp,up_kb,down_kb) VALUES (?,?,?,?,?,?)", rows)
+    n_rows = len(rows)
+    hot_bytes = table_bytes(db.conn, "metrics")
+
+    # un'ora piena nel mezzo, letta dalla tabella prima dell'archiviazione
+    mid = rows[n_rows // 2][0]
+    h0 = (mid // (block_s * 1000)) * block_s * 1000
+    h1 = h0 + block_s * 1000
+    select_ms = timed(lambda: db._read(
+        "SELECT ts,cpu,ram,temp,up_kb,down_kb FROM metrics WHERE ts >= ? AND ts < ? ORDER BY ts", (h0, h1)))
+    reference = db._read(
+        "SELECT ts,cpu,ram,temp,up_kb,down_kb FROM metrics WHERE ts >= ? AND ts < ? ORDER BY ts", (h0, h1))
+
+    t0 = time.perf_counter()
+    blocks = 0
+    while db.archive_block(rows[-1][0] + 1, block_s * 1000):
+        blocks += 1
+    archive_s = time.perf_counter() - t0
+    arch = db.archive_stats()
+
+    n, blob = db._read("SELECT n, data FROM metrics_archive WHERE start_ts = ?", (h0,))[0]
+    decode_ms = timed(lambda: block_rows(n, blob))
+    window_ms = timed(lambda: db.query_window(h0, h1, max_points=10 ** 9))
+    decoded = block_rows(n, blob)
+
+    max_err = [0.0] * 5
+    for a, b in zip(reference, decoded):
+        for i, (x, y) in enumerate(zip(a[1:], b[1:])):
+            if x is not None and y is not None:
+                max_err[i] = max(max_err[i], abs(x - y))
+
+    db.close()
+    shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "days": days,
+        "block_s": block_s,
+        "rows": n_rows,
+        "table_bytes": hot_bytes,
+        "table_bytes_per_row": hot_bytes / n_rows if hot_bytes else None,
+        "archive_bytes": arch["bytes"],
+        "archive_bytes_per_row": arch["bytes"] / max(1, arch["rows"]),
+        "archive_blocks": blocks,
+        "archive_rows_per_s": arch["rows"] / archive_s if archive_s else None,
+        "ratio": hot_bytes / arch["bytes"] if hot_bytes and arch["bytes"] else None,
+        "select_hour_ms": select_ms,
+        "decode_hour_ms": decode_ms,
+        "query_window_hour_ms": window_ms,
+        "roundtrip_ok": [r[0] for r in reference] == [r[0] for r in decoded],
+        "max_abs_error": dict(zip(db_manager.METRICS, max_err)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark archivio compresso")
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--block-s", type=int, default=3600)
+    parser.add_argument("--json", help="salva i risultati in questo file")
+    args = parser.parse_args(argv)
+
+    result = run(args.days, args.block_s)
+    for key, value in result.items():
+        print(f"{key:24} {value}")
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Confronto tra due risultati di benchmarks.run (es. prima/dopo un commit).
+#
+#   python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+#   python -m benchmarks.compare old.json new.json --key p50_ms --threshold 10
+import argparse
+import json
+
+
+def flatten(data, prefix=""):
+    # {"a": {"b": 1}} -> {"a.b": 1}, solo valori numerici
+    out = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Confronta due risultati di benchmark")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--key", default="", help="solo le metriche che contengono questa stringa")
+    parser.add_argument("--threshold", type=float, default=0.0, help="mostra solo variazioni oltre questa %%")
+    args = parser.parse_args(argv)
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"old: {old['meta'].get('commit')}  new: {new['meta'].get('commit')}")
+
+    a = flatten({k: v for k, v in old.items() if k != "meta"})
+    b = flatten({k: v for k, v in new.items() if k != "meta"})
+    for name in sorted(set(a) & set(b)):
+        if args.key not in name:
+            continue
+        if a[name]:
+            change = (b[name] - a[name]) / abs(a[name]) * 100.0
+        else:
+            change = 0.0 if not b[name] else float("inf")
+        if abs(change) < args.threshold:
+            continue
+        print(f"{name:60} {a[name]:14.3f} {b[name]:14.3f} {change:+8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
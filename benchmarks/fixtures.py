@@ -0,0 +1,147 @@
+# DB sintetici a 1 s per i benchmark, generati una volta e riusati.
+#
+# Ogni fixture finisce a un istante fisso (end_ms, salvato accanto al DB in un .json):
+# i benchmark "congelano" time.time() su quell'istante, cosi' una fixture creata ieri
+# da' gli stessi risultati di una appena generata.
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from app.database import db_manager
+
+DEFAULT_DIR = Path("/tmp/touchui-bench")
+
+
+def synthetic_arrays(days, end_ms, seed=1):
+    # -> (ts int64, valori (n, 5)) random walk: CPU rumorosa, RAM lenta,
+    # temperatura a 3 decimali con qualche buco, rete a burst
+    rng = np.random.default_rng(seed)
+    n = int(days * 86400)
+    ts = end_ms - (n - np.arange(n, dtype=np.int64)) * 1000 + rng.integers(-3, 4, n)
+
+    def walk(start, step, lo, hi):
+        return np.clip(start + np.cumsum(rng.normal(0, step, n)), lo, hi)
+
+    cpu = np.round(np.abs(walk(0, 2.0, -100, 100)), 1)
+    ram = np.round(walk(35, 0.05, 0, 100), 1)
+    temp = np.round(walk(45, 0.05, 30, 85), 3)
+    temp[17::3600] = np.nan
+    burst = rng.random(n) < 0.05
+    up = np.round(rng.exponential(np.where(burst, 200.0, 2.0)), 2)
+    down = np.round(rng.exponential(np.where(burst, 800.0, 10.0)), 2)
+    return ts, np.column_stack([cpu, ram, temp, up, down])
+
+
+def synthetic_rows(days, end_ms=None, seed=1):
+    # stesse righe in formato DB (temp mancante = None)
+    if end_ms is None:
+        end_ms = int(time.time() * 1000)
+    ts, values = synthetic_arrays(days, end_ms, seed)
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return [(t, *v) for t, v in zip(ts.tolist(), out.tolist())]
+
+
+@contextmanager
+def use_db(path):
+    # punta il servizio DB condiviso (get_db) su un file diverso da ~/touchui/metrics.db
+    old = db_manager.DB_PATH
+    db_manager.close_db()
+    db_manager.DB_PATH = Path(path)
+    try:
+        yield db_manager.get_db()
+    finally:
+        db_manager.close_db()
+        db_manager.DB_PATH = old
+
+
+def fixture(days, directory=DEFAULT_DIR, archive_after_h=24):
+    # -> (percorso DB, end_ms); crea la fixture solo se manca
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"metrics_{days:g}d.db"
+    meta_path = path.with_suffix(".json")
+    if path.exists() and meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        if meta.get("schema") == db_manager.SCHEMA_VERSION:
+            return path, meta["end_ms"]
+    for old in directory.glob(path.name + "*"):
+        old.unlink()
+
+    end_ms = (int(time.time()) // 3600) * 3600 * 1000
+    t0 = time.perf_counter()
+    with use_db(path) as db:
+        day = 86400
+        # un giorno alla volta: memoria costante anche con 90 giorni
+        for d in range(int(np.ceil(days))):
+            span = min(1.0, days - d)
+            rows = synthetic_rows(span, end_ms - int((days - d - span) * day * 1000), seed=d + 1)
+            with db.writer() as conn, conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO metrics(ts,cpu,ram,temp,up_kb,down_kb) VALUES (?,?,?,?,?,?)",
+                    rows,
+                )
+        with db.writer() as conn, conn:
+            db._update_rollups(0)
+        # stato a regime: tutto cio' che e' piu' vecchio di archive_after_h e' archiviato
+        if archive_after_h:
+            before = end_ms - int(archive_after_h * 3600 * 1000)
+            while db.archive_block(before):
+                pass
+
+    meta_path.write_text(json.dumps({
+        "days": days,
+        "end_ms": end_ms,
+        "schema": db_manager.SCHEMA_VERSION,
+        "build_s": time.perf_counter() - t0,
+    }))
+    return path, end_ms
+
+
+def proc_tree(directory, cores=4, tick=0, temp_mc=48312):
+    # albero /proc + /sys minimo per ProcReader e NetworkStateProvider;
+    # `tick` fa avanzare i contatori (chiamate successive = campioni successivi)
+    root = Path(directory)
+    proc, sys_ = root / "proc", root / "sys"
+    (proc / "net").mkdir(parents=True, exist_ok=True)
+
+    def times(i):
+        user, system, idle = 1000 + tick * (30 + i), 500 + tick * 10, 9000 + tick * (60 - i)
+        return f"{user} 5 {system} {idle} 20 0 3 0 0 0"
+
+    lines = [f"cpu  {times(0)}"] + [f"cpu{i} {times(i)}" for i in range(cores)]
+    lines += ["intr 12345 0 0", "ctxt 67890", "btime 1700000000", "processes 4242",
+              "procs_running 2", "procs_blocked 0"]
+    (proc / "stat").write_text("\n".join(lines) + "\n")
+    (proc / "meminfo").write_text(
+        "MemTotal:        3884096 kB\n"
+        "MemFree:         1200000 kB\n"
+        f"MemAvailable:    {2900000 - tick * 10} kB\n"
+        "Buffers:           80000 kB\n"
+        "Cached:          1500000 kB\n"
+    )
+    dev = ["Inter-|   Receive                                                |  Transmit",
+           " face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets "
+           "errs drop fifo colls carrier compressed"]
+    for i, nic in enumerate(("lo", "eth0", "wlan0")):
+        rx, tx = 1_000_000 * (i + 1) + tick * 9000 * i, 500_000 * (i + 1) + tick * 1500 * i
+        dev.append(f"{nic:>6}: {rx} {tick} 0 0 0 0 0 0 {tx} {tick} 0 0 0 0 0 0")
+    (proc / "net" / "dev").write_text("\n".join(dev) + "\n")
+    (proc / "net" / "wireless").write_text(
+        "Inter-| sta-|   Quality        |   Discarded packets\n"
+        " face | tus | link level noise |  nwid  crypt   frag  retry   misc | beacon | 22\n"
+        " wlan0: 0000   49.  -61.  -256        0      0      0      0      0        0\n"
+    )
+
+    zone = sys_ / "class" / "thermal" / "thermal_zone0"
+    zone.mkdir(parents=True, exist_ok=True)
+    (zone / "type").write_text("cpu-thermal\n")
+    (zone / "temp").write_text(f"{temp_mc + tick * 10}\n")
+    for nic, state in (("lo", "unknown"), ("eth0", "up"), ("wlan0", "down")):
+        (sys_ / "class" / "net" / nic).mkdir(parents=True, exist_ok=True)
+        (sys_ / "class" / "net" / nic / "operstate").write_text(state + "\n")
+    (sys_ / "class" / "net" / "wlan0" / "wireless").mkdir(exist_ok=True)
+    return str(proc), str(sys_)
@@ -0,0 +1,91 @@
+# psutil / nmcli / vcgencmd finti: i benchmark misurano il nostro codice,
+# non il kernel o NetworkManager della macchina su cui girano.
+import itertools
+import subprocess
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+import psutil
+
+from app.workers import collectors
+
+_NetIO = namedtuple("snetio", "bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout")
+_DiskIO = namedtuple("sdiskio", "read_count write_count read_bytes write_bytes read_time write_time")
+_Mem = namedtuple("svmem", "total available percent used free")
+_CpuTimes = namedtuple("scputimes", "user nice system idle iowait irq softirq steal guest guest_nice")
+_Temp = namedtuple("shwtemp", "label current high critical")
+_Addr = namedtuple("snicaddr", "family address netmask broadcast ptp")
+
+NMCLI_DEVICES = "eth0:ethernet:connected\nwlan0:wifi:disconnected\nlo:loopback:unmanaged\n"
+
+
+class FakeSystem:
+    # contatori monotoni e valori deterministici
+    def __init__(self, cores=4, nics=("eth0", "wlan0")):
+        self.cores = cores
+        self.nics = nics
+        self._tick = itertools.count()
+        self.nmcli_calls = 0
+
+    def cpu_percent(self, interval=None, percpu=False):
+        t = next(self._tick)
+        if percpu:
+            return [float((t * 7 + i * 13) % 100) for i in range(self.cores)]
+        return float((t * 7) % 100)
+
+    def cpu_times(self, percpu=False):
+        t = next(self._tick)
+        per = [_CpuTimes(t * (i + 1), 0, t, t * 3, 0, 0, 0, 0, 0, 0) for i in range(self.cores)]
+        if percpu:
+            return per
+        return _CpuTimes(*(sum(c[k] for c in per) for k in range(10)))
+
+    def virtual_memory(self):
+        return _Mem(4 << 30, 3 << 30, 25.0, 1 << 30, 2 << 30)
+
+    def net_io_counters(self, pernic=False):
+        t = next(self._tick)
+        per = {nic: _NetIO(t * 1500 * (i + 1), t * 9000 * (i + 1), t, t, 0, 0, 0, 0)
+               for i, nic in enumerate(self.nics)}
+        if pernic:
+            return per
+        return _NetIO(*(sum(c[k] for c in per.values()) for k in range(8)))
+
+    def disk_io_counters(self):
+        t = next(self._tick)
+        return _DiskIO(t, t, t * 4096, t * 8192, t, t)
+
+    def sensors_temperatures(self):
+        return {"cpu_thermal": [_Temp("", 48.3, None, None)]}
+
+    def net_if_addrs(self):
+        return {"eth0": [_Addr(2, "192.0.2.10", "255.255.255.0", None, None)]}
+
+    def check_output(self, args, **kwargs):
+        if args[0] == "nmcli":
+            self.nmcli_calls += 1
+            if "device" in args:
+                return NMCLI_DEVICES.encode()
+            return b"*:70\n"
+        if args[0] == "vcgencmd":
+            return b"throttled=0x0\n"
+        raise FileNotFoundError(args[0])
+
+    def popen(self, *args, **kwargs):
+        # niente `nmcli monitor`: si usa la cache con TTL
+        raise FileNotFoundError("nmcli")
+
+
+@contextmanager
+def mocked_system(**kwargs):
+    fake = FakeSystem(**kwargs)
+    with ExitStack() as stack:
+        for name in ("cpu_percent", "cpu_times", "virtual_memory", "net_io_counters", "disk_io_counters",
+                     "sensors_temperatures", "net_if_addrs"):
+            stack.enter_context(mock.patch.object(psutil, name, getattr(fake, name), create=True))
+        stack.enter_context(mock.patch.object(subprocess, "check_output", fake.check_output))
+        stack.enter_context(mock.patch.object(subprocess, "Popen", fake.popen))
+        stack.enter_context(mock.patch.object(collectors, "THROTTLED_PATH", "/nonexistent"))
+        yield fake
+
@@ -0,0 +1,90 @@
+# Costo per campione: backend procfs (fd aperti + pread) contro le chiamate psutil.
+#
+# Misura sia le sole letture (le 5 metriche base + per-core/per-interfaccia dei
+# collector) sia MetricSampler.sample() completo con i due backend. nmcli e' finto,
+# cosi' il tempo e' solo lettura/parsing di /proc e /sys.
+#
+#   python -m benchmarks.procfs_bench                  /proc reale
+#   python -m benchmarks.procfs_bench --fixture        albero /proc finto (benchmarks.fixtures)
+#   python -m benchmarks.procfs_bench --json out.json
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import psutil
+
+from app.workers.procfs import ProcReader
+from app.workers.sampler import MetricSampler
+from benchmarks.fixtures import proc_tree
+from benchmarks.mocks import FakeSystem
+
+
+def psutil_reads():
+    psutil.cpu_percent(interval=None)
+    psutil.virtual_memory()
+    psutil.sensors_temperatures()
+    psutil.net_io_counters()
+    psutil.net_if_addrs()
+    psutil.cpu_percent(percpu=True)
+    psutil.net_io_counters(pernic=True)
+
+
+def per_call_us(fn, n):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def run(n, proc_root, sys_root):
+    reader = ProcReader(proc_root, sys_root)
+    out = {
+        "proc_root": proc_root,
+        "thermal_zone": reader.temp_path,
+        "reads_psutil_us": per_call_us(psutil_reads, n),
+        "reads_procfs_us": per_call_us(reader.read, n),
+    }
+    reader.close()
+
+    fake = FakeSystem()
+    with mock.patch.object(subprocess, "check_output", fake.check_output), \
+            mock.patch.object(subprocess, "Popen", fake.popen):
+        for backend in ("psutil", "procfs"):
+            sampler = MetricSampler(net_monitor=False, backend=backend,
+                                    proc_root=proc_root, sys_root=sys_root)
+            out[f"sample_{backend}_us"] = per_call_us(sampler.sample, n)
+            sampler.close()
+
+    out["reads_speedup"] = out["reads_psutil_us"] / out["reads_procfs_us"]
+    out["sample_speedup"] = out["sample_psutil_us"] / out["sample_procfs_us"]
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark backend procfs vs psutil")
+    parser.add_argument("-n", type=int, default=2000, help="campioni per misura")
+    parser.add_argument("--fixture", action="store_true", help="usa un albero /proc finto")
+    parser.add_argument("--json", help="salva i risultati in questo file")
+    args = parser.parse_args(argv)
+
+    proc_root, sys_root = "/proc", "/sys"
+    if args.fixture:
+        proc_root, sys_root = proc_tree(tempfile.mkdtemp(prefix="procfs_bench_"))
+        # psutil legge /proc da PROCFS_PATH: stesso albero per entrambi
+        psutil.PROCFS_PATH = proc_root
+
+    result = run(args.n, proc_root, sys_root)
+    for key, value in result.items():
+        print(f"{key:20} {value}")
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
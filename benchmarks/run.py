@@ -0,0 +1,341 @@
+# Suite di benchmark per i percorsi caldi: campionamento, DB, storico, rendering.
+#
+# Gira offscreen, con HOME temporanea (settings/DB/socket reali mai toccati),
+# psutil/nmcli finti (benchmarks/mocks.py) e DB sintetici a 1 s (benchmarks/fixtures.py).
+# I risultati sono un JSON confrontabile tra commit con benchmarks/compare.py.
+#
+#   python -m benchmarks.run                      fixture 1/7/90 giorni
+#   python -m benchmarks.run --days 1 --repeat 5  giro veloce
+#   python -m benchmarks.compare old.json new.json
+import os
+import sys
+import tempfile
+
+# prima di importare Qt e app.*: percorsi derivati da Path.home() al momento dell'import
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["HOME"] = tempfile.mkdtemp(prefix="touchui-bench-home-")
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import resource  # noqa: E402
+import subprocess  # noqa: E402
+import time  # noqa: E402
+from dataclasses import replace  # noqa: E402
+from pathlib import Path  # noqa: E402
+from unittest import mock  # noqa: E402
+
+import numpy as np  # noqa: E402
+import pyqtgraph as pg  # noqa: E402
+from PyQt5.QtCore import QT_VERSION_STR  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from app.alerts import AlertEngine  # noqa: E402
+from app.database import db_manager  # noqa: E402
+from app.settings_store import DEFAULTS, save_settings  # noqa: E402
+from app.workers.collectors import REGISTRY  # noqa: E402
+from app.workers.sampler import MetricSampler, Sample  # noqa: E402
+from benchmarks.fixtures import DEFAULT_DIR, fixture, proc_tree, use_db  # noqa: E402
+from benchmarks.mocks import mocked_system  # noqa: E402
+
+REPO = Path(__file__).resolve().parents[1]
+
+# intervalli di HistoryPage.pick_range
+HISTORY_RANGES = {"5 min": 300, "30 min": 1800, "2 ore": 7200, "12 ore": 43200}
+
+RENDER_POINTS = (300, 1800, 7200, 43200, 86400)
+
+
+def summary(ms):
+    ms = np.asarray(ms, dtype=np.float64)
+    return {
+        "n": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def timed(fn, repeat):
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def rss_mb():
+    # ru_maxrss in KiB su Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def meta():
+    def git(*args):
+        try:
+            return subprocess.check_output(["git", *args], cwd=REPO, stderr=subprocess.DEVNULL).decode().strip()
+        except Exception:
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pyqtgraph": pg.__version__,
+        "qt": QT_VERSION_STR,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def fake_sample(i, extra=()):
+    return Sample(
+        ts=time.time() + i, cpu=float(i % 100), ram=40.0, temp=50.0 + (i % 10),
+        up_kb=12.5, down_kb=80.0, net_device="eth0", net_type="ethernet",
+        wifi_signal=None, ip="192.0.2.10", extra=extra,
+    )
+
+
+# --- avvio ---
+
+def bench_startup(repeat):
+    # processo nuovo per ogni misura: `main.py --startup-timing` stampa i traguardi e esce
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, str(REPO / "main.py"), "--startup-timing"],
+                                      cwd=REPO, stderr=subprocess.DEVNULL, timeout=60)
+        runs.append(json.loads(out.decode().strip().splitlines()[-1]))
+    return {name: summary([r[name]["ms"] for r in runs if name in r])
+            for name in ("qapplication", "first_paint", "interactive")}
+
+
+# --- campionamento ---
+
+def bench_tick(tmp, repeat):
+    # psutil finto e albero /proc finto: entrambi i backend su dati deterministici.
+    # Con psutil finto non c'e' parsing di /proc: il confronto reale e' benchmarks.procfs_bench
+    out = {}
+    proc_root, sys_root = proc_tree(tmp / "procfs")
+    for backend in ("psutil", "procfs"):
+        with mocked_system() as fake:
+            sampler = MetricSampler(net_monitor=False, collectors=list(REGISTRY), backend=backend,
+                                    proc_root=proc_root, sys_root=sys_root)
+            sampler.sample()  # primo giro: solo inizializzazione contatori
+            ms = timed(sampler.sample, repeat)
+            sampler.close()
+        out[backend] = summary(ms)
+        out[backend]["nmcli_calls"] = fake.nmcli_calls
+    return out
+
+
+def bench_alerts(ticks, n_rules=48):
+    # regole di default replicate con soglie diverse + regole sulle serie estese;
+    # valori che attraversano le soglie, cosi' si pagano anche i cambi di stato
+    extra = tuple((f"cpu.core{i}", "%", 0.0) for i in range(4)) + (("load.1m", "", 0.5),)
+    rules = []
+    for i in range(n_rules):
+        spec = dict(DEFAULTS["alert_rules"][i % len(DEFAULTS["alert_rules"])])
+        spec["name"] = f"{spec['name']} #{i}"
+        spec["value"] = spec["value"] - i % 7
+        if i % 6 == 5:
+            spec.update(metric=f"cpu.core{i % 4}", value=90, clear=80, rate_s=None)
+        rules.append(spec)
+    engine = AlertEngine(rules)
+    # temperatura che oscilla tra 55 e 85 gradi: soglie, isteresi e rate scattano e rientrano
+    samples = [replace(fake_sample(i, extra), temp=70.0 + 15.0 * np.sin(i / 40.0)) for i in range(ticks)]
+    events = 0
+    ms = []
+    for s in samples:
+        t0 = time.perf_counter()
+        events += len(engine.evaluate(s))
+        ms.append((time.perf_counter() - t0) * 1000.0)
+    out = summary(ms)
+    out.update(rules=len(engine.rules), events=events)
+    return out
+
+
+def bench_dashboard(repeat):
+    from app.widgets.system_monitor_widget import SystemMonitorWidget
+
+    w = SystemMonitorWidget()
+    w.resize(800, 300)
+    w.show()
+    QApplication.processEvents()
+    w.render_timer.stop()  # render() chiamato a mano
+
+    with mocked_system():
+        sampler = MetricSampler(net_monitor=False, collectors=list(REGISTRY), backend="psutil")
+        sampler.sample()
+        extra = sampler.sample().extra
+        sampler.close()
+
+    samples = [fake_sample(i, extra) for i in range(repeat)]
+    update, render = [], []
+    for s in samples:
+        t0 = time.perf_counter()
+        w.update_stats(s)
+        t1 = time.perf_counter()
+        w.render()
+        t2 = time.perf_counter()
+        update.append((t1 - t0) * 1000.0)
+        render.append((t2 - t1) * 1000.0)
+    w.shutdown()
+    w.close()
+    return {"update_stats": summary(update), "render": summary(render)}
+
+
+# --- DB ---
+
+def bench_insert(tmp, rows):
+    out = {}
+    extra = fake_sample(0, tuple((f"bench.{i}", "", float(i)) for i in range(8))).extra
+    configs = {
+        "wal_batch10": dict(wal=True, flush_rows=10, flush_s=10),
+        "wal_batch1": dict(wal=True, flush_rows=1, flush_s=0),
+        "journal_batch1": dict(wal=False, flush_rows=1, flush_s=0),
+    }
+    for name, kw in configs.items():
+        db_manager.DB_PATH = tmp / f"insert_{name}.db"
+        db = db_manager.DBManager(**kw)
+        n = rows if kw["flush_rows"] > 1 else max(100, rows // 10)
+        t0 = time.time() - n
+        ms = []
+        for i in range(n):
+            s0 = time.perf_counter()
+            db.insert(cpu=i % 100, ram=40.0, temp=50.0, up_kb=1.0, down_kb=2.0, ts=t0 + i, extra=extra)
+            ms.append((time.perf_counter() - s0) * 1000.0)
+        db.flush()
+        total_s = sum(ms) / 1000.0
+        out[name] = {"rows": n, "rows_per_s": n / total_s if total_s else None,
+                     "insert": summary(ms), "write_stats": db.write_stats()}
+        db.close()
+    return out
+
+
+def bench_fixture(days, directory, repeat):
+    from app.pages.history_page import HistoryPage
+
+    t0 = time.perf_counter()
+    path, end_ms = fixture(days, directory)
+    out = {"fixture_s": time.perf_counter() - t0, "db_bytes": path.stat().st_size}
+    now = end_ms / 1000.0
+
+    # tempo congelato alla fine della fixture: intervalli "ultimi N minuti" sempre pieni
+    with use_db(path) as db, mock.patch.object(time, "time", lambda: now):
+        out["archive"] = db.archive_stats()
+        out["last_n_600"] = summary(timed(lambda: db.last_n(600), repeat))
+
+        ranges = {}
+        page = HistoryPage()
+        page.resize(800, 480)
+        page.show()
+        QApplication.processEvents()
+        page.timer.stop()
+        for label, seconds in HISTORY_RANGES.items():
+            start = end_ms - seconds * 1000
+            r = {
+                "query_window": summary(timed(lambda: db.query_window(start, end_ms), repeat)),
+                "since": summary(timed(lambda: db.since(start - 1), repeat)),
+            }
+
+            page._range = label
+
+            def load():
+                # la lettura gira nel thread del loader: si misura fino all'arrivo delle righe
+                page._reset_window()
+                page.refresh()
+                while not page._loaded:
+                    QApplication.processEvents()
+
+            r["history_refresh"] = summary(timed(load, repeat))
+            r["history_redraw"] = summary(timed(page._redraw, repeat))
+            r["rows"] = len(page.series)
+            ranges[label] = r
+        page.shutdown()
+        page.close()
+        out["ranges"] = ranges
+
+        # lettura di tutto lo storico come l'export (blocchi archiviati compresi)
+        t0 = time.perf_counter()
+        n = sum(len(c) for c in db.iter_range(0, end_ms + 1))
+        out["iter_all"] = {"rows": n, "ms": (time.perf_counter() - t0) * 1000.0}
+    out["rss_mb"] = rss_mb()
+    return out
+
+
+# --- rendering ---
+
+def bench_render(repeat):
+    plot = pg.PlotWidget(axisItems={"bottom": pg.DateAxisItem(orientation="bottom")})
+    plot.resize(800, 480)
+    plot.show()
+    curve = plot.plot([], pen=pg.mkPen(width=2), connect="finite")
+    QApplication.processEvents()
+
+    out = {}
+    rng = np.random.default_rng(1)
+    for n in RENDER_POINTS:
+        x = time.time() - n + np.arange(n, dtype=np.float64)
+        y = np.clip(np.cumsum(rng.normal(0, 2, n)), 0, 100)
+
+        def set_data():
+            curve.setData(x, y)
+
+        def set_and_paint():
+            # grab(): disegno sincrono completo della scena, come un frame a schermo
+            curve.setData(x, y)
+            plot.grab()
+
+        out[str(n)] = {"set_data": summary(timed(set_data, repeat)),
+                       "set_data_paint": summary(timed(set_and_paint, repeat))}
+    plot.close()
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark touch dashboard")
+    parser.add_argument("--days", default="1,7,90", help="fixture da usare (giorni, separati da virgola)")
+    parser.add_argument("--fixtures-dir", default=str(DEFAULT_DIR))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=500)
+    parser.add_argument("--insert-rows", type=int, default=5000)
+    parser.add_argument("--out", help="file JSON (default benchmarks/results/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    home = Path(os.environ["HOME"])
+    settings = dict(DEFAULTS, collector="external", ipc_publish=False, net_monitor=False)
+    save_settings(settings)
+
+    results = {"meta": meta()}
+    steps = [
+        ("startup", lambda: bench_startup(max(3, args.repeat // 4))),
+        ("tick", lambda: bench_tick(home, args.ticks)),
+        ("alerts", lambda: bench_alerts(args.ticks)),
+        ("dashboard", lambda: bench_dashboard(args.ticks)),
+        ("insert", lambda: bench_insert(home, args.insert_rows)),
+        ("render", lambda: bench_render(args.repeat)),
+    ]
+    for d in args.days.split(","):
+        days = float(d)
+        steps.append((f"fixture_{days:g}d", lambda days=days: bench_fixture(days, args.fixtures_dir, args.repeat)))
+
+    for name, fn in steps:
+        t0 = time.perf_counter()
+        results[name] = fn()
+        print(f"{name:16} {time.perf_counter() - t0:7.1f} s   rss {rss_mb():6.1f} MB", flush=True)
+    results["peak_rss_mb"] = rss_mb()
+
+    out = Path(args.out) if args.out else REPO / "benchmarks" / "results" / f"{(results['meta']['commit'] or 'local')[:10]}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"risultati: {out}")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,31 @@
 import sys
+
+from app import instrument  # per primo: origine dei tempi di avvio
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QApplication
 from app.main_window import MainWindow
 from app.styles.theme import DARK_QSS
 
+
+def report_startup(app, window):
+    # --startup-timing: tempi di avvio su stdout (JSON), poi uscita
+    import json
+    print(json.dumps(instrument.marks()), flush=True)
+    window.shutdown()
+    app.exit(0)
+
+
 def main():
+    timing = "--startup-timing" in sys.argv
     QApplication.setAttribute(Qt.AA_SynthesizeMouseForUnhandledTouchEvents, True)
     QApplication.setAttribute(Qt.AA_SynthesizeTouchForUnhandledMouseEvents, True)
     app = QApplication(sys.argv)
     app.setStyleSheet(DARK_QSS)
+    instrument.mark("qapplication")
     w = MainWindow()
+    if timing:
+        # app.exit() non passa da closeEvent: niente dialogo di conferma
+        w.interactive.connect(lambda: report_startup(app, w))
     w.show()
     sys.exit(app.exec_())
 
@@ -0,0 +1,147 @@
+import os
+import queue
+import time
+
+import pytest
+
+from app.workers import network_state
+from app.workers.network_state import NetworkStateProvider
+
+
+class FakeMonitor:
+    # `nmcli monitor` finto: le righe scritte con emit() arrivano su stdout
+    def __init__(self):
+        self._lines = queue.Queue()
+        self.terminated = False
+        self.stdout = iter(self._lines.get, None)
+
+    def emit(self, line):
+        self._lines.put(line.encode() + b"\n")
+
+    def terminate(self):
+        self.terminated = True
+        self._lines.put(None)
+
+    def wait(self, timeout=None):
+        return 0
+
+    def kill(self):
+        self.terminate()
+
+
+@pytest.fixture
+def nmcli(monkeypatch):
+    # nmcli finto: uscita di `nmcli device` modificabile dal test, chiamate contate
+    state = {"device": "wlan0:wifi:connected\neth0:ethernet:unavailable\n", "calls": 0, "monitor": None}
+
+    def check_output(cmd, **kwargs):
+        assert cmd[0] == "nmcli"
+        state["calls"] += 1
+        return state["device"].encode()
+
+    def popen(cmd, **kwargs):
+        assert cmd == ["nmcli", "monitor"]
+        state["monitor"] = FakeMonitor()
+        return state["monitor"]
+
+    monkeypatch.setattr(network_state.subprocess, "check_output", check_output)
+    monkeypatch.setattr(network_state.subprocess, "Popen", popen)
+    return state
+
+
+def wait_dirty(provider, timeout=2.0):
+    assert provider._dirty.wait(timeout)
+
+
+def test_cache_hit_without_events(nmcli):
+    provider = NetworkStateProvider(ttl_s=10.0)
+    try:
+        assert provider.monitoring()
+        assert provider.active_network() == ("wlan0", "wifi")
+        assert provider.active_network() == ("wlan0", "wifi")
+        assert nmcli["calls"] == 1
+    finally:
+        provider.close()
+
+
+def test_monitor_event_invalidates_cache(nmcli):
+    provider = NetworkStateProvider(ttl_s=10.0)
+    try:
+        assert provider.active_network() == ("wlan0", "wifi")
+
+        nmcli["device"] = "wlan0:wifi:disconnected\neth0:ethernet:connected\n"
+        # senza eventi resta il valore in cache anche se NetworkManager e' cambiato
+        assert provider.active_network() == ("wlan0", "wifi")
+        assert nmcli["calls"] == 1
+
+        nmcli["monitor"].emit("wlan0: disconnected")
+        wait_dirty(provider)
+        assert provider.active_network() == ("eth0", "ethernet")
+        assert nmcli["calls"] == 2
+        assert not provider._dirty.is_set()
+        assert provider.active_network() == ("eth0", "ethernet")
+        assert nmcli["calls"] == 2
+    finally:
+        provider.close()
+
+
+def test_monitor_event_resets_signal_cache(nmcli, tmp_path):
+    provider = NetworkStateProvider(ttl_s=10.0, proc_root=str(tmp_path))
+    try:
+        provider.active_network()
+        nmcli["device"] = "*:42\n"
+        assert provider.wifi_signal_percent("wlan0") == 42
+        nmcli["device"] = "*:80\n"
+        assert provider.wifi_signal_percent("wlan0") == 42
+
+        nmcli["device"] = "wlan0:wifi:connected\n"
+        nmcli["monitor"].emit("wlan0: connected")
+        wait_dirty(provider)
+        provider.active_network()
+        nmcli["device"] = "*:80\n"
+        assert provider.wifi_signal_percent("wlan0") == 80
+    finally:
+        provider.close()
+
+
+def test_monitor_exit_falls_back_to_ttl(nmcli, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(network_state.time, "monotonic", lambda: clock[0])
+    provider = NetworkStateProvider(ttl_s=10.0)
+    monitor = nmcli["monitor"]
+    provider.active_network()
+
+    # fine dello stream: il thread di lettura spegne il monitor
+    monitor.terminate()
+    for _ in range(200):
+        if not provider.monitoring():
+            break
+        time.sleep(0.01)
+    assert not provider.monitoring()
+
+    nmcli["device"] = "eth0:ethernet:connected\n"
+    clock[0] += 61.0   # oltre il TTL lungo usato con il monitor attivo
+    assert provider.active_network() == ("eth0", "ethernet")
+    clock[0] += 5.0
+    nmcli["device"] = "wlan0:wifi:connected\n"
+    assert provider.active_network() == ("eth0", "ethernet")
+    clock[0] += 6.0    # senza monitor vale il TTL base
+    assert provider.active_network() == ("wlan0", "wifi")
+    provider.close()
+
+
+def test_without_nmcli_uses_sysfs(monkeypatch, tmp_path):
+    def missing(*args, **kwargs):
+        raise FileNotFoundError("nmcli")
+
+    monkeypatch.setattr(network_state.subprocess, "check_output", missing)
+    monkeypatch.setattr(network_state.subprocess, "Popen", missing)
+    net = tmp_path / "class" / "net"
+    for name, oper in (("lo", "unknown"), ("eth0", "down"), ("wlan0", "up")):
+        os.makedirs(net / name)
+        (net / name / "operstate").write_text(oper + "\n")
+    os.makedirs(net / "wlan0" / "wireless")
+
+    provider = NetworkStateProvider(sys_root=str(tmp_path))
+    assert not provider.monitoring()
+    assert provider.active_network() == ("wlan0", "wifi")
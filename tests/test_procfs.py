@@ -0,0 +1,158 @@
+import os
+import warnings
+
+import psutil
+import pytest
+
+from app.workers.procfs import ProcReader, cpu_percent
+from app.workers.sampler import MetricSampler
+from benchmarks.fixtures import proc_tree
+
+pytestmark = pytest.mark.skipif(not psutil.LINUX, reason="psutil legge /proc solo su Linux")
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    # albero /proc finto letto sia da ProcReader sia da psutil (PROCFS_PATH)
+    proc, sys_ = proc_tree(tmp_path)
+    monkeypatch.setattr(psutil, "PROCFS_PATH", proc)
+    return tmp_path, proc, sys_
+
+
+def _psutil_busy_total(t):
+    # stesso conto di psutil.cpu_percent: guest esclusi, idle + iowait non occupati
+    total = sum(t) - getattr(t, "guest", 0) - getattr(t, "guest_nice", 0)
+    return total - t.idle - getattr(t, "iowait", 0), total
+
+
+def test_cpu_matches_psutil(tree):
+    root, proc, sys_ = tree
+    reader = ProcReader(proc, sys_)
+    try:
+        prev = reader.read()
+        prev_total = _psutil_busy_total(psutil.cpu_times())
+        prev_cores = [_psutil_busy_total(t) for t in psutil.cpu_times(percpu=True)]
+        proc_tree(root, tick=5)
+        cur = reader.read()
+        cur_total = _psutil_busy_total(psutil.cpu_times())
+        cur_cores = [_psutil_busy_total(t) for t in psutil.cpu_times(percpu=True)]
+
+        assert len(cur.cores) == len(cur_cores) == 4
+        assert cpu_percent(prev.cpu, cur.cpu) == pytest.approx(cpu_percent(prev_total, cur_total), abs=0.1)
+        for i, (p, c) in enumerate(zip(prev.cores, cur.cores)):
+            assert cpu_percent(p, c) == pytest.approx(cpu_percent(prev_cores[i], cur_cores[i]), abs=0.1)
+    finally:
+        reader.close()
+
+
+def test_cpu_percent_matches_psutil_cpu_percent(tree):
+    root, proc, sys_ = tree
+    reader = ProcReader(proc, sys_)
+    try:
+        prev = reader.read()
+        psutil.cpu_percent(interval=None)
+        psutil.cpu_percent(interval=None, percpu=True)
+        proc_tree(root, tick=3)
+        cur = reader.read()
+        assert cpu_percent(prev.cpu, cur.cpu) == pytest.approx(psutil.cpu_percent(interval=None), abs=0.1)
+        expected = psutil.cpu_percent(interval=None, percpu=True)
+        got = [cpu_percent(p, c) for p, c in zip(prev.cores, cur.cores)]
+        assert got == pytest.approx(expected, abs=0.1)
+    finally:
+        reader.close()
+
+
+def test_memory_matches_psutil(tree):
+    _, proc, sys_ = tree
+    reader = ProcReader(proc, sys_)
+    try:
+        snap = reader.read()
+    finally:
+        reader.close()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # meminfo minimo: psutil avvisa per i campi mancanti
+        vm = psutil.virtual_memory()
+    assert snap.mem_total_kb * 1024 == vm.total
+    assert snap.mem_available_kb * 1024 == vm.available
+    ram = round((snap.mem_total_kb - snap.mem_available_kb) * 100.0 / snap.mem_total_kb, 1)
+    assert ram == pytest.approx(vm.percent, abs=0.1)
+
+
+def test_network_matches_psutil(tree):
+    root, proc, sys_ = tree
+    proc_tree(root, tick=7)
+    reader = ProcReader(proc, sys_)
+    try:
+        snap = reader.read()
+    finally:
+        reader.close()
+    pernic = psutil.net_io_counters(pernic=True)
+    assert set(snap.net) == set(pernic) == {"lo", "eth0", "wlan0"}
+    for nic, (rx, tx) in snap.net.items():
+        assert (rx, tx) == (pernic[nic].bytes_recv, pernic[nic].bytes_sent)
+    total = psutil.net_io_counters()
+    assert sum(rx for rx, _ in snap.net.values()) == total.bytes_recv
+    assert sum(tx for _, tx in snap.net.values()) == total.bytes_sent
+
+
+def test_temperature_from_thermal_zone(tree):
+    root, proc, sys_ = tree
+    reader = ProcReader(proc, sys_)
+    try:
+        assert reader.temp_path.endswith(os.path.join("thermal_zone0", "temp"))
+        assert reader.read().temp == pytest.approx(48.312)
+        proc_tree(root, tick=2)
+        assert reader.read().temp == pytest.approx(48.332)
+    finally:
+        reader.close()
+
+
+def test_missing_proc_files(tmp_path):
+    proc, sys_ = proc_tree(tmp_path)
+    os.unlink(os.path.join(proc, "net", "dev"))
+    assert not ProcReader.available(proc)
+    with pytest.raises(OSError):
+        ProcReader(proc, sys_)
+    # auto: senza /proc completo si ripiega su psutil, procfs forzato fallisce
+    sampler = MetricSampler(net_monitor=False, backend="auto", proc_root=proc, sys_root=sys_)
+    try:
+        assert sampler.backend == "psutil"
+    finally:
+        sampler.close()
+    with pytest.raises(OSError):
+        MetricSampler(net_monitor=False, backend="procfs", proc_root=proc, sys_root=sys_)
+
+
+def test_missing_thermal_zone(tmp_path):
+    proc, sys_ = proc_tree(tmp_path)
+    os.unlink(os.path.join(sys_, "class", "thermal", "thermal_zone0", "type"))
+    reader = ProcReader(proc, sys_)
+    try:
+        assert reader.temp_path is None
+        assert reader.read().temp is None
+    finally:
+        reader.close()
+
+
+def test_unreadable_temperature(tmp_path):
+    proc, sys_ = proc_tree(tmp_path)
+    reader = ProcReader(proc, sys_)
+    try:
+        with open(os.path.join(sys_, "class", "thermal", "thermal_zone0", "temp"), "w") as f:
+            f.write("n/a\n")
+        assert reader.read().temp is None
+    finally:
+        reader.close()
+
+
+def test_meminfo_without_memavailable(tmp_path):
+    # kernel < 3.14: niente MemAvailable, si usa MemFree
+    proc, sys_ = proc_tree(tmp_path)
+    with open(os.path.join(proc, "meminfo"), "w") as f:
+        f.write("MemTotal:        3884096 kB\nMemFree:         1200000 kB\n")
+    reader = ProcReader(proc, sys_)
+    try:
+        snap = reader.read()
+    finally:
+        reader.close()
+    assert (snap.mem_total_kb, snap.mem_available_kb) == (3884096, 1200000)